@@ -65,7 +65,7 @@ const int ECHO_PIN_2 = 5;    // Echo pin for Right Sonar
 
 void setup() {
 
-    Serial.begin(9600);
+    Serial.begin(115200);
     
     back_right = new Motor(DIR_PIN_1, PWM_PIN_1, HIGH, 100.0f, ENCA_1, ENCB_1, 1);
     front_right = new Motor(DIR_PIN_2, PWM_PIN_2, HIGH, 100.0f, ENCA_2, ENCB_2, 1);
@@ -87,7 +87,8 @@ enum COMMANDS {
   TURN_BOT_INPLACE,
   DRIVE_STRAIGHT,
   MOVE_FORWARD_M_METERS,
-  REVERSE
+  REVERSE,
+  PREEMPT_TRAJECTORY
 };
 
 struct packet {
@@ -99,10 +100,77 @@ struct packet {
 };
 
 
-struct packet curr_packet;
+struct packet curr_packet = {(char) DRIVE_STRAIGHT, 0, 0.0f, 0.0f, 0.0f};
+
+
+// Framed link, mirrored in devices/arduino_link.py:
+// SYNC1 SYNC2 TYPE SEQ LEN payload[LEN] CRC16 (little endian),
+// CRC-16/CCITT-FALSE over TYPE..payload
+#define SYNC1 0xAA
+#define SYNC2 0x55
+#define TYPE_COMMAND 0x01
+#define TYPE_TRAJECTORY 0x02
+#define TYPE_TELEMETRY 0x81
+#define MAX_PAYLOAD 64
+#define TELEMETRY_PERIOD_MS 20 // 50 Hz encoder stream for odometry
+
+struct __attribute__((packed)) telemetry {
+  uint32_t millis;
+  int32_t ticks[4]; // back right, front right, front left, back left
+  uint8_t command;
+  uint8_t ack_seq;
+  float f1;
+  float f2;
+  uint16_t rx_errors;
+  uint8_t trajectory_segment; // 0xFF when no trajectory is running
+};
+
+// Trajectory upload: uint8 count, then count x (duration s, radius m, speed RPM).
+// Radius 0 or inf drives straight (speed may be negative).
+#define MAX_TRAJECTORY_SEGMENTS 5
+
+struct __attribute__((packed)) trajectory_segment {
+  float duration;
+  float radius;
+  float speed;
+};
+
+struct trajectory_segment trajectory[MAX_TRAJECTORY_SEGMENTS];
+uint8_t trajectory_length = 0;
+uint8_t trajectory_index = 0;
+bool trajectory_active = false;
+unsigned long segment_start_ms = 0;
+
+enum RX_STATE {
+  WAIT_SYNC1,
+  WAIT_SYNC2,
+  READ_BODY
+};
+
+uint8_t rx_buf[3 + MAX_PAYLOAD + 2]; // TYPE SEQ LEN payload CRC
+uint8_t rx_pos = 0;
+uint8_t rx_state = WAIT_SYNC1;
+uint16_t rx_errors = 0;
+uint8_t last_ack_seq = 0;
+uint8_t telemetry_seq = 0;
+unsigned long last_telemetry_ms = 0;
+
+uint16_t crc16(const uint8_t* data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t) data[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
 
 void execute_command(struct packet* curr_packet) {
 
+  // Any direct command preempts a running trajectory
+  trajectory_active = false;
+
   switch(curr_packet->command) {
     case (char) MOVE_WHEEL:
     {
@@ -147,6 +215,11 @@ void execute_command(struct packet* curr_packet) {
       bot->reverse(curr_packet->f1);
     } break;
 
+    case (char) PREEMPT_TRAJECTORY:
+    {
+      bot->stop();
+    } break;
+
    
 
   }
@@ -154,12 +227,149 @@ void execute_command(struct packet* curr_packet) {
 
 }
 
-void loop() {
+void apply_segment(struct trajectory_segment* segment) {
+  // Report the segment as the applied command in telemetry
+  curr_packet.specifier = 0;
+  curr_packet.f2 = segment->speed;
+  curr_packet.f3 = 0.0f;
+  if (segment->radius == 0.0f || isinf(segment->radius)) {
+    curr_packet.command = (char) DRIVE_STRAIGHT;
+    curr_packet.f1 = segment->speed;
+    bot->drive_straight(segment->speed);
+  } else {
+    curr_packet.command = (char) TURN_WHILE_MOVING;
+    curr_packet.f1 = segment->radius;
+    bot->turn_while_moving(segment->radius, segment->speed);
+  }
+}
 
+bool start_trajectory(const uint8_t* payload, uint8_t len) {
+  uint8_t count = payload[0];
+  if (count == 0 || count > MAX_TRAJECTORY_SEGMENTS ||
+      len != 1 + count * sizeof(struct trajectory_segment)) {
+    rx_errors++;
+    return false;
+  }
+  // A segment must take time, or update_trajectory() would skip through it at once
+  for (uint8_t i = 0; i < count; i++) {
+    struct trajectory_segment segment;
+    memcpy(&segment, payload + 1 + i * sizeof(struct trajectory_segment), sizeof(segment));
+    if (!(segment.duration > 0.0f)) {
+      rx_errors++;
+      return false;
+    }
+  }
+  memcpy(trajectory, payload + 1, count * sizeof(struct trajectory_segment));
+  trajectory_length = count;
+  trajectory_index = 0;
+  trajectory_active = true;
+  segment_start_ms = millis();
+  apply_segment(&trajectory[0]);
+  return true;
+}
 
-    if (Serial.available() >= sizeof(struct packet)) {
-      Serial.readBytes((char*)&curr_packet, sizeof(curr_packet));
+// Steps through the uploaded segments on the Arduino's own clock and stops
+// the bot when they run out, so a stalled link can't leave it driving
+void update_trajectory() {
+  if (!trajectory_active) return;
+  unsigned long now = millis();
+  while (now - segment_start_ms >= (unsigned long) (trajectory[trajectory_index].duration * 1000.0f)) {
+    segment_start_ms += (unsigned long) (trajectory[trajectory_index].duration * 1000.0f);
+    trajectory_index++;
+    if (trajectory_index >= trajectory_length) {
+      // Stop through the normal command path so telemetry reports DRIVE_STRAIGHT 0
+      curr_packet = {(char) DRIVE_STRAIGHT, 0, 0.0f, 0.0f, 0.0f};
       execute_command(&curr_packet);
+      return;
+    }
+    apply_segment(&trajectory[trajectory_index]);
+  }
+}
+
+void handle_frame() {
+  uint8_t len = rx_buf[2];
+  uint16_t received = rx_buf[3 + len] | ((uint16_t) rx_buf[4 + len] << 8);
+  if (crc16(rx_buf, 3 + len) != received) {
+    rx_errors++;
+    return;
+  }
+  if (rx_buf[0] == TYPE_COMMAND && len == sizeof(struct packet)) {
+    memcpy(&curr_packet, rx_buf + 3, sizeof(curr_packet));
+    last_ack_seq = rx_buf[1];
+    execute_command(&curr_packet);
+  } else if (rx_buf[0] == TYPE_TRAJECTORY && len >= 1) {
+    if (start_trajectory(rx_buf + 3, len)) {
+      last_ack_seq = rx_buf[1];
+    }
+  }
+}
+
+// Byte-at-a-time so a dropped or corrupted byte only loses one frame
+void read_frames() {
+  while (Serial.available()) {
+    uint8_t b = Serial.read();
+    switch (rx_state) {
+      case WAIT_SYNC1:
+        if (b == SYNC1) rx_state = WAIT_SYNC2;
+        break;
+      case WAIT_SYNC2:
+        if (b == SYNC2) {
+          rx_state = READ_BODY;
+          rx_pos = 0;
+        } else if (b != SYNC1) {
+          rx_state = WAIT_SYNC1;
+        }
+        break;
+      case READ_BODY:
+        rx_buf[rx_pos++] = b;
+        if (rx_pos == 3 && rx_buf[2] > MAX_PAYLOAD) {
+          rx_errors++;
+          rx_state = WAIT_SYNC1;
+        } else if (rx_pos >= 3 && rx_pos == 3 + rx_buf[2] + 2) {
+          handle_frame();
+          rx_state = WAIT_SYNC1;
+        }
+        break;
+    }
+  }
+}
+
+void send_telemetry() {
+  struct telemetry t;
+  t.millis = millis();
+  t.ticks[0] = back_right->total_ticks();
+  t.ticks[1] = front_right->total_ticks();
+  t.ticks[2] = front_left->total_ticks();
+  t.ticks[3] = back_left->total_ticks();
+  t.command = curr_packet.command;
+  t.ack_seq = last_ack_seq;
+  t.f1 = curr_packet.f1;
+  t.f2 = curr_packet.f2;
+  t.rx_errors = rx_errors;
+  t.trajectory_segment = trajectory_active ? trajectory_index : 0xFF;
+
+  uint8_t frame[5 + sizeof(t) + 2];
+  frame[0] = SYNC1;
+  frame[1] = SYNC2;
+  frame[2] = TYPE_TELEMETRY;
+  frame[3] = telemetry_seq++;
+  frame[4] = sizeof(t);
+  memcpy(frame + 5, &t, sizeof(t));
+  uint16_t crc = crc16(frame + 2, 3 + sizeof(t));
+  frame[5 + sizeof(t)] = crc & 0xFF;
+  frame[6 + sizeof(t)] = crc >> 8;
+  Serial.write(frame, sizeof(frame));
+}
+
+void loop() {
+
+
+    read_frames();
+    update_trajectory();
+
+    if (millis() - last_telemetry_ms >= TELEMETRY_PERIOD_MS) {
+      last_telemetry_ms = millis();
+      send_telemetry();
     }
   
 
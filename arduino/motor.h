@@ -10,6 +10,7 @@ class Motor {
     Encoder* enc;
     int curr_desired_angle;
     int encoder_forward;
+    long tick_offset; // ticks accumulated before the last enc->write(0)
 
 public:
     Motor(int _DIR_PIN, int _PWM_PIN, int _forward_dir, float _max_speed, int encA,  int encB, int _encoder_forward) {
@@ -23,6 +24,7 @@ public:
 
         enc = new Encoder(encA, encB);
         encoder_forward = _encoder_forward;
+        tick_offset = 0;
         
         
      
@@ -38,8 +40,7 @@ public:
             digitalWrite(dir_pin, forward_dir); // forward
         } else if (dir == -1) {
             digitalWrite(dir_pin, !forward_dir); // reverse
-            Serial.print("Backwards means: ");
-            Serial.println(!forward_dir);
+            // No Serial prints here: the port carries framed telemetry
         }
     }
 
@@ -53,10 +54,9 @@ public:
     void turn_by_angle(float angle, float speed) { // angle in radians
 
         int steps = round((angle * ENCODER_STEPS_PER_ROTATION) / (2 * PI)); 
+        tick_offset += enc->read();
         enc->write(0);
         curr_desired_angle = steps * encoder_forward;
-        Serial.print("Curr_desired angle starts out as: ");
-        Serial.println(curr_desired_angle);
        
         set_dir(angle > 0 ? 1 : -1);
         set_speed(speed);
@@ -64,6 +64,11 @@ public:
     }
 
 
+    // Encoder ticks since power-up, unaffected by turn_by_angle() resetting the encoder
+    long total_ticks() {
+        return encoder_forward * (tick_offset + enc->read());
+    }
+
     void update() {
         int steps =  enc->read();
         //Serial.println(steps);
@@ -0,0 +1,230 @@
+import struct
+import threading
+import time
+from collections import deque
+
+# Frame: SYNC1 SYNC2 TYPE SEQ LEN payload[LEN] CRC16 (little endian)
+# CRC-16/CCITT-FALSE over TYPE..payload. Robot.ino implements the same.
+SYNC1 = 0xAA
+SYNC2 = 0x55
+HEADER_SIZE = 5
+CRC_SIZE = 2
+MAX_PAYLOAD = 64
+BAUDRATE = 115200
+
+TYPE_COMMAND = 0x01
+TYPE_TRAJECTORY = 0x02
+TYPE_TELEMETRY = 0x81
+
+COMMAND_FORMAT = '<BBfff'  # command, specifier, f1, f2, f3
+# Trajectory: uint8 count, then count x (duration s, radius m, speed RPM)
+SEGMENT_FORMAT = '<fff'
+MAX_TRAJECTORY_SEGMENTS = 5
+# millis, encoder ticks (back right, front right, front left, back left),
+# applied command, last acked sequence, applied f1, f2, receive errors,
+# running trajectory segment (0xFF when idle)
+TELEMETRY_FORMAT = '<IllllBBffHB'
+TELEMETRY_SIZE = struct.calcsize(TELEMETRY_FORMAT)
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ CRC_TABLE[((crc >> 8) ^ byte) & 0xFF]
+    return crc
+
+
+def encode_frame(frame_type, seq, payload):
+    body = bytes((frame_type, seq & 0xFF, len(payload))) + payload
+    return bytes((SYNC1, SYNC2)) + body + struct.pack('<H', crc16(body))
+
+
+def encode_command(seq, command, param1=0, param2=0, param3=0, specifier=0):
+    payload = struct.pack(COMMAND_FORMAT, command, specifier, param1, param2, param3)
+    return encode_frame(TYPE_COMMAND, seq, payload)
+
+
+def encode_trajectory(seq, segments):
+    """
+    segments is a list of (duration, radius, speed) executed back to back by
+    the Arduino; radius inf (or 0) drives straight. The bot stops after the
+    last one unless another trajectory or command arrives first.
+    """
+    if not 0 < len(segments) <= MAX_TRAJECTORY_SEGMENTS:
+        raise ValueError(f"A trajectory has 1 to {MAX_TRAJECTORY_SEGMENTS} segments, got {len(segments)}")
+    payload = bytes((len(segments),)) + b''.join(
+        struct.pack(SEGMENT_FORMAT, duration, radius, speed) for duration, radius, speed in segments)
+    return encode_frame(TYPE_TRAJECTORY, seq, payload)
+
+
+def parse_telemetry(payload, timestamp=None):
+    (millis, br, fr, fl, bl, command, ack_seq, f1, f2, rx_errors,
+     trajectory_segment) = struct.unpack(TELEMETRY_FORMAT, payload)
+    return {
+        'millis': millis,
+        'ticks': (br, fr, fl, bl),
+        'command': command,
+        'ack_seq': ack_seq,
+        'param1': f1,
+        'param2': f2,
+        'rx_errors': rx_errors,
+        'trajectory_segment': None if trajectory_segment == 0xFF else trajectory_segment,
+        'timestamp': timestamp if timestamp is not None else time.monotonic(),
+    }
+
+
+class FrameParser:
+    """
+    Incremental frame decoder. feed() raw bytes as they arrive and pop()
+    complete (type, seq, payload) frames. A bad length or CRC drops only the
+    first sync byte and rescans, so a lost or corrupted byte costs one frame
+    instead of desynchronising the stream.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = deque()
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        buffer = self.buffer
+        while True:
+            start = buffer.find(bytes((SYNC1, SYNC2)))
+            if start < 0:
+                # Keep a trailing SYNC1 in case its SYNC2 is in the next read
+                keep = 1 if buffer and buffer[-1] == SYNC1 else 0
+                self.dropped_bytes += len(buffer) - keep
+                del buffer[:len(buffer) - keep]
+                return
+            if start:
+                self.dropped_bytes += start
+                del buffer[:start]
+            if len(buffer) < HEADER_SIZE:
+                return
+
+            length = buffer[4]
+            if length > MAX_PAYLOAD:
+                self.crc_errors += 1
+                del buffer[:1]
+                continue
+            end = HEADER_SIZE + length + CRC_SIZE
+            if len(buffer) < end:
+                return
+
+            body = bytes(buffer[2:HEADER_SIZE + length])
+            (received,) = struct.unpack_from('<H', buffer, HEADER_SIZE + length)
+            if crc16(body) != received:
+                self.crc_errors += 1
+                del buffer[:1]
+                continue
+            self.frames.append((body[0], body[1], body[3:]))
+            del buffer[:end]
+
+    def pop(self):
+        return self.frames.popleft() if self.frames else None
+
+
+class CommandFramer:
+    """Frames motor commands and trajectories with a rolling 8-bit sequence number"""
+
+    def __init__(self):
+        self.seq = 0
+
+    def frame(self, command, param1=0, param2=0, param3=0, specifier=0):
+        self.seq = (self.seq + 1) & 0xFF
+        return encode_command(self.seq, command, param1, param2, param3, specifier)
+
+    def trajectory(self, segments):
+        self.seq = (self.seq + 1) & 0xFF
+        return encode_trajectory(self.seq, segments)
+
+
+class ArduinoLink:
+    """
+    Reads the Arduino's telemetry stream in a background thread.
+
+    The latest decoded telemetry dict is kept in self.latest (replaced as a
+    whole, so readers don't need the lock) and every frame is handed to the
+    registered listeners, e.g. wheel odometry.
+    """
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.parser = FrameParser()
+        self.latest = None
+        self.listeners = []
+        self.telemetry_count = 0
+        self.running = False
+
+    def add_listener(self, callback):
+        """callback(telemetry_dict) is called from the reader thread for every frame"""
+        self.listeners.append(callback)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if not self.running:
+                    return
+                print(f"Arduino link read error: {e}")
+                time.sleep(0.1)
+                continue
+            if data:
+                self.handle_bytes(data)
+
+    def handle_bytes(self, data, timestamp=None):
+        self.parser.feed(data)
+        now = timestamp if timestamp is not None else time.monotonic()
+        while True:
+            frame = self.parser.pop()
+            if frame is None:
+                return
+            frame_type, _, payload = frame
+            if frame_type != TYPE_TELEMETRY or len(payload) != TELEMETRY_SIZE:
+                continue
+            telemetry = parse_telemetry(payload, now)
+            self.latest = telemetry
+            self.telemetry_count += 1
+            for callback in self.listeners:
+                try:
+                    callback(telemetry)
+                except Exception as e:
+                    print(f"Telemetry listener error: {e}")
+
+    def get_ack_seq(self):
+        latest = self.latest
+        return latest['ack_seq'] if latest is not None else None
+
+    def get_stats(self):
+        latest = self.latest
+        return {
+            'telemetry_frames': self.telemetry_count,
+            'crc_errors': self.parser.crc_errors,
+            'dropped_bytes': self.parser.dropped_bytes,
+            'ack_seq': latest['ack_seq'] if latest is not None else None,
+            'arduino_rx_errors': latest['rx_errors'] if latest is not None else None,
+            'telemetry_age': time.monotonic() - latest['timestamp'] if latest is not None else None,
+        }
@@ -7,7 +7,8 @@ import os
 from datetime import datetime
 
 class Camera:
-    def __init__(self, camera_id=0, width=640, height=480, fps=30, auto_record=True):
+    def __init__(self, camera_id=0, width=640, height=480, fps=30, auto_record=True,
+                 calibration=None, undistort="boxes", undistort_alpha=0.0):
         self.camera_id = camera_id
         self.width = width
         self.height = height
@@ -16,9 +17,23 @@ class Camera:
         self.cap = None
         self.latest_frame = None
         self.detected_objects = []
+        self.detection_time = None
+        self.detection_seq = 0  # bumped once per processed frame
         self.lock = threading.Lock()
         self.running = False
         
+        # Lens calibration (.npz from test_applications/calibrate_camera.py).
+        # undistort: "frame" remaps every frame before detection, "boxes" only
+        # moves the detected box corners, "none" reports raw pixels
+        self.undistort = undistort
+        self.undistort_alpha = undistort_alpha
+        self.camera_matrix = None
+        self.dist_coeffs = None
+        self.calibration_size = None
+        self.rectification = {}  # frame size -> (new camera matrix, map1, map2)
+        if calibration is not None:
+            self.load_calibration(calibration)
+        
         # Video recording variables
         self.video_writer = None
         self.recording = False
@@ -67,6 +82,8 @@ class Camera:
             'has_latest_frame': self.latest_frame is not None,
             'objects_detected': len(self.detected_objects),
             'yolo_loaded': self.net is not None,
+            'calibrated': self.camera_matrix is not None,
+            'undistort': self.undistort if self.camera_matrix is not None else 'none',
             'videos_directory': os.path.abspath(self.videos_dir),
             'auto_record': self.auto_record
         }
@@ -157,6 +174,100 @@ class Camera:
             print(f"Could not load YOLO model: {e}")
             print("Using enhanced basic detection instead")
     
+    def load_calibration(self, path):
+        """Load camera_matrix / dist_coeffs / image_size from a calibration .npz"""
+        try:
+            with np.load(path) as data:
+                camera_matrix = np.array(data['camera_matrix'], dtype=np.float64)
+                dist_coeffs = np.array(data['dist_coeffs'], dtype=np.float64).ravel()
+                image_size = tuple(int(v) for v in data['image_size'])
+        except Exception as e:
+            print(f"Could not load camera calibration {path}: {e}")
+            print("Running without undistortion")
+            return False
+        
+        self.camera_matrix = camera_matrix
+        self.dist_coeffs = dist_coeffs
+        self.calibration_size = image_size
+        self.rectification = {}
+        print(f"Camera calibration loaded from {path} ({image_size[0]}x{image_size[1]}, undistort: {self.undistort})")
+        return True
+    
+    def _scaled_camera_matrix(self, size):
+        """Calibrated intrinsics rescaled to a (width, height) frame size"""
+        camera_matrix = self.camera_matrix.copy()
+        camera_matrix[0, :] *= size[0] / self.calibration_size[0]
+        camera_matrix[1, :] *= size[1] / self.calibration_size[1]
+        return camera_matrix
+    
+    def _get_rectification(self, size):
+        """(new camera matrix, map1, map2) for a frame size, computed once and cached"""
+        if size not in self.rectification:
+            camera_matrix = self._scaled_camera_matrix(size)
+            new_matrix, _ = cv2.getOptimalNewCameraMatrix(
+                camera_matrix, self.dist_coeffs, size, self.undistort_alpha, size)
+            map1 = map2 = None
+            if self.undistort == "frame":
+                # Fixed-point maps make remap roughly twice as fast as float maps
+                map1, map2 = cv2.initUndistortRectifyMap(
+                    camera_matrix, self.dist_coeffs, None, new_matrix, size, cv2.CV_16SC2)
+            self.rectification[size] = (new_matrix, map1, map2)
+        return self.rectification[size]
+    
+    def undistort_frame(self, frame):
+        """Remap a raw frame through the cached undistortion maps"""
+        height, width = frame.shape[:2]
+        _, map1, map2 = self._get_rectification((width, height))
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
+    
+    def undistort_boxes(self, objects, size):
+        """
+        Move detections from raw to undistorted pixels. Each box becomes the
+        bounding box of its undistorted corners and edge midpoints; the raw
+        box is kept as 'raw_bbox' for drawing on the raw frame.
+        """
+        if not objects:
+            return objects
+        width, height = size
+        new_matrix, _, _ = self._get_rectification(size)
+        
+        boxes = np.array([obj['bbox'] for obj in objects], dtype=np.float64)
+        x, y, w, h = boxes.T
+        xs = np.stack([x, x + w / 2, x + w, x + w, x + w, x + w / 2, x, x], axis=1)
+        ys = np.stack([y, y, y, y + h / 2, y + h, y + h, y + h, y + h / 2], axis=1)
+        points = np.stack([xs, ys], axis=2).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(points, self._scaled_camera_matrix(size), self.dist_coeffs,
+                                          P=new_matrix).reshape(len(objects), 8, 2)
+        
+        low = np.floor(undistorted.min(axis=1))
+        high = np.ceil(undistorted.max(axis=1))
+        low = np.clip(low, 0, [width - 1, height - 1]).astype(int)
+        high = np.clip(high, 0, [width - 1, height - 1]).astype(int)
+        
+        result = []
+        for obj, (x0, y0), (x1, y1) in zip(objects, low, high):
+            w, h = max(int(x1 - x0), 1), max(int(y1 - y0), 1)
+            corrected = dict(obj)
+            corrected['raw_bbox'] = obj['bbox']
+            corrected['bbox'] = (int(x0), int(y0), w, h)
+            corrected['center'] = (int(x0) + w // 2, int(y0) + h // 2)
+            result.append(corrected)
+        return result
+    
+    def get_intrinsics(self):
+        """
+        (camera_matrix, dist_coeffs, (width, height)) describing the pixel
+        coordinates of reported detections, or None when uncalibrated. After
+        undistortion that is the rectified matrix with zero distortion.
+        """
+        if self.camera_matrix is None:
+            return None
+        size = (self.width, self.height)
+        if self.undistort in ("frame", "boxes"):
+            new_matrix, _, _ = self._get_rectification(size)
+            return new_matrix, np.zeros(5), size
+        return self._scaled_camera_matrix(size), self.dist_coeffs.copy(), size
+    
     def initialize_camera(self):
         """Initialize camera connection"""
         self.cap = cv2.VideoCapture(self.camera_id)
@@ -391,7 +502,7 @@ class Camera:
     def _draw_detections_on_frame(self, frame, objects):
         """Draw bounding boxes and labels on frame"""
         for obj in objects:
-            x, y, w, h = obj['bbox']
+            x, y, w, h = obj.get('raw_bbox', obj['bbox'])  # "boxes" mode keeps the frame raw
             label = obj['label']
             confidence = obj['confidence']
             
@@ -428,12 +539,21 @@ class Camera:
                 print("Failed to capture frame")
                 continue
             
+            calibrated = self.camera_matrix is not None
+            if calibrated and self.undistort == "frame":
+                frame = self.undistort_frame(frame)
+            
             # Detect objects
             if self.net is not None:
                 objects = self.detect_objects_yolo(frame)
             else:
                 objects = self.detect_objects_simple(frame)
             
+            # Only the boxes are corrected; the frame itself stays raw
+            if calibrated and self.undistort == "boxes":
+                height, width = frame.shape[:2]
+                objects = self.undistort_boxes(objects, (width, height))
+            
             # Record frame with detections if recording is active
             if self.recording and self.video_writer:
                 frame_with_detections = self._draw_detections_on_frame(frame.copy(), objects)
@@ -443,6 +563,8 @@ class Camera:
             with self.lock:
                 self.latest_frame = frame.copy()
                 self.detected_objects = objects
+                self.detection_time = time.monotonic()
+                self.detection_seq += 1
             
             time.sleep(1.0 / self.fps)  # Control frame rate
     
@@ -485,6 +607,11 @@ class Camera:
         with self.lock:
             return self.detected_objects.copy()
     
+    def get_objects_stamped(self):
+        """(objects, monotonic timestamp, frame sequence number) from the same frame"""
+        with self.lock:
+            return self.detected_objects.copy(), self.detection_time, self.detection_seq
+
     def get_frame_with_detections(self):
         """Get frame with bounding boxes drawn around detected objects"""
         with self.lock:
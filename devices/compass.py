@@ -1,30 +1,176 @@
 import smbus2
 import math
+import os
+import threading
+import time
+import numpy as np
+
+# HMC5883L data output rates (Hz) -> Config A DO bits
+OUTPUT_RATES = {0.75: 0, 1.5: 1, 3: 2, 7.5: 3, 15: 4, 30: 5, 75: 6}
+STATUS_REGISTER = 0x09
+STATUS_READY = 0x01
+
+
+def fit_ellipse(xs, ys):
+    """
+    Least-squares ellipse fit of raw x/y readings taken while spinning the robot.
+    Returns (offset, matrix) such that matrix @ (raw - offset) lies on a circle.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    if xs.size < 6:
+        raise ValueError("Need at least 6 samples to fit an ellipse")
+
+    # A x^2 + B xy + C y^2 + D x + E y = 1
+    design = np.column_stack((xs * xs, xs * ys, ys * ys, xs, ys))
+    (A, B, C, D, E), *_ = np.linalg.lstsq(design, np.ones_like(xs), rcond=None)
+
+    M = np.array([[A, B / 2], [B / 2, C]])
+    center = np.linalg.solve(2 * M, [-D, -E])
+    k = 1 + center @ M @ center
+    eigenvalues, eigenvectors = np.linalg.eigh(M / k)
+    if np.any(eigenvalues <= 0):
+        raise ValueError("Samples do not describe an ellipse - spin the full 360 degrees")
+
+    # Map the ellipse onto a circle of the mean radius so units stay comparable
+    radius = np.mean(1 / np.sqrt(eigenvalues))
+    matrix = eigenvectors @ np.diag(np.sqrt(eigenvalues)) @ eigenvectors.T * radius
+    return center, matrix
+
+
 class Compass:
-    def __init__(self, i2c_bus=7, address=0x1E):
+    def __init__(self, i2c_bus=7, address=0x1E, output_rate=75,
+                 calibration_file="compass_calibration.npz", background=True):
         self.bus = smbus2.SMBus(i2c_bus)
         self.address = address
+        self.output_rate = output_rate
+        self.calibration_file = calibration_file
+
+        # Hard-iron offset and soft-iron correction for the x/y axes
+        self.offset = np.zeros(2)
+        self.matrix = np.eye(2)
+        self.load_calibration()
+
+        # Alpha-beta filter gains for heading and heading rate
+        self.alpha = 0.3
+        self.beta = 0.05
+        # (heading, heading_rate, timestamp). Replaced as a whole by the sampler
+        # thread so readers never need a lock.
+        self.latest = None
+        self.running = False
+        self.bus_lock = threading.Lock()
+
         self.initialize()
+        if background:
+            self.start()
 
     def initialize(self):
         # Example config for HMC5883L
-        self.bus.write_byte_data(self.address, 0x00, 0x70)  # Config A
+        rate_bits = OUTPUT_RATES[self.output_rate]
+        self.bus.write_byte_data(self.address, 0x00, 0x60 | (rate_bits << 2))  # Config A: 8-sample average
         self.bus.write_byte_data(self.address, 0x01, 0xA0)  # Config B
         self.bus.write_byte_data(self.address, 0x02, 0x00)  # Continuous mode
 
+    def load_calibration(self):
+        if self.calibration_file and os.path.exists(self.calibration_file):
+            data = np.load(self.calibration_file)
+            self.offset = data['offset']
+            self.matrix = data['matrix']
+            print(f"Loaded compass calibration from {self.calibration_file}")
+
+    def save_calibration(self):
+        np.savez(self.calibration_file, offset=self.offset, matrix=self.matrix)
+        print(f"Saved compass calibration to {self.calibration_file}")
+
     def read_raw(self):
-        data = self.bus.read_i2c_block_data(self.address, 0x03, 6)
+        with self.bus_lock:
+            data = self.bus.read_i2c_block_data(self.address, 0x03, 6)
         x = self._twos_complement(data[0] << 8 | data[1])
         z = self._twos_complement(data[2] << 8 | data[3])
         y = self._twos_complement(data[4] << 8 | data[5])
         return (x, y, z)
 
-    def get_heading(self):
+    def data_ready(self):
+        with self.bus_lock:
+            return self.bus.read_byte_data(self.address, STATUS_REGISTER) & STATUS_READY
+
+    def raw_heading(self):
         x, y, _ = self.read_raw()
-        heading_rad = math.atan2(y, x)
+        cx, cy = self.matrix @ (np.array([x, y]) - self.offset)
+        heading_rad = math.atan2(cy, cx)
         if heading_rad < 0:
             heading_rad += 2 * math.pi
         return heading_rad
 
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _sample_loop(self):
+        period = 1.0 / self.output_rate
+        heading = rate = last_time = None
+        while self.running:
+            try:
+                if not self.data_ready():
+                    time.sleep(period / 4)
+                    continue
+                measured = self.raw_heading()
+            except OSError as e:
+                print(f"Compass read error: {e}")
+                time.sleep(period)
+                continue
+
+            now = time.monotonic()
+            if heading is None:
+                heading, rate = measured, 0.0
+            else:
+                dt = max(now - last_time, 1e-3)
+                predicted = heading + rate * dt
+                residual = (measured - predicted + math.pi) % (2 * math.pi) - math.pi
+                heading = (predicted + self.alpha * residual) % (2 * math.pi)
+                rate += self.beta * residual / dt
+            last_time = now
+            self.latest = (heading, rate, now)
+            time.sleep(period / 2)
+
+    def get_heading(self):
+        latest = self.latest
+        if latest is None:
+            return self.raw_heading()
+        return latest[0]
+
+    def get_heading_rate(self):
+        """Filtered heading rate in rad/s (positive = clockwise), 0 until the sampler has data"""
+        latest = self.latest
+        return latest[1] if latest is not None else 0.0
+
+    def calibrate(self, duration=30):
+        """
+        Spin the robot slowly through at least one full turn while this runs.
+        Fits the hard/soft-iron ellipse and stores it to calibration_file.
+        """
+        print(f"Compass calibration: spin the robot for {duration} seconds...")
+        xs, ys = [], []
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            x, y, _ = self.read_raw()
+            xs.append(x)
+            ys.append(y)
+            time.sleep(1.0 / self.output_rate)
+
+        self.offset, self.matrix = fit_ellipse(xs, ys)
+        print(f"Offset: {self.offset}, matrix: {self.matrix.tolist()}")
+        self.save_calibration()
+        return self.offset, self.matrix
+
     def _twos_complement(self, val):
         return val - 65536 if val >= 32768 else val
+
+
+if __name__ == '__main__':
+    compass = Compass(background=False)
+    compass.calibrate()
@@ -1,17 +1,131 @@
 import serial
-import pynmea2
+import struct
+import time
+from devices.nmea import NMEAFramer, parse_sentence, nmea_checksum
+
+# u-blox CFG-MSG ids for the standard NMEA sentences (class 0xF0)
+UBX_NMEA_IDS = {"GGA": 0x00, "GLL": 0x01, "GSA": 0x02, "GSV": 0x03, "RMC": 0x04, "VTG": 0x05, "ZDA": 0x08}
+# Field order of the MediaTek PMTK314 sentence output command
+PMTK314_ORDER = ("GLL", "RMC", "VTG", "GGA", "GSA", "GSV")
+USED_SENTENCES = ("GGA", "RMC", "VTG")
+
+
+def ubx_packet(msg_class, msg_id, payload=b""):
+    header = struct.pack('<BBH', msg_class, msg_id, len(payload)) + payload
+    ck_a = ck_b = 0
+    for byte in header:
+        ck_a = (ck_a + byte) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    return b"\xb5\x62" + header + bytes((ck_a, ck_b))
+
+
+def pmtk_sentence(body):
+    return f"${body}*{nmea_checksum(body.encode()):02X}\r\n".encode()
+
+
+class GPSFix:
+    """Position from GGA/RMC fused with the latest speed/course from RMC/VTG"""
+
+    def __init__(self, latitude, longitude, speed=None, course=None, hdop=None,
+                 num_sats=None, utc_time=None, timestamp=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.speed = speed        # m/s over ground
+        self.course = course      # degrees true, only meaningful while moving
+        self.hdop = hdop
+        self.num_sats = num_sats
+        self.utc_time = utc_time
+        self.timestamp = timestamp if timestamp is not None else time.monotonic()
+
+    def __repr__(self):
+        return (f"GPSFix(lat={self.latitude}, lon={self.longitude}, speed={self.speed}, "
+                f"course={self.course}, hdop={self.hdop})")
+
+
 class GPS:
-    def __init__(self, port="/dev/ttyUSB1", baudrate=57600):
+    def __init__(self, port="/dev/ttyUSB1", baudrate=57600, receiver=None, rate_hz=None):
         self.ser = serial.Serial(port, baudrate, timeout=1)
+        self.framer = NMEAFramer()
+        self.latest_fix = None
 
-    def read_location(self):
+        # Last values seen from each sentence type, merged into every new fix
+        self.speed = None
+        self.course = None
+        self.hdop = None
+        self.num_sats = None
+        self.motion_time = None
+
+        if receiver is not None:
+            self.configure(receiver, rate_hz or 10)
+
+    def configure(self, receiver, rate_hz=10):
+        """
+        Set the navigation rate and disable sentences we don't parse.
+        receiver is 'ubx' for u-blox modules or 'pmtk' for MediaTek ones.
+        """
+        period_ms = int(round(1000 / rate_hz))
+        if receiver == "ubx":
+            commands = [ubx_packet(0x06, 0x08, struct.pack('<HHH', period_ms, 1, 1))]  # CFG-RATE
+            for name, msg_id in UBX_NMEA_IDS.items():
+                enabled = 1 if name in USED_SENTENCES else 0
+                commands.append(ubx_packet(0x06, 0x01, struct.pack('<BBB', 0xF0, msg_id, enabled)))  # CFG-MSG
+        elif receiver == "pmtk":
+            enabled = ",".join("1" if name in USED_SENTENCES else "0" for name in PMTK314_ORDER)
+            commands = [
+                pmtk_sentence("PMTK314," + enabled + ",0" * 13),
+                pmtk_sentence(f"PMTK220,{period_ms}"),
+            ]
+        else:
+            raise ValueError(f"Unknown GPS receiver type: {receiver}")
+
+        for command in commands:
+            self.ser.write(command)
+            self.ser.flush()
+            time.sleep(0.05)  # give the module time to apply each setting
+        self.framer.clear()
+        print(f"GPS configured ({receiver}) for {rate_hz} Hz")
+
+    def _next_message(self):
+        # Drain whatever the driver has buffered in one read instead of
+        # calling readline() per sentence.
+        sentence = self.framer.pop()
+        while sentence is None:
+            self.framer.feed(self.ser.read(self.ser.in_waiting or 1))
+            sentence = self.framer.pop()
+        return parse_sentence(sentence)
+
+    def _update(self, msg):
+        """Merge one parsed sentence; returns a new GPSFix when it carries a position"""
+        if msg.get('speed') is not None:
+            self.speed = msg['speed']
+            self.course = msg['course']
+            self.motion_time = time.monotonic()
+        if msg['type'] == 'GGA' and msg.get('fix_quality'):
+            self.hdop = msg['hdop']
+            self.num_sats = msg['num_sats']
+
+        if msg.get('latitude') is None or msg.get('longitude') is None:
+            return None
+        self.latest_fix = GPSFix(msg['latitude'], msg['longitude'], self.speed, self.course,
+                                 self.hdop, self.num_sats, msg.get('timestamp'))
+        return self.latest_fix
+
+    def read_fix(self):
         while True:
-            line = self.ser.readline().decode(errors='ignore').strip()
-            if line.startswith("$"):
-                msg = pynmea2.parse(line)
-                if hasattr(msg, 'latitude') and hasattr(msg, 'longitude'):
-                    print(msg.latitude, msg.longitude)
-                    return (msg.latitude, msg.longitude)
-        
-
-                
+            try:
+                msg = self._next_message()
+            except serial.SerialException as e:
+                print(f"GPS read error: {e}")
+                return None
+            if msg is None:
+                continue
+            fix = self._update(msg)
+            if fix is not None:
+                return fix
+
+    def read_location(self):
+        fix = self.read_fix()
+        if fix is None:
+            return None
+        print(fix.latitude, fix.longitude)
+        return (fix.latitude, fix.longitude)
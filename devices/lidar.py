@@ -1,12 +1,16 @@
 from rplidar import RPLidar
 from threading import Thread
 import threading
+import time
 
 class Lidar:
     def __init__(self, PORT):
         self.device = RPLidar(PORT)
         self.latest_scan = None
+        self.scan_time = None
+        self.scan_seq = 0  # bumped once per revolution
         self.lock = threading.Lock()
+        self.listeners = []
         self.start()
     def _run(self):
         for scan in self.device.iter_scans(scan_type="express"):
@@ -14,6 +18,18 @@ class Lidar:
             filtered_points = [(angle, dist) for (angle, dist) in points if angle < 100 or angle > 260] #front facing points only to avoid seeing the battery  
             with self.lock:
                 self.latest_scan = filtered_points
+                self.scan_time = time.monotonic()
+                self.scan_seq += 1
+                scan_time, scan_seq = self.scan_time, self.scan_seq
+            for callback in self.listeners:
+                try:
+                    callback(filtered_points, scan_time, scan_seq)
+                except Exception as e:
+                    print(f"Lidar listener error: {e}")
+
+    def add_listener(self, callback):
+        """callback(scan, timestamp, seq) is called from the lidar thread after every revolution"""
+        self.listeners.append(callback)
     
     def start(self):
         Thread(target=self._run, daemon=True).start()
@@ -21,3 +37,8 @@ class Lidar:
     def get_scan(self):
         with self.lock:
             return self.latest_scan
+
+    def get_scan_stamped(self):
+        """(scan, monotonic timestamp, sequence number) of the same revolution"""
+        with self.lock:
+            return self.latest_scan, self.scan_time, self.scan_seq
@@ -0,0 +1,163 @@
+from collections import deque
+from functools import reduce
+import operator
+
+# Sentence types we actually use. Everything else is dropped before the
+# checksum is even computed.
+SUPPORTED_SENTENCES = (b"GGA", b"RMC", b"VTG")
+
+MAX_SENTENCE_LENGTH = 82  # NMEA 0183 limit, including $ and CRLF
+KNOTS_TO_MPS = 0.514444
+KMH_TO_MPS = 1 / 3.6
+
+
+def nmea_checksum(body):
+    """XOR of every byte between '$' and '*'"""
+    return reduce(operator.xor, body, 0)
+
+
+def verify_checksum(sentence):
+    """Return the sentence body (without '$' and '*hh') or None if the checksum is bad"""
+    star = sentence.rfind(b"*")
+    if star < 1 or len(sentence) < star + 3:
+        return None
+    try:
+        expected = int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return None
+    body = sentence[1:star]
+    if nmea_checksum(body) != expected:
+        return None
+    return body
+
+
+def _to_degrees(value, hemisphere):
+    if not value:
+        return None
+    raw = float(value)
+    degrees = int(raw / 100)
+    decimal = degrees + (raw - degrees * 100) / 60.0
+    if hemisphere in (b"S", b"W"):
+        decimal = -decimal
+    return decimal
+
+
+def _to_float(value):
+    return float(value) if value else None
+
+
+def _parse_gga(fields):
+    quality = int(fields[6]) if fields[6] else 0
+    if quality == 0:
+        return {'type': 'GGA', 'fix_quality': 0, 'latitude': None, 'longitude': None}
+    return {
+        'type': 'GGA',
+        'timestamp': fields[1].decode(),
+        'latitude': _to_degrees(fields[2], fields[3]),
+        'longitude': _to_degrees(fields[4], fields[5]),
+        'fix_quality': quality,
+        'num_sats': int(fields[7]) if fields[7] else 0,
+        'hdop': _to_float(fields[8]),
+        'altitude': _to_float(fields[9]),
+    }
+
+
+def _parse_rmc(fields):
+    if fields[2] != b"A":
+        return {'type': 'RMC', 'valid': False, 'latitude': None, 'longitude': None}
+    speed_knots = _to_float(fields[7])
+    return {
+        'type': 'RMC',
+        'timestamp': fields[1].decode(),
+        'valid': True,
+        'latitude': _to_degrees(fields[3], fields[4]),
+        'longitude': _to_degrees(fields[5], fields[6]),
+        'speed': speed_knots * KNOTS_TO_MPS if speed_knots is not None else None,
+        'course': _to_float(fields[8]),
+    }
+
+
+def _parse_vtg(fields):
+    # $GPVTG,course,T,course_mag,M,speed_knots,N,speed_kmh,K,mode
+    speed_kmh = _to_float(fields[7])
+    if speed_kmh is not None:
+        speed = speed_kmh * KMH_TO_MPS
+    else:
+        speed_knots = _to_float(fields[5])
+        speed = speed_knots * KNOTS_TO_MPS if speed_knots is not None else None
+    return {
+        'type': 'VTG',
+        'course': _to_float(fields[1]),
+        'speed': speed,
+    }
+
+
+_PARSERS = {
+    b"GGA": (_parse_gga, 10),
+    b"RMC": (_parse_rmc, 9),
+    b"VTG": (_parse_vtg, 8),
+}
+
+
+def parse_sentence(sentence):
+    """
+    Parse one framed NMEA sentence (bytes, starting with '$').
+    Returns a dict for GGA/RMC/VTG, or None for unsupported, corrupted or
+    truncated sentences. Never raises on bad input.
+    """
+    if len(sentence) < 7 or sentence[0:1] != b"$":
+        return None
+    sentence_type = sentence[3:6]
+    if sentence_type not in _PARSERS:
+        return None
+
+    body = verify_checksum(sentence)
+    if body is None:
+        return None
+
+    parser, min_fields = _PARSERS[sentence_type]
+    fields = body.split(b",")
+    if len(fields) < min_fields:
+        return None
+    try:
+        return parser(fields)
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return None
+
+
+class NMEAFramer:
+    """Accumulates raw serial bytes and splits them into complete sentences"""
+
+    def __init__(self, max_buffer=4096):
+        self.buffer = bytearray()
+        self.max_buffer = max_buffer
+        self.sentences = deque()
+
+    def feed(self, data):
+        if not data:
+            return
+        self.buffer += data
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            # No terminator yet. Don't let line noise grow the buffer forever.
+            if len(self.buffer) > self.max_buffer:
+                del self.buffer[:-MAX_SENTENCE_LENGTH]
+            return
+
+        complete = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        for line in complete.split(b"\n"):
+            start = line.find(b"$")
+            if start < 0:
+                continue
+            line = line[start:].rstrip(b"\r")
+            if len(line) <= MAX_SENTENCE_LENGTH:
+                self.sentences.append(line)
+
+    def pop(self):
+        """Oldest complete sentence, or None if nothing is pending"""
+        return self.sentences.popleft() if self.sentences else None
+
+    def clear(self):
+        self.buffer.clear()
+        self.sentences.clear()
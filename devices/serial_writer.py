@@ -0,0 +1,211 @@
+import threading
+import time
+
+from devices.arduino_link import BAUDRATE, MAX_TRAJECTORY_SEGMENTS, CommandFramer
+
+# 8N1 framing: start bit + 8 data bits + stop bit per byte
+BITS_PER_BYTE = 10
+# Mailbox marker for a trajectory upload instead of a single command
+TRAJECTORY = object()
+
+
+class SerialCommandWriter:
+    """
+    Sends framed motor commands to the Arduino from its own thread.
+
+    submit() drops the command into a single-slot mailbox and returns at
+    once; if the writer hasn't picked up the previous command yet it is
+    replaced (latest command wins). A command identical to the last one sent
+    is skipped until keepalive seconds have passed, and writes are spaced by
+    their time on the wire at the port's baud rate (but never closer than
+    min_interval) so the Arduino's receive buffer can't overflow.
+
+    send_now() is the priority path for safety stops: it discards whatever
+    is queued or about to be written and puts its command on the wire from
+    the caller's thread straight away. With lock_forward=True it also locks
+    out forward motion: until set_forward_lock(False), trajectories and
+    commands forward_filter(command, param1, param2) says drive forward are
+    dropped at the point of writing, so one submitted just before the stop
+    can't follow it onto the wire.
+    """
+
+    def __init__(self, ser, keepalive=0.5, min_interval=0.02, baudrate=None, forward_filter=None):
+        self.ser = ser
+        self.keepalive = keepalive
+        self.min_interval = min_interval
+        self.baudrate = baudrate or getattr(ser, 'baudrate', None) or BAUDRATE
+        self.framer = CommandFramer()
+
+        self.pending = None
+        self.in_flight = False
+        self.last_command = None
+        self.last_sent_time = None
+        self.next_write_time = 0.0
+        self.condition = threading.Condition()
+        # Serialises writes between the writer thread and send_now(); epoch
+        # bumps on every priority send so a command picked up before it is dropped
+        self.write_lock = threading.Lock()
+        self.epoch = 0
+        self.forward_filter = forward_filter
+        self.forward_locked = False
+        self.running = False
+
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.preempted = 0
+        self.priority_sent = 0
+        self.locked_out = 0
+        self.bytes_sent = 0
+        self.last_error = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def submit(self, command, param1=0, param2=0, param3=0):
+        if command is TRAJECTORY:
+            pending = (TRAJECTORY, param1)
+        else:
+            pending = (command, param1, param2, param3)
+        with self.condition:
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = pending
+            self.queued += 1
+            self.condition.notify()
+        return True
+
+    def submit_trajectory(self, segments):
+        """Queue a list of (duration, radius, speed) segments; it replaces any pending command"""
+        if not 0 < len(segments) <= MAX_TRAJECTORY_SEGMENTS:
+            raise ValueError(f"A trajectory has 1 to {MAX_TRAJECTORY_SEGMENTS} segments, got {len(segments)}")
+        if not all(segment[0] > 0 for segment in segments):
+            raise ValueError("Every trajectory segment needs a duration greater than 0")
+        return self.submit(TRAJECTORY, tuple(map(tuple, segments)))
+
+    def send_now(self, command, param1=0, param2=0, param3=0, lock_forward=False):
+        """Write a command immediately, preempting anything queued; returns True once it is on the wire"""
+        with self.condition:
+            if self.pending is not None:
+                self.preempted += 1
+                self.pending = None
+            self.condition.notify_all()
+        with self.write_lock:
+            if lock_forward:
+                self.forward_locked = True
+            self.epoch += 1
+            sent = self._write_locked((command, param1, param2, param3), self.epoch, force=True)
+        if sent:
+            self.priority_sent += 1
+        return sent
+
+    def set_forward_lock(self, locked):
+        with self.write_lock:
+            self.forward_locked = locked
+
+    def drives_forward(self, command):
+        if command[0] is TRAJECTORY:
+            return True
+        return self.forward_filter is not None and self.forward_filter(*command[:3])
+
+    def drain(self, timeout=0.5):
+        """Wait until the mailbox is empty, e.g. so a final stop reaches the Arduino before exit"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while (self.pending is not None or self.in_flight) and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+
+            # Pace on bytes-on-wire outside the lock so submit() never waits
+            delay = self.next_write_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self.condition:
+                pending, self.pending = self.pending, None
+                self.in_flight = pending is not None
+                epoch = self.epoch
+            if pending is not None:
+                self._write(pending, epoch)
+            with self.condition:
+                self.in_flight = False
+                self.condition.notify_all()
+
+    def _write(self, command, epoch):
+        with self.write_lock:
+            return self._write_locked(command, epoch)
+
+    def _write_locked(self, command, epoch, force=False):
+        if epoch != self.epoch:
+            # A priority command went out after this one was picked up
+            self.preempted += 1
+            return False
+        if not force and self.forward_locked and self.drives_forward(command):
+            self.locked_out += 1
+            return False
+        now = time.monotonic()
+        # A repeated trajectory restarts it on the Arduino, so only single commands are deduplicated
+        if (not force and command[0] is not TRAJECTORY and command == self.last_command
+                and self.last_sent_time is not None and now - self.last_sent_time < self.keepalive):
+            self.duplicates += 1
+            return False
+
+        if not (self.ser and self.ser.is_open):
+            self.failed += 1
+            return False
+        # Sequence numbers are assigned on the wire so skipped duplicates don't leave gaps
+        if command[0] is TRAJECTORY:
+            packet = self.framer.trajectory(command[1])
+        else:
+            packet = self.framer.frame(*command)
+        try:
+            self.ser.write(packet)
+        except Exception as e:
+            self.failed += 1
+            self.last_error = str(e)
+            print(f"Serial write error: {e}")
+            return False
+
+        self.sent += 1
+        self.bytes_sent += len(packet)
+        self.last_command = command
+        self.last_sent_time = now
+        wire_time = len(packet) * BITS_PER_BYTE / self.baudrate
+        self.next_write_time = now + max(wire_time, self.min_interval)
+        return True
+
+    def get_stats(self):
+        return {
+            'queued': self.queued,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'preempted': self.preempted,
+            'priority_sent': self.priority_sent,
+            'forward_locked': self.forward_locked,
+            'locked_out': self.locked_out,
+            'bytes_sent': self.bytes_sent,
+            'last_seq': self.framer.seq,
+            'last_error': self.last_error,
+        }
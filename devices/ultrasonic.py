@@ -1,64 +1,172 @@
 import Jetson.GPIO as GPIO
+import threading
 import time
+from collections import deque
+
+SPEED_OF_SOUND_HALF = 17150  # cm/s, there and back
 
-import Jetson.GPIO as GPIO
-import time
 
 class UltrasonicSensor:
-    def __init__(self, trig_pin, echo_pin, timeout=0.04):
+    def __init__(self, trig_pin, echo_pin, timeout=0.04, name=None, history=20):
         self.trig = trig_pin
         self.echo = echo_pin
+        self.name = name if name is not None else f"sonar_{trig_pin}"
         GPIO.setup(self.trig, GPIO.OUT)
         GPIO.setup(self.echo, GPIO.IN)
         GPIO.output(self.trig, False)
         self.timeout=timeout
+
+        # Echo edges are timestamped in the GPIO callback instead of
+        # spinning on GPIO.input(). Callbacks run milliseconds after the
+        # edge, when a short echo may already be over, so the pin level
+        # can't tell rise from fall: the first edge after a trigger is the
+        # rise and the second the fall
+        self.rise_time = None
+        self.edges = 0
+        self.echo_done = threading.Event()
+        self.latest = None  # (distance_cm or None, timestamp)
+        self.history = deque(maxlen=history)
+        self.lock = threading.Lock()
+
         time.sleep(0.1)  # Sensor settle time
+        GPIO.add_event_detect(self.echo, GPIO.BOTH, callback=self._on_edge)
 
-    def get_distance(self):
-        # Send trigger pulse
+    def _on_edge(self, channel):
+        now = time.monotonic()
+        self.edges += 1
+        if self.edges == 1:
+            self.rise_time = now
+            return
+        if self.edges > 2 or self.rise_time is None:
+            return
+        pulse_duration = now - self.rise_time
+        self.rise_time = None
+        if pulse_duration <= self.timeout:
+            self._store(round(pulse_duration * SPEED_OF_SOUND_HALF, 2), now)
+        else:
+            self._store(None, now)
+        self.echo_done.set()
+
+    def _store(self, distance, timestamp):
+        with self.lock:
+            self.latest = (distance, timestamp)
+            self.history.append(self.latest)
+
+    def trigger(self):
+        """Fire one ping without waiting for the echo"""
+        self.rise_time = None
+        self.edges = 0
+        self.echo_done.clear()
         GPIO.output(self.trig, True)
-        time.sleep(0.0001)
+        time.sleep(0.00001)
         GPIO.output(self.trig, False)
 
-        # Wait for echo start
-        pulse_start = time.time()
-        timeout = pulse_start + self.timeout
-        while GPIO.input(self.echo) == 0:
-            pulse_start = time.time()
-            if pulse_start > timeout:
-                return None
+    def wait_for_echo(self):
+        # Echo starts up to ~0.5 ms after the trigger and lasts at most timeout
+        if not self.echo_done.wait(self.timeout + 0.01):
+            self._store(None, time.monotonic())
+            return None
+        return self.latest[0]
 
-        # Wait for echo end
-        pulse_end = time.time()
-        timeout = pulse_end + self.timeout
-        while GPIO.input(self.echo) == 1:
-            pulse_end = time.time()
-            if pulse_end > timeout:
-                return None 
+    def get_distance(self):
+        self.trigger()
+        return self.wait_for_echo()
 
-        pulse_duration = pulse_end - pulse_start
-        distance_cm = pulse_duration * 17150
+    def get_latest(self):
+        """Most recent (distance_cm, timestamp) without triggering, None before the first ping"""
+        with self.lock:
+            return self.latest
 
-        return round(distance_cm, 2)
+    def get_history(self):
+        with self.lock:
+            return list(self.history)
 
     def cleanup(self):
+        GPIO.remove_event_detect(self.echo)
         GPIO.cleanup([self.trig, self.echo])
 
+
+class UltrasonicArray:
+    """
+    Polls several sonars on a staggered schedule in a background thread.
+
+    groups is a list of lists of sensors; sensors in the same group fire
+    together (use it only for sonars that can't hear each other, e.g. facing
+    opposite ways), groups fire one after another. Each slot lasts slot_time,
+    long enough for stray echoes to die out before the next group pings.
+    """
+
+    def __init__(self, sensors, groups=None, slot_time=0.06):
+        self.sensors = {sensor.name: sensor for sensor in sensors}
+        self.groups = groups if groups is not None else [[sensor] for sensor in sensors]
+        self.slot_time = slot_time
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        next_slot = time.monotonic()
+        while self.running:
+            for group in self.groups:
+                for sensor in group:
+                    sensor.trigger()
+                for sensor in group:
+                    sensor.wait_for_echo()
+
+                next_slot += self.slot_time
+                delay = next_slot - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_slot = time.monotonic()
+                if not self.running:
+                    return
+
+    def get_readings(self):
+        """{name: (distance_cm, timestamp)} for every sensor that has reported"""
+        readings = {}
+        for name, sensor in self.sensors.items():
+            latest = sensor.get_latest()
+            if latest is not None:
+                readings[name] = latest
+        return readings
+
+    def get_min_distance(self, max_age=0.5):
+        """Closest fresh reading in meters across all sensors, or None"""
+        now = time.monotonic()
+        distances = [distance / 100.0 for distance, timestamp in self.get_readings().values()
+                     if distance is not None and now - timestamp <= max_age]
+        return min(distances) if distances else None
+
+    def cleanup(self):
+        self.stop()
+        for sensor in self.sensors.values():
+            sensor.cleanup()
+
+
 if __name__ == '__main__':
     sensor = UltrasonicSensor(trig_pin=11, echo_pin=13)
+    # Add more sensors here; they are pinged one slot after another
+    sonars = UltrasonicArray([sensor])
+    sonars.start()
 
     try:
         while True:
-            dist = sensor.get_distance()
-            if dist is None:
-                print("Timeout or no echo detected")
-            else:
-                print(f"Distance: {dist} cm")
+            for name, (dist, stamp) in sonars.get_readings().items():
+                if dist is None:
+                    print(f"{name}: timeout or no echo detected")
+                else:
+                    print(f"{name}: {dist} cm ({time.monotonic() - stamp:.3f}s old)")
             time.sleep(1)
 
     except KeyboardInterrupt:
         print("Stopping")
 
     finally:
-        sensor.cleanup()
-
+        sonars.cleanup()
@@ -2,29 +2,52 @@ import serial
 import threading
 import time
 import sys
+import os
 from devices.compass import Compass
 from devices.gps import GPS
 from devices.lidar import Lidar
+from devices.arduino_link import BAUDRATE
 from devices.camera import Camera  # Add camera import
 #from devices.ultrasonic import UltrasonicSensor
 from navigation.ftg import FollowTheGapWorker
 from navigation.waypoint import WaypointNavigator
 from navigation.navigation_vision_enhanced import HybridNavigator
 from navigation.main_navigation import EnhancedHybridNavigator
+from navigation.pose import PoseEstimator
+from navigation.route import load_route
+from navigation.geofence import load_geofence
+from navigation.grid_planner import GridPlanner
+from navigation.fusion import CameraModel
 
 def main():
     compass = Compass()
     gps = GPS()
     lidar = Lidar("/dev/ttyUSB2")
-    camera = Camera()  # Initialize camera
+    # Lens calibration from test_applications/calibrate_camera.py, if it has been run
+    camera = Camera(calibration="camera_calibration.npz" if os.path.exists("camera_calibration.npz") else None)
+    intrinsics = camera.get_intrinsics()
+    camera_model = CameraModel.from_intrinsics(*intrinsics) if intrinsics else None
     
+    # Fuse GPS, compass and commanded motion into a 50 Hz pose
+    pose_estimator = PoseEstimator(gps, compass, rate_hz=50)
+    pose_estimator.start()
+
     # Initialize navigation components
     ftg = FollowTheGapWorker(lidar)
-    waypoint = WaypointNavigator(gps, compass, [(40.036920, -86.907327), (40.0368575, -86.9073315),(40.0367538, -86.9071431)])
+    # Route file (GPX/GeoJSON/CSV) from the command line, otherwise the test loop
+    if len(sys.argv) > 1:
+        route = load_route(sys.argv[1])
+    else:
+        route = [(40.036920, -86.907327), (40.0368575, -86.9073315),(40.0367538, -86.9071431)]
+    # Optional campus boundary / keep-out zones as GeoJSON polygons
+    geofence = load_geofence(sys.argv[2]) if len(sys.argv) > 2 else None
+    waypoint = WaypointNavigator(gps, compass, route, pose_estimator=pose_estimator, geofence=geofence)
+    # Detours around dead ends FTG can't get out of
+    grid_planner = GridPlanner.for_route(waypoint.route, geofence)
     
     # Connect to Arduino and start navigation
     try:
-        with serial.Serial("/dev/ttyACM0", 9600, timeout=2) as ser:
+        with serial.Serial("/dev/ttyACM0", BAUDRATE, timeout=2) as ser:
             time.sleep(2)
             print("Connected to Arduino")
             
@@ -34,7 +57,9 @@ def main():
                 ftg_navigator=ftg,
                 waypoint_navigator=waypoint,
                 camera=camera,
-                ser=ser
+                ser=ser,
+                grid_planner=grid_planner,
+                camera_model=camera_model
             )
             time.sleep(2)
             print(camera.get_camera_status())
@@ -51,7 +76,7 @@ def main():
     finally:
         # Cleanup
         if 'nav' in locals():
-            nav.stop_robot()
+            nav.stop_robot(wait=True)
         print("Navigation system shutdown")
 
 
@@ -0,0 +1,127 @@
+import math
+import numpy as np
+
+# Nearly-straight arcs are evaluated as circles of this curvature so one
+# formula covers every candidate (1e6 m radius is straight to well under a
+# micrometre over the horizon)
+MIN_CURVATURE = 1e-6
+
+
+def scan_to_points(scan):
+    """Lidar scan [(angle_deg clockwise, dist_mm), ...] to robot-frame (x forward, y left) meters"""
+    if not scan:
+        return np.empty((0, 2))
+    data = np.asarray(scan, dtype=float)
+    angles = np.radians(data[:, 0])
+    ranges = data[:, 1] / 1000.0
+    return np.column_stack((ranges * np.cos(angles), -ranges * np.sin(angles)))
+
+
+class ArcCollisionChecker:
+    """
+    Sweeps the robot footprint along constant-curvature arcs through the
+    latest scan.
+
+    set_scan() converts a scan to robot-frame points once; check() then
+    tests any number of arcs against all points as one (arcs x points)
+    array operation. Radii are signed like turn_while_moving (positive
+    turns left, inf drives straight) and speeds are wheel RPM.
+
+    The footprint is a rectangle half_width (plus margin) either side of the
+    path whose front edge is front meters ahead of the lidar. A point is hit
+    if it lies in the band the arc sweeps; the distance to it is the arc
+    length until the front edge reaches it. Corner swing of the rear on
+    tight turns is not modelled.
+
+    set_predicted() adds points that aren't in the scan yet, e.g. where
+    tracked moving obstacles are heading; they are checked like scan points
+    until replaced.
+    """
+
+    def __init__(self, half_width=0.3, front=0.35, margin=0.05, horizon=3.0, wheel_radius=0.05):
+        self.half_width = half_width + margin
+        self.front = front
+        self.horizon = horizon
+        self.speed_scale = 2 * math.pi * wheel_radius / 60.0  # m/s per RPM
+        self.scan_points = np.empty((0, 2))
+        self.predicted_points = np.empty((0, 2))
+        self.points = np.empty((0, 2))
+        self.range_sq = np.empty(0)
+        self.scan_seq = None
+
+    def set_scan(self, scan, seq=None):
+        if seq is not None and seq == self.scan_seq:
+            return
+        self.scan_points = scan_to_points(scan)
+        self.scan_seq = seq
+        self._combine()
+
+    def set_predicted(self, points):
+        """Extra robot-frame (x forward, y left) points to keep clear of"""
+        self.predicted_points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self._combine()
+
+    def _combine(self):
+        self.points = np.concatenate((self.scan_points, self.predicted_points))
+        self.range_sq = np.einsum('ij,ij->i', self.points, self.points)
+
+    def free_distance(self, radii):
+        """Arc length each arc can drive before the footprint touches a point (horizon if none)"""
+        radii = np.atleast_1d(np.asarray(radii, dtype=float))
+        free = np.full(radii.shape, self.horizon)
+        if not len(self.points):
+            return free
+
+        curvature = np.where(np.isinf(radii), 0.0, 1.0 / np.where(radii == 0, np.inf, radii))
+        sign = np.where(curvature < 0, -1.0, 1.0)
+        radius = sign / np.maximum(np.abs(curvature), MIN_CURVATURE)
+        abs_radius = np.abs(radius)
+
+        # A point is in the swept band if its distance from the turn centre
+        # (0, radius) is within half_width of |radius|; compared squared so
+        # the full arcs x points pass needs no square roots
+        x, y = self.points[:, 0], self.points[:, 1]
+        centre_sq = self.range_sq[None, :] - 2 * radius[:, None] * y[None, :] + (radius * radius)[:, None]
+        inner = np.maximum(abs_radius - self.half_width, 0.0)
+        outer = abs_radius + self.half_width
+        hit = (centre_sq >= (inner * inner)[:, None]) & (centre_sq <= (outer * outer)[:, None])
+
+        # How far round the arc each hit point is, only for the hits
+        rows, cols = np.nonzero(hit)
+        if not len(rows):
+            return free
+        swept = np.arctan2(x[cols], sign[rows] * (radius[rows] - y[cols])) % (2 * math.pi)
+        travel = np.maximum(abs_radius[rows] * swept - self.front, 0.0)
+        starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        free[rows[starts]] = np.minimum(np.minimum.reduceat(travel, starts), self.horizon)
+        return free
+
+    def check(self, radii, speed):
+        """(free distance in m, time to collision in s) per arc; time is inf if nothing within horizon"""
+        distance = self.free_distance(radii)
+        velocity = abs(speed) * self.speed_scale
+        with np.errstate(divide='ignore'):
+            ttc = np.where(distance >= self.horizon, np.inf, distance / velocity if velocity > 0 else np.inf)
+        return distance, ttc
+
+    def check_arc(self, radius, speed):
+        distance, ttc = self.check([radius], speed)
+        return float(distance[0]), float(ttc[0])
+
+    def closest_clear_arc(self, radius, speed, candidates, min_time):
+        """
+        radius itself if its arc is clear for min_time at speed, otherwise the
+        candidate closest to it in curvature that is (None if none is). All
+        arcs are checked in one pass. Returns (radius, free distance of the
+        commanded arc).
+        """
+        radii = np.concatenate(([radius], candidates))
+        distance, ttc = self.check(radii, speed)
+        if ttc[0] >= min_time:
+            return radius, float(distance[0])
+        clear = np.flatnonzero(ttc >= min_time)
+        if not clear.size:
+            return None, float(distance[0])
+        curvature = np.where(np.isinf(radii), 0.0, 1.0 / radii)
+        best = clear[np.argmin(np.abs(curvature[clear] - curvature[0]))]
+        return float(radii[best]), float(distance[0])
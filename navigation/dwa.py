@@ -0,0 +1,112 @@
+import math
+import numpy as np
+
+from navigation.collision import ArcCollisionChecker
+
+
+class DWAPlanner:
+    """
+    Dynamic Window Approach over the arcs turn_while_moving can execute.
+
+    Each call samples (speed, yaw rate) pairs inside the window reachable
+    within one control period from the current motion (odometry velocity
+    and yaw rate) under max_accel / max_yaw_accel. Every sample is an arc;
+    all of them are rolled out over horizon seconds and checked against the
+    scan at once. Arcs that can't stop within their free distance or would
+    hit something sooner than min_time_to_collision are dropped, and the rest
+    are scored on
+
+        heading    how well the end of the rollout faces the goal
+        clearance  free distance along the arc, capped at clearance_cap
+        speed      forward speed
+
+    Angles are in the robot frame with positive to the left, like the turn
+    radius. Speeds in and out are wheel RPM.
+    """
+
+    def __init__(self, checker=None, max_speed=60, min_speed=10, max_accel=0.5, max_yaw_rate=1.5,
+                 max_yaw_accel=2.0, period=0.1, horizon=2.0, min_radius=0.6, speed_samples=7,
+                 yaw_samples=21, min_time_to_collision=1.5, clearance_cap=2.0,
+                 weights=(1.0, 0.6, 0.3), wheel_radius=0.05):
+        self.checker = checker if checker is not None else ArcCollisionChecker(wheel_radius=wheel_radius)
+        self.speed_scale = 2 * math.pi * wheel_radius / 60.0  # m/s per RPM
+        self.max_speed = max_speed * self.speed_scale
+        self.min_speed = min_speed * self.speed_scale
+        self.max_accel = max_accel
+        self.max_yaw_rate = max_yaw_rate
+        self.max_yaw_accel = max_yaw_accel
+        self.period = period
+        self.horizon = horizon
+        self.min_radius = min_radius
+        self.speed_samples = speed_samples
+        self.yaw_samples = yaw_samples
+        self.min_time_to_collision = min_time_to_collision
+        self.clearance_cap = clearance_cap
+        self.weights = weights
+        self.last_scores = None
+
+    def window(self, velocity, yaw_rate):
+        """(speeds m/s, yaw rates rad/s) sampled within one period of the current motion"""
+        v_low = max(self.min_speed, velocity - self.max_accel * self.period)
+        v_high = min(self.max_speed, max(velocity, 0.0) + self.max_accel * self.period)
+        v_high = max(v_high, v_low)
+        w_low = max(-self.max_yaw_rate, yaw_rate - self.max_yaw_accel * self.period)
+        w_high = min(self.max_yaw_rate, yaw_rate + self.max_yaw_accel * self.period)
+        speeds = np.linspace(v_low, v_high, self.speed_samples)
+        # Always offer driving straight so a clear path ahead is never out of the window
+        yaw_rates = np.union1d(np.linspace(w_low, w_high, self.yaw_samples), [0.0])
+        return speeds, yaw_rates
+
+    def rollout(self, speeds, curvatures):
+        """End pose (x forward, y left, heading) after horizon seconds on each arc"""
+        s = speeds * self.horizon
+        theta = curvatures * s
+        straight = np.abs(curvatures) < 1e-9
+        safe = np.where(straight, 1.0, curvatures)
+        x = np.where(straight, s, np.sin(theta) / safe)
+        y = np.where(straight, 0.0, (1 - np.cos(theta)) / safe)
+        return x, y, theta
+
+    def plan(self, scan, goal_bearing, goal_distance=None, velocity=0.0, yaw_rate=0.0, scan_seq=None):
+        """
+        goal_bearing is the goal's direction in the robot frame (radians,
+        positive left) and goal_distance its range if known. yaw_rate is
+        positive when turning left. Returns (speed RPM, signed radius), with
+        speed 0 if no arc is admissible.
+        """
+        self.checker.set_scan(scan, scan_seq)
+        speeds, yaw_rates = self.window(velocity, yaw_rate)
+        v, w = np.meshgrid(speeds, yaw_rates, indexing='ij')
+        v, w = v.ravel(), w.ravel()
+        curvature = w / v
+        feasible = np.abs(curvature) <= 1.0 / self.min_radius
+        v, w, curvature = v[feasible], w[feasible], curvature[feasible]
+        if not len(v):
+            return 0, float('inf')
+
+        with np.errstate(divide='ignore'):
+            radii = np.where(curvature == 0, np.inf, 1.0 / curvature)
+        free = self.checker.free_distance(radii)
+        # Must be able to brake within the free distance and keep min_time_to_collision
+        admissible = (v * v <= 2 * self.max_accel * free) & (free >= v * self.min_time_to_collision)
+        if not admissible.any():
+            self.last_scores = None
+            return 0, float('inf')
+
+        x, y, theta = self.rollout(v, curvature)
+        if goal_distance is not None:
+            goal_x = goal_distance * math.cos(goal_bearing)
+            goal_y = goal_distance * math.sin(goal_bearing)
+            to_goal = np.arctan2(goal_y - y, goal_x - x) - theta
+        else:
+            to_goal = goal_bearing - theta
+        to_goal = (to_goal + math.pi) % (2 * math.pi) - math.pi
+
+        heading_weight, clearance_weight, speed_weight = self.weights
+        scores = (heading_weight * (1 - np.abs(to_goal) / math.pi)
+                  + clearance_weight * np.minimum(free, self.clearance_cap) / self.clearance_cap
+                  + speed_weight * v / self.max_speed)
+        scores = np.where(admissible, scores, -np.inf)
+        self.last_scores = scores
+        best = int(np.argmax(scores))
+        return float(v[best] / self.speed_scale), float(radii[best])
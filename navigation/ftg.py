@@ -9,6 +9,7 @@ class FollowTheGapWorker:
         self.min_gap_dist = min_gap_dist
         self.lock = threading.Lock()
         self.latest_angle = None  # in radians
+        self.latest_seq = None    # lidar scan sequence latest_angle came from
         self.running = True
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
@@ -56,16 +57,30 @@ class FollowTheGapWorker:
 
     def _run(self):
         while True:
-            scan =  self.lidar.get_scan()
-            if scan != None :
+            scan, _, seq = self.lidar.get_scan_stamped()
+            if scan != None and seq != self.latest_seq:
                 best_angle = self._follow_the_gap(scan)
                 with self.lock:
                     self.latest_angle = best_angle
+                    self.latest_seq = seq
             time.sleep(0.1)
 
     def get_current_gap_angle(self):
         with self.lock:
             return self.latest_angle
+
+    def gap_for_scan(self, scan, seq):
+        """
+        Gap angle for a specific scan: the worker's result if it was computed
+        from that revolution, otherwise computed here so the caller never
+        mixes a gap from one scan with ranges from another.
+        """
+        with self.lock:
+            if seq == self.latest_seq:
+                return self.latest_angle
+        if not scan:
+            return None
+        return self._follow_the_gap(scan)
     
     def stop(self):
         self.running = False
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+
+
+class CameraModel:
+    """
+    Pinhole camera with Brown-Conrady distortion (k1, k2, p1, p2, k3, the
+    OpenCV order) mounted on the robot. Extrinsics are relative to the lidar:
+    yaw is the camera's optical axis in radians, positive to the left, and
+    offset its (forward, left) position in meters.
+    """
+
+    def __init__(self, width, height, fx, fy, cx, cy, distortion=None, yaw=0.0, offset=(0.0, 0.0)):
+        self.width = width
+        self.height = height
+        self.fx, self.fy, self.cx, self.cy = fx, fy, cx, cy
+        self.distortion = np.zeros(5)
+        if distortion is not None:
+            # OpenCV returns 4, 5 or more coefficients; only the first five are modelled
+            coefficients = np.ravel(np.asarray(distortion, dtype=float))[:5]
+            self.distortion[:len(coefficients)] = coefficients
+        self.yaw = yaw
+        self.offset = tuple(offset)
+
+    @classmethod
+    def from_fov(cls, width=640, height=480, fov_deg=60.0, **kwargs):
+        """Undistorted camera with the given horizontal field of view, e.g. before calibration"""
+        f = (width / 2) / math.tan(math.radians(fov_deg) / 2)
+        return cls(width, height, f, f, width / 2, height / 2, **kwargs)
+
+    @classmethod
+    def from_intrinsics(cls, camera_matrix, distortion, size, **kwargs):
+        """From an OpenCV camera matrix, e.g. Camera.get_intrinsics()"""
+        camera_matrix = np.asarray(camera_matrix, dtype=float)
+        return cls(size[0], size[1], camera_matrix[0, 0], camera_matrix[1, 1],
+                   camera_matrix[0, 2], camera_matrix[1, 2], distortion=distortion, **kwargs)
+
+    def undistort_points(self, u, v, iterations=5):
+        """Pixel coordinates to normalised image coordinates with distortion removed"""
+        k1, k2, p1, p2, k3 = self.distortion
+        x_d = (np.asarray(u, dtype=float) - self.cx) / self.fx
+        y_d = (np.asarray(v, dtype=float) - self.cy) / self.fy
+        x, y = x_d, y_d
+        if not self.distortion.any():
+            return x, y
+        for _ in range(iterations):
+            r2 = x * x + y * y
+            radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+            dx = 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+            dy = p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+            x = (x_d - dx) / radial
+            y = (y_d - dy) / radial
+        return x, y
+
+    def column_bearings(self, columns):
+        """Bearing (radians, positive left, in the lidar's orientation) of pixel columns on the principal row"""
+        x, _ = self.undistort_points(columns, np.full(np.shape(columns), self.cy))
+        return self.yaw - np.arctan(x)
+
+
+class CameraLidarFusion:
+    """
+    Ranges camera detections with the lidar.
+
+    A pixel-column -> bearing table is built once from the camera model.
+    Each scan is re-expressed as bearings from the camera's position and
+    binned onto image columns (nearest return per column), then every
+    detection box is masked against that column profile in one array pass to
+    give min / median range over the box's bearing span. The lidar sees a
+    single plane, so a box is only ranged where it crosses that plane's
+    bearings; boxes with no return in their span fall back to a size-based
+    estimate and are marked unconfirmed.
+
+    Scan angles are the RPLidar's, clockwise from forward seen from above
+    (like scan_to_points), so a return at 10 degrees is right of the image
+    centre; test_applications/fusion_sign_check.py checks this.
+    """
+
+    def __init__(self, camera_model, zone=None, min_overlap=0.3):
+        self.camera = camera_model
+        width = camera_model.width
+        # Bearings of the column boundaries, left edge of column 0 first (decreasing)
+        self.column_edges = camera_model.column_bearings(np.arange(width + 1) - 0.5)
+        self.column_centres = camera_model.column_bearings(np.arange(width))
+        self.zone = zone if zone is not None else (0, 0, width, camera_model.height)
+        self.min_overlap = min_overlap
+        self.scan_seq = None
+        self.column_ranges = np.full(width, np.nan)
+
+    def bin_scan(self, scan, seq=None):
+        """Nearest lidar return (m) seen from the camera in each image column, nan where none"""
+        if seq is not None and seq == self.scan_seq:
+            return self.column_ranges
+        self.scan_seq = seq
+        self.column_ranges = np.full(self.camera.width, np.nan)
+        if not scan:
+            return self.column_ranges
+
+        data = np.asarray(scan, dtype=float)
+        angles = np.radians(data[:, 0])
+        ranges = data[:, 1] / 1000.0
+        forward, left = self.camera.offset
+        x = ranges * np.cos(angles) - forward
+        y = -ranges * np.sin(angles) - left
+        bearing = np.arctan2(y, x)
+        distance = np.hypot(x, y)
+
+        # Edges decrease left to right; search the reversed (ascending) copy
+        edges = self.column_edges[::-1]
+        index = np.searchsorted(edges, bearing)
+        inside = (index > 0) & (index < len(edges)) & (x > 0)
+        columns = self.camera.width - index[inside]
+        np.fmin.at(self.column_ranges, columns, distance[inside])
+        return self.column_ranges
+
+    def in_path(self, boxes):
+        """Vectorised forward-zone test: centre in the zone or min_overlap of the box inside it"""
+        x, y, w, h = boxes.T
+        left, top, right, bottom = self.zone
+        cx, cy = x + w / 2, y + h / 2
+        centre_inside = (left <= cx) & (cx <= right) & (top <= cy) & (cy <= bottom)
+        overlap_w = np.clip(np.minimum(x + w, right) - np.maximum(x, left), 0, None)
+        overlap_h = np.clip(np.minimum(y + h, bottom) - np.maximum(y, top), 0, None)
+        area = np.maximum(w * h, 1)
+        return centre_inside | (overlap_w * overlap_h / area > self.min_overlap)
+
+    def fuse(self, objects, scan, seq=None):
+        """
+        One dict per detection: the object, its bearing (radians, positive
+        left), 'range_min' / 'range_median' / 'lidar_columns' over its span,
+        'distance' (the min, or an estimate from the box size without
+        lidar), 'lidar_confirmed' and 'in_path'.
+        """
+        if not objects:
+            return []
+        column_ranges = self.bin_scan(scan, seq)
+        boxes = np.array([obj['bbox'] for obj in objects], dtype=float)
+        width = self.camera.width
+
+        first = np.clip(np.floor(boxes[:, 0]), 0, width - 1).astype(int)
+        last = np.clip(np.ceil(boxes[:, 0] + boxes[:, 2]) - 1, 0, width - 1).astype(int)
+        columns = np.arange(width)
+        span = (columns[None, :] >= first[:, None]) & (columns[None, :] <= last[:, None])
+        ranged = np.where(span, column_ranges[None, :], np.nan)
+        counts = np.count_nonzero(~np.isnan(ranged), axis=1)
+        confirmed = counts > 0
+
+        range_min = np.full(len(objects), np.nan)
+        range_median = np.full(len(objects), np.nan)
+        if confirmed.any():
+            range_min[confirmed] = np.nanmin(ranged[confirmed], axis=1)
+            range_median[confirmed] = np.nanmedian(ranged[confirmed], axis=1)
+
+        area = np.maximum(boxes[:, 2] * boxes[:, 3], 1)
+        estimate = np.maximum(0.5, 4.0 * (width * self.camera.height) / (area * 1000))
+        distance = np.where(confirmed, range_min, estimate)
+        in_path = self.in_path(boxes)
+        bearings = self.column_centres[((first + last) // 2)]
+
+        return [{
+            'object': obj,
+            'camera_center': obj.get('center'),
+            'bearing': float(bearings[k]),
+            'range_min': float(range_min[k]) if confirmed[k] else None,
+            'range_median': float(range_median[k]) if confirmed[k] else None,
+            'lidar_columns': int(counts[k]),
+            'distance': float(distance[k]),
+            'lidar_confirmed': bool(confirmed[k]),
+            'in_path': bool(in_path[k]),
+        } for k, obj in enumerate(objects)]
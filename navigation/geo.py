@@ -0,0 +1,32 @@
+import math
+
+EARTH_RADIUS = 6371000  # meters, same value the haversine in waypoint.py uses
+
+
+class LocalProjection:
+    """
+    Equirectangular projection onto a local tangent plane (east, north in meters).
+    Good to centimeters over the few hundred meters our routes span.
+    """
+
+    def __init__(self, origin_lat, origin_lon):
+        self.origin_lat = origin_lat
+        self.origin_lon = origin_lon
+        self.cos_lat = math.cos(math.radians(origin_lat))
+        self.meters_per_deg_lat = math.radians(1) * EARTH_RADIUS
+        self.meters_per_deg_lon = self.meters_per_deg_lat * self.cos_lat
+
+    def to_enu(self, lat, lon):
+        east = (lon - self.origin_lon) * self.meters_per_deg_lon
+        north = (lat - self.origin_lat) * self.meters_per_deg_lat
+        return east, north
+
+    def to_latlon(self, east, north):
+        lat = self.origin_lat + north / self.meters_per_deg_lat
+        lon = self.origin_lon + east / self.meters_per_deg_lon
+        return lat, lon
+
+
+def wrap_angle(angle):
+    """Wrap to [-pi, pi)"""
+    return (angle + math.pi) % (2 * math.pi) - math.pi
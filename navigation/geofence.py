@@ -0,0 +1,202 @@
+import json
+import math
+import numpy as np
+
+from navigation.geo import LocalProjection
+
+FORBIDDEN = 0
+ALLOWED = 1
+EDGE = 2
+
+
+def points_in_polygon(px, py, polygon):
+    """Even-odd rule for arrays of points against one ENU polygon (N x 2)"""
+    inside = np.zeros(np.shape(px), dtype=bool)
+    x1, y1 = polygon[-1]
+    for x2, y2 in polygon:
+        crosses = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_intersect = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (px < x_intersect)
+        x1, y1 = x2, y2
+    return inside
+
+
+def load_geofence(path, cell_size=1.0, projection=None):
+    """
+    GeoJSON with Polygon/MultiPolygon features. A feature whose properties
+    have "zone": "boundary" is the area the robot must stay inside; every
+    other polygon is a keep-out zone. Holes in the boundary become keep-outs.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    boundary = None
+    keep_out = []
+    for feature in features:
+        geometry = feature.get('geometry', feature)
+        properties = feature.get('properties') or {}
+        if geometry['type'] == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry['type'] == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+        for rings in polygons:
+            # GeoJSON stores [lon, lat]
+            rings = [[(c[1], c[0]) for c in ring] for ring in rings]
+            if properties.get('zone') == 'boundary':
+                boundary = rings[0]
+                keep_out.extend(rings[1:])
+            else:
+                keep_out.append(rings[0])
+
+    print(f"Loaded geofence from {path}: {'1 boundary' if boundary else 'no boundary'}, "
+          f"{len(keep_out)} keep-out zones")
+    return Geofence(boundary, keep_out, cell_size, projection)
+
+
+class Geofence:
+    """
+    Campus boundary plus keep-out polygons rasterised once onto an ENU grid.
+
+    Cells entirely inside or outside are answered by a single array lookup;
+    only cells crossed by a polygon edge fall back to an exact
+    point-in-polygon test against the few polygons touching that cell.
+    """
+
+    def __init__(self, boundary=None, keep_out=(), cell_size=1.0, projection=None):
+        polygons_latlon = ([boundary] if boundary is not None else []) + list(keep_out)
+        if not polygons_latlon:
+            raise ValueError("Geofence needs a boundary or at least one keep-out zone")
+
+        if projection is None:
+            origin = np.concatenate([np.asarray(p, dtype=float) for p in polygons_latlon]).mean(axis=0)
+            projection = LocalProjection(origin[0], origin[1])
+        self.projection = projection
+        self.cell_size = cell_size
+
+        def to_enu(polygon):
+            polygon = np.asarray(polygon, dtype=float)
+            east, north = projection.to_enu(polygon[:, 0], polygon[:, 1])
+            return np.column_stack((east, north))
+
+        self.boundary = to_enu(boundary) if boundary is not None else None
+        self.keep_out = [to_enu(p) for p in keep_out]
+
+        all_points = np.concatenate(([self.boundary] if self.boundary is not None else []) + self.keep_out)
+        margin = 2 * cell_size
+        self.min_corner = all_points.min(axis=0) - margin
+        size = np.ceil((all_points.max(axis=0) + margin - self.min_corner) / cell_size).astype(int)
+        self.shape = (int(size[0]), int(size[1]))
+
+        self._rasterize()
+
+    def _cell_centers(self, x0, x1, y0, y1):
+        xs = self.min_corner[0] + (np.arange(x0, x1) + 0.5) * self.cell_size
+        ys = self.min_corner[1] + (np.arange(y0, y1) + 0.5) * self.cell_size
+        return np.meshgrid(xs, ys, indexing='ij')
+
+    def _polygon_cells(self, polygon):
+        """Cell index bounds of a polygon's bounding box, clipped to the grid"""
+        lo = np.floor((polygon.min(axis=0) - self.min_corner) / self.cell_size).astype(int)
+        hi = np.ceil((polygon.max(axis=0) - self.min_corner) / self.cell_size).astype(int) + 1
+        lo = np.maximum(lo, 0)
+        hi = np.minimum(hi, self.shape)
+        return lo[0], hi[0], lo[1], hi[1]
+
+    def _edge_cells(self, polygon):
+        """Cells crossed by the polygon outline, dilated by one cell to be safe"""
+        closed = np.vstack((polygon, polygon[:1]))
+        samples = []
+        for start, end in zip(closed[:-1], closed[1:]):
+            steps = max(1, int(math.ceil(np.hypot(*(end - start)) / (self.cell_size / 4))))
+            samples.append(start + np.outer(np.linspace(0, 1, steps + 1), end - start))
+        cells = np.floor((np.concatenate(samples) - self.min_corner) / self.cell_size).astype(int)
+        dilated = [cells + (dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+        cells = np.unique(np.concatenate(dilated), axis=0)
+        valid = ((cells >= 0) & (cells < self.shape)).all(axis=1)
+        return cells[valid]
+
+    def _rasterize(self):
+        inside_boundary = np.full(self.shape, self.boundary is None)
+        if self.boundary is not None:
+            x0, x1, y0, y1 = self._polygon_cells(self.boundary)
+            cx, cy = self._cell_centers(x0, x1, y0, y1)
+            inside_boundary[x0:x1, y0:y1] = points_in_polygon(cx, cy, self.boundary)
+
+        cover_count = np.zeros(self.shape, dtype=np.uint16)
+        for polygon in self.keep_out:
+            x0, x1, y0, y1 = self._polygon_cells(polygon)
+            cx, cy = self._cell_centers(x0, x1, y0, y1)
+            cover_count[x0:x1, y0:y1] += points_in_polygon(cx, cy, polygon)
+
+        self.grid = np.where(inside_boundary & (cover_count == 0), ALLOWED, FORBIDDEN).astype(np.uint8)
+
+        # Cells near an outline need the exact test against the polygons whose
+        # edges pass nearby (-1 is the boundary). Every other polygon either
+        # covers the whole cell or misses it, so its verdict at the cell
+        # centre is stored alongside.
+        near = {}
+        outlines = ([(-1, self.boundary)] if self.boundary is not None else []) + list(enumerate(self.keep_out))
+        for polygon_id, polygon in outlines:
+            for cell in map(tuple, self._edge_cells(polygon)):
+                near.setdefault(cell, []).append(polygon_id)
+
+        self.edge_cells = {}
+        for cell, polygon_ids in near.items():
+            center = self.min_corner + (np.array(cell) + 0.5) * self.cell_size
+            listed_cover = sum(bool(points_in_polygon(center[0], center[1], self.keep_out[k]))
+                               for k in polygon_ids if k != -1)
+            forbidden_elsewhere = (cover_count[cell] - listed_cover > 0 or
+                                   (-1 not in polygon_ids and not inside_boundary[cell]))
+            self.edge_cells[cell] = (polygon_ids, forbidden_elsewhere)
+            self.grid[cell] = EDGE
+
+    def _exact(self, east, north, cell):
+        polygon_ids, forbidden_elsewhere = self.edge_cells[cell]
+        if forbidden_elsewhere:
+            return False
+        for polygon_id in polygon_ids:
+            if polygon_id == -1:
+                if not points_in_polygon(east, north, self.boundary):
+                    return False
+            elif points_in_polygon(east, north, self.keep_out[polygon_id]):
+                return False
+        return True
+
+    def is_allowed_enu(self, east, north):
+        i = int((east - self.min_corner[0]) // self.cell_size)
+        j = int((north - self.min_corner[1]) // self.cell_size)
+        if not (0 <= i < self.shape[0] and 0 <= j < self.shape[1]):
+            return self.boundary is None
+        state = self.grid[i, j]
+        if state != EDGE:
+            return state == ALLOWED
+        return self._exact(east, north, (i, j))
+
+    def is_allowed(self, lat, lon):
+        east, north = self.projection.to_enu(lat, lon)
+        return self.is_allowed_enu(east, north)
+
+    def is_allowed_ahead(self, lat, lon, heading, distance):
+        """Whether the point `distance` meters ahead along a compass heading is allowed"""
+        east, north = self.projection.to_enu(lat, lon)
+        return self.is_allowed_enu(east + distance * math.sin(heading),
+                                   north + distance * math.cos(heading))
+
+    def allowed_mask(self, east, north):
+        """Vectorised check for arrays of ENU points; edge cells use the exact test"""
+        east = np.asarray(east, dtype=float)
+        north = np.asarray(north, dtype=float)
+        i = np.floor((east - self.min_corner[0]) / self.cell_size).astype(int)
+        j = np.floor((north - self.min_corner[1]) / self.cell_size).astype(int)
+        in_grid = (i >= 0) & (i < self.shape[0]) & (j >= 0) & (j < self.shape[1])
+
+        state = np.full(east.shape, ALLOWED if self.boundary is None else FORBIDDEN, dtype=np.uint8)
+        state[in_grid] = self.grid[i[in_grid], j[in_grid]]
+        allowed = state == ALLOWED
+        for k in zip(*np.nonzero(state == EDGE)):
+            allowed[k] = self._exact(east[k], north[k], (int(i[k]), int(j[k])))
+        return allowed
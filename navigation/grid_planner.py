@@ -0,0 +1,469 @@
+import heapq
+import math
+import threading
+import time
+import numpy as np
+
+INF = float('inf')
+SQRT2 = math.sqrt(2)
+
+
+class OccupancyGrid:
+    """
+    ENU-aligned occupancy grid for the global planner.
+
+    Two layers: a static one (prior map, e.g. everything outside the
+    geofence) and lidar hits. Each hit blocks every cell within inflation of
+    it, tracked as a per-cell count so hits can be added and cleared without
+    recomputing the inflation. blocked is the union as a flat bytearray the
+    planner reads directly; updates return the flat indices whose blocked
+    state changed so the planner only repairs those.
+    """
+
+    def __init__(self, min_corner, shape, cell_size=0.25, inflation=0.35, max_range=6.0):
+        self.min_corner = np.asarray(min_corner, dtype=float)
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.cell_size = cell_size
+        self.max_range = max_range
+        self.static = np.zeros(self.shape, dtype=bool)
+        self.hits = np.zeros(self.shape, dtype=bool)
+        self.inflated = np.zeros(self.shape, dtype=np.uint16)  # hits within inflation of each cell
+        self.blocked = bytearray(self.shape[0] * self.shape[1])
+
+        r = int(math.ceil(inflation / cell_size))
+        di, dj = np.mgrid[-r:r + 1, -r:r + 1]
+        disk = di ** 2 + dj ** 2 <= (inflation / cell_size) ** 2
+        self.disk = np.column_stack((di[disk], dj[disk]))
+
+    @classmethod
+    def around(cls, points, margin=10.0, cell_size=0.25, **kwargs):
+        """Grid covering ENU points (N x 2) plus margin meters on every side"""
+        points = np.asarray(points, dtype=float)
+        min_corner = points.min(axis=0) - margin
+        shape = np.ceil((points.max(axis=0) + margin - min_corner) / cell_size).astype(int)
+        return cls(min_corner, shape, cell_size, **kwargs)
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    def cell(self, east, north):
+        i = int((east - self.min_corner[0]) // self.cell_size)
+        j = int((north - self.min_corner[1]) // self.cell_size)
+        if not (0 <= i < self.shape[0] and 0 <= j < self.shape[1]):
+            return None
+        return i * self.shape[1] + j
+
+    def center(self, index):
+        i, j = divmod(index, self.shape[1])
+        return (self.min_corner[0] + (i + 0.5) * self.cell_size,
+                self.min_corner[1] + (j + 0.5) * self.cell_size)
+
+    def cell_centers(self):
+        xs = self.min_corner[0] + (np.arange(self.shape[0]) + 0.5) * self.cell_size
+        ys = self.min_corner[1] + (np.arange(self.shape[1]) + 0.5) * self.cell_size
+        return np.meshgrid(xs, ys, indexing='ij')
+
+    def _cells(self, east, north):
+        """Flat indices of the in-grid cells containing ENU points"""
+        i = np.floor((east - self.min_corner[0]) / self.cell_size).astype(int)
+        j = np.floor((north - self.min_corner[1]) / self.cell_size).astype(int)
+        valid = (i >= 0) & (i < self.shape[0]) & (j >= 0) & (j < self.shape[1])
+        return np.unique(i[valid] * self.shape[1] + j[valid])
+
+    def _refresh(self, cells):
+        """Recompute blocked for flat cells; returns the ones that changed"""
+        cells = np.unique(cells)
+        now = (self.static.flat[cells] | (self.inflated.flat[cells] > 0)).astype(np.uint8)
+        before = np.frombuffer(self.blocked, dtype=np.uint8)[cells]
+        changed = cells[now != before]
+        view = np.frombuffer(self.blocked, dtype=np.uint8)
+        view[changed] = now[now != before]
+        return changed.tolist()
+
+    def set_static(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        cells = np.flatnonzero(mask != self.static)
+        self.static[:] = mask
+        return self._refresh(cells)
+
+    def _inflate(self, cells, delta):
+        if not len(cells):
+            return np.empty(0, dtype=int)
+        i, j = np.divmod(cells, self.shape[1])
+        ni = (i[:, None] + self.disk[:, 0]).ravel()
+        nj = (j[:, None] + self.disk[:, 1]).ravel()
+        valid = (ni >= 0) & (ni < self.shape[0]) & (nj >= 0) & (nj < self.shape[1])
+        flat = ni[valid] * self.shape[1] + nj[valid]
+        np.add.at(self.inflated.reshape(-1), flat, delta)
+        return flat
+
+    def update_scan(self, east, north, heading, scan):
+        """
+        Integrate one lidar revolution taken at (east, north) facing heading
+        (radians clockwise from north). Cells along each beam short of its
+        return are cleared, the return cell is marked. Returns changed cells.
+        """
+        if not scan:
+            return []
+        data = np.asarray(scan, dtype=float)
+        bearings = heading + np.radians(data[:, 0])
+        ranges = data[:, 1] / 1000.0
+        sin_b, cos_b = np.sin(bearings), np.cos(bearings)
+
+        within = ranges < self.max_range
+        hit_cells = self._cells(east + ranges[within] * sin_b[within],
+                                north + ranges[within] * cos_b[within])
+
+        # Free space: samples every half cell along each beam, stopping a cell short of the return
+        step = self.cell_size / 2
+        reach = np.minimum(ranges, self.max_range) - self.cell_size
+        steps = np.arange(step, self.max_range, step)
+        along = np.where(steps[None, :] < reach[:, None], steps[None, :], np.nan)
+        samples = ~np.isnan(along)
+        free_cells = self._cells(east + (along * sin_b[:, None])[samples],
+                                 north + (along * cos_b[:, None])[samples])
+        free_cells = np.setdiff1d(free_cells, hit_cells, assume_unique=True)
+
+        hits = self.hits.reshape(-1)
+        added = hit_cells[~hits[hit_cells]]
+        cleared = free_cells[hits[free_cells]]
+        hits[added] = True
+        hits[cleared] = False
+        touched = np.concatenate((self._inflate(added, 1), self._inflate(cleared, -1)))
+        return self._refresh(touched) if len(touched) else []
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig & Likhachev) on an 8-connected OccupancyGrid.
+
+    The search runs from the goal towards the robot, so when the robot moves
+    or cells change only the affected part of the previous search is
+    repaired instead of planning from scratch. Moves into blocked cells and
+    diagonal moves that cut a blocked corner are not allowed; the robot may
+    always leave the cell it is in. Costs are in cells.
+    """
+
+    def __init__(self, grid, start, goal):
+        self.grid = grid
+        self.cols = grid.shape[1]
+        self.rows = grid.shape[0]
+        n = grid.size
+        self.g = [INF] * n
+        self.rhs = [INF] * n
+        self.queue = []
+        self.queued = {}  # cell -> key it is queued with; stale heap entries are skipped
+        self.km = 0.0
+        self.start = start
+        self.goal = goal
+        self.last_start = start
+        self.expanded = 0
+
+        self.rhs[goal] = 0.0
+        self._push(goal, (self._h(start, goal), 0.0))
+
+    def _h(self, a, b):
+        ai, aj = divmod(a, self.cols)
+        bi, bj = divmod(b, self.cols)
+        di, dj = abs(ai - bi), abs(aj - bj)
+        return max(di, dj) + (SQRT2 - 1) * min(di, dj)
+
+    def _key(self, s):
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self, s, key):
+        self.queued[s] = key
+        heapq.heappush(self.queue, (key, s))
+
+    def _moves(self, u):
+        """(neighbour, cost) for every in-grid move from u that doesn't cut a blocked corner"""
+        rows, cols, blocked = self.rows, self.cols, self.grid.blocked
+        i, j = divmod(u, cols)
+        moves = []
+        for di in (-1, 0, 1):
+            ni = i + di
+            if ni < 0 or ni >= rows:
+                continue
+            for dj in (-1, 0, 1):
+                nj = j + dj
+                if (di == 0 and dj == 0) or nj < 0 or nj >= cols:
+                    continue
+                if di and dj:
+                    if blocked[ni * cols + j] or blocked[i * cols + nj]:
+                        continue
+                    moves.append((ni * cols + nj, SQRT2))
+                else:
+                    moves.append((ni * cols + nj, 1.0))
+        return moves
+
+    def _enterable(self, v):
+        return not self.grid.blocked[v] or v == self.goal
+
+    def _best_rhs(self, u):
+        best = INF
+        g = self.g
+        for v, cost in self._moves(u):
+            if self._enterable(v):
+                value = cost + g[v]
+                if value < best:
+                    best = value
+        return best
+
+    def _update_vertex(self, u):
+        if self.g[u] != self.rhs[u]:
+            self._push(u, self._key(u))
+        else:
+            self.queued.pop(u, None)
+
+    def compute(self, max_expansions=None):
+        """Repair the search until the start is consistent; returns False if max_expansions ran out"""
+        g, rhs, queue, queued = self.g, self.rhs, self.queue, self.queued
+        expansions = 0
+        while queue:
+            key, u = queue[0]
+            if queued.get(u) != key:
+                heapq.heappop(queue)
+                continue
+            start_key = self._key(self.start)
+            if not (key < start_key or rhs[self.start] > g[self.start]):
+                break
+            if max_expansions is not None and expansions >= max_expansions:
+                return False
+            expansions += 1
+
+            new_key = self._key(u)
+            if key < new_key:
+                self._push(u, new_key)
+                continue
+            heapq.heappop(queue)
+            del queued[u]
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                if self._enterable(u):
+                    for s, cost in self._moves(u):
+                        if s != self.goal and cost + g[u] < rhs[s]:
+                            rhs[s] = cost + g[u]
+                            self._update_vertex(s)
+            else:
+                g_old = g[u]
+                g[u] = INF
+                for s, cost in self._moves(u) + [(u, 0.0)]:
+                    if s != self.goal and (s == u or rhs[s] == cost + g_old):
+                        rhs[s] = self._best_rhs(s)
+                    self._update_vertex(s)
+        self.expanded += expansions
+        return True
+
+    def move_start(self, start):
+        if start != self.start:
+            self.km += self._h(self.last_start, start)
+            self.last_start = start
+            self.start = start
+
+    def cells_changed(self, cells):
+        """Tell the search which cells changed blocked state since it last ran"""
+        # Edges into a changed cell, and diagonals cutting its corner, all start at one of its 8 neighbours
+        rows, cols = self.rows, self.cols
+        affected = set()
+        for v in cells:
+            i, j = divmod(v, cols)
+            for ni in range(max(i - 1, 0), min(i + 2, rows)):
+                for nj in range(max(j - 1, 0), min(j + 2, cols)):
+                    affected.add(ni * cols + nj)
+        for u in affected:
+            if u != self.goal:
+                self.rhs[u] = self._best_rhs(u)
+            self._update_vertex(u)
+
+    @property
+    def cost(self):
+        """Cost (in cells) of the best path from the start; the start itself may be left overconsistent"""
+        return min(self.g[self.start], self.rhs[self.start])
+
+    def path(self, max_steps=None):
+        """Cells from start to goal following the cheapest successor, or None if unreachable"""
+        if self.cost == INF:
+            return None
+        max_steps = max_steps or self.grid.size
+        path = [self.start]
+        u = self.start
+        while u != self.goal and len(path) < max_steps:
+            best, best_value = None, INF
+            for v, cost in self._moves(u):
+                if self._enterable(v) and cost + self.g[v] < best_value:
+                    best, best_value = v, cost + self.g[v]
+            if best is None:
+                return None
+            path.append(best)
+            u = best
+        return path if u == self.goal else None
+
+
+def simplify_path(cells, cols):
+    """Keep only the cells where the step direction changes"""
+    if len(cells) < 3:
+        return list(cells)
+    kept = [cells[0]]
+    for previous, cell, following in zip(cells, cells[1:], cells[2:]):
+        if cell - previous != following - cell:
+            kept.append(cell)
+    kept.append(cells[-1])
+    return kept
+
+
+class GridPlanner:
+    """
+    Global detour planner: an OccupancyGrid fed with lidar scans and a D*
+    Lite search towards the current goal, both run on a worker thread so the
+    nav loop only hands over scans and picks up paths.
+
+    submit() the latest (position, heading, scan) every tick, set_goal() a
+    lat/lon, and get_path() returns the latest path as lat/lon points for
+    WaypointNavigator.follow_detour(). The search is kept between updates,
+    so a moving robot or a few changed cells cost a local repair only.
+    """
+
+    def __init__(self, grid, projection, replan_period=0.5):
+        self.grid = grid
+        self.projection = projection
+        self.replan_period = replan_period
+        self.condition = threading.Condition()
+        self.pending = None     # (position, heading, scan, seq) not yet integrated
+        self.last_seq = None
+        self.pose = None        # (east, north) of the last integrated scan
+        self.goal = None
+        self.dstar = None
+        self.changed = []
+        self.path = None
+        self.path_time = None
+        self.running = False
+
+        self.scans = 0
+        self.plans = 0
+        self.last_plan_ms = None
+        self.last_map_ms = None
+        self.last_expanded = 0
+
+    @classmethod
+    def for_route(cls, route, geofence=None, cell_size=0.25, margin=15.0, max_cells=400000, **kwargs):
+        """
+        Grid covering a Route plus margin; cells outside the geofence start
+        blocked. Cells are coarsened for long routes so the grid stays within
+        max_cells (the search keeps two floats per cell).
+        """
+        extent = route.enu.max(axis=0) - route.enu.min(axis=0) + 2 * margin
+        cell_size = max(cell_size, math.sqrt(extent[0] * extent[1] / max_cells))
+        grid = OccupancyGrid.around(route.enu, margin, cell_size)
+        if geofence is not None:
+            east, north = grid.cell_centers()
+            lat, lon = route.projection.to_latlon(east, north)
+            fence_east, fence_north = geofence.projection.to_enu(lat, lon)
+            grid.set_static(~geofence.allowed_mask(fence_east, fence_north))
+        print(f"Grid planner: {grid.shape[0]}x{grid.shape[1]} cells of {cell_size:.2f}m")
+        return cls(grid, route.projection, **kwargs)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def submit(self, position, heading, scan, seq=None):
+        if position is None or heading is None or (seq is not None and seq == self.last_seq):
+            return
+        with self.condition:
+            self.last_seq = seq
+            self.pending = (position, heading, scan)
+            self.condition.notify()
+
+    def set_goal(self, lat, lon):
+        with self.condition:
+            self.goal = self.grid.cell(*self.projection.to_enu(lat, lon))
+            self.dstar = None
+            self.path = None
+            self.path_time = None
+            self.condition.notify()
+        return self.goal is not None
+
+    def clear_goal(self):
+        with self.condition:
+            self.goal = None
+            self.dstar = None
+            self.path = None
+
+    def get_path(self):
+        """(lat/lon path, monotonic time it was planned), path None until one is found"""
+        with self.condition:
+            return self.path, self.path_time
+
+    def _run(self):
+        next_plan = time.monotonic()
+        while True:
+            with self.condition:
+                if self.pending is None and self.running:
+                    self.condition.wait(self.replan_period)
+                if not self.running:
+                    return
+                pending, self.pending = self.pending, None
+
+            if pending is not None:
+                (lat, lon), heading, scan = pending
+                east, north = self.projection.to_enu(lat, lon)
+                started = time.perf_counter()
+                self.changed.extend(self.grid.update_scan(east, north, heading, scan))
+                self.last_map_ms = (time.perf_counter() - started) * 1000
+                self.pose = (east, north)
+                self.scans += 1
+
+            if self.goal is not None and self.pose is not None and time.monotonic() >= next_plan:
+                next_plan = time.monotonic() + self.replan_period
+                self._replan()
+
+    def _replan(self):
+        with self.condition:
+            goal, dstar = self.goal, self.dstar
+        start = self.grid.cell(*self.pose)
+        if start is None or goal is None:
+            return
+        started = time.perf_counter()
+        if dstar is None or dstar.goal != goal:
+            dstar = DStarLite(self.grid, start, goal)
+        else:
+            dstar.move_start(start)
+            dstar.cells_changed(self.changed)
+        self.changed = []
+        expanded_before = dstar.expanded
+        dstar.compute()
+        cells = dstar.path()
+        self.last_plan_ms = (time.perf_counter() - started) * 1000
+        self.last_expanded = dstar.expanded - expanded_before
+        self.plans += 1
+
+        path = None
+        if cells is not None:
+            points = np.array([self.grid.center(c) for c in simplify_path(cells, self.grid.shape[1])])
+            lat, lon = self.projection.to_latlon(points[:, 0], points[:, 1])
+            path = list(zip(lat.tolist(), lon.tolist()))
+        with self.condition:
+            if self.goal == goal:
+                self.dstar = dstar
+                self.path = path
+                self.path_time = time.monotonic()
+
+    def get_stats(self):
+        return {
+            'cells': self.grid.size,
+            'scans': self.scans,
+            'plans': self.plans,
+            'goal': self.goal,
+            'has_path': self.path is not None,
+            'last_map_ms': self.last_map_ms,
+            'last_plan_ms': self.last_plan_ms,
+            'last_expanded': self.last_expanded,
+        }
@@ -1,6 +1,7 @@
 import time
 import serial
-import struct
+
+from devices.arduino_link import CommandFramer
 
 Commands = {
     "turn_wheel":        0,
@@ -22,6 +23,7 @@ class HybridNavigator:
         self.stop_distance = 0.5
         self.ser = ser
         self.last_command_time = time.time()
+        self.framer = CommandFramer()
         
     def send_command(self, command, param1=0, param2=0, param3=0):
         current_time = time.time()
@@ -30,7 +32,7 @@ class HybridNavigator:
             
         if self.ser and self.ser.is_open:
             try:
-                packet = struct.pack('<BBfff', command, 0, param1, param2, param3)
+                packet = self.framer.frame(command, param1, param2, param3)
                 self.ser.write(packet)
                 self.ser.flush()
                 self.last_command_time = time.time()
@@ -1,8 +1,22 @@
 import time
-import struct
 import math
 import signal
 import sys
+from collections import deque
+
+from devices.arduino_link import ArduinoLink
+from devices.serial_writer import SerialCommandWriter
+from navigation.collision import ArcCollisionChecker
+from navigation.dwa import DWAPlanner
+from navigation.fusion import CameraLidarFusion, CameraModel
+from navigation.maneuver import Maneuver, ManeuverStep
+from navigation.obstacle_tracking import (ObstacleTracker, cluster_scan, label_clusters, robot_to_world,
+                                          world_to_robot)
+from navigation.odometry import WheelOdometry
+from navigation.safety import SafetyMonitor
+from navigation.scheduler import LoopScheduler
+from navigation.snapshot import SensorSnapshot
+from navigation.tracking import PurePursuitTracker
 
 Commands = {
     "turn_wheel":        0,
@@ -11,145 +25,216 @@ Commands = {
     "drive_straight":    3,
     "drive_m_meters":    4,
     "reverse":           5,
+    "preempt_trajectory": 6,
 }
 
 class EnhancedHybridNavigator:
-    def __init__(self, base_speed, ftg_navigator, waypoint_navigator, camera, ser):
+    def __init__(self, base_speed, ftg_navigator, waypoint_navigator, camera, ser, tracking_mode="heading", loop_rate_hz=10, sonars=None, avoidance="ftg",
+                 grid_planner=None, camera_model=None, rear_sonars=None):
         self.ftg_navigator = ftg_navigator
         self.waypoint_navigator = waypoint_navigator
         self.camera = camera
         self.base_speed = base_speed
         self.safe_distance = 1.5
         self.stop_distance = 0.5
+        # Emergency recovery backs off this far. The lidar sees nothing behind the
+        # robot, so the reverse is only guarded by rear-facing sonars (an
+        # UltrasonicArray) if there are any: it stops within rear_stop_distance
+        self.reverse_distance = 0.15
+        self.rear_sonars = rear_sonars
+        self.rear_stop_distance = 0.3
+        # Arcs are checked against the scan before they are sent; one that would hit
+        # something sooner than min_time_to_collision is swapped for the nearest clear
+        # candidate or slowed down, and dropped below min_arc_speed
+        self.collision = ArcCollisionChecker()
+        self.min_time_to_collision = 1.5
+        # Lidar clusters tracked across scans: moving obstacles are avoided
+        # where they are heading, not where they were
+        self.obstacle_tracker = ObstacleTracker()
+        self.tracks_seq = None
+        self.moving_speed = 0.3  # m/s; slower tracks are left to the scan
+        self.prediction_horizon = 2.0
+        self.threat = None
+        self.min_arc_speed = 10
+        self.candidate_radii = (float('inf'), 4.0, -4.0, 2.0, -2.0, 1.0, -1.0, 0.6, -0.6)
         self.camera_detection_distance = 2.0
+        # How far ahead the geofence is checked before driving on
+        self.geofence_lookahead = 1.0
         self.ser = ser
         self.last_command_time = time.time()
+        # Commands go out on the writer's thread; the nav loop never waits on the link
+        # Forward commands are refused by the writer itself while the safety monitor holds a stop
+        self.writer = SerialCommandWriter(ser, forward_filter=self.drives_forward)
+        self.writer.start()
+        # Telemetry (encoder ticks, acked command sequence) coming back from the Arduino
+        self.link = ArduinoLink(ser)
+        # Encoder dead reckoning between GPS fixes, fed into the pose estimator
+        self.odometry = WheelOdometry(self.link, pose_estimator=waypoint_navigator.pose_estimator)
+        self.link.start()
+        # Stops on new lidar scans (and sonar readings) without waiting for the nav loop
+        self.safety = SafetyMonitor(ftg_navigator.lidar, self.writer, (Commands["drive_straight"], 0),
+                                    self.stop_distance, sonars=sonars)
+        self.safety.start()
+
+        # Fixed-rate loop; the camera cross-check is dropped for a tick after an overrun
+        self.scheduler = LoopScheduler(loop_rate_hz)
+
+        # "ftg" steers for the widest lidar gap, "dwa" picks among the arcs
+        # reachable this tick the one that best trades goal heading, clearance and speed
+        self.avoidance = avoidance
+        if avoidance == "dwa":
+            self.dwa = DWAPlanner(self.collision, max_speed=base_speed, min_speed=self.min_arc_speed,
+                                  period=self.scheduler.period, min_time_to_collision=self.min_time_to_collision)
+        elif avoidance == "ftg":
+            self.dwa = None
+        else:
+            raise ValueError(f"Unknown avoidance backend: {avoidance}")
+
+        # Optional navigation.grid_planner.GridPlanner; when the mode flips
+        # trap_switches times within trap_window seconds FTG is stuck (e.g. in
+        # a dead end) and the route is left for a planned detour
+        self.grid_planner = grid_planner
+        if grid_planner is not None:
+            grid_planner.start()
+        self.mode_switches = deque()
+        self.trap_switches = 6
+        self.trap_window = 30.0
+        self.detour_time = None
+
+        self.last_camera_result = (False, None, None)
+        # Sensor readings the current tick is deciding on
+        self.last_snapshot = None
+        # Timed maneuver (e.g. stop and reverse) run from the loop; owns the motors while set
+        self.maneuver = None
 
         self.MODE_GPS_NAVIGATION = 0
         self.MODE_OBSTACLE_AVOIDANCE = 1
         self.current_mode = self.MODE_GPS_NAVIGATION
 
+        # "heading" steers straight at the current waypoint, "pure_pursuit"
+        # follows the route polyline with a lookahead point, "trajectory" plans
+        # with pure pursuit but uploads a short trajectory for the Arduino to
+        # run on its own, replanned every trajectory_replan seconds
+        self.tracking_mode = tracking_mode
+        self.trajectory_replan = 0.5
+        self.trajectory_time = None
+        if tracking_mode in ("pure_pursuit", "trajectory"):
+            self.tracker = PurePursuitTracker(waypoint_navigator.route, base_speed)
+        elif tracking_mode == "heading":
+            self.tracker = None
+        else:
+            raise ValueError(f"Unknown tracking mode: {tracking_mode}")
+
         self.frame_width = 640
         self.frame_height = 480
         self.center_zone_width = 200
         self.center_zone_height = 150
+        # Detections are ranged against the scan through a pixel column -> bearing
+        # table; without a calibrated CameraModel the nominal 60° FOV is assumed
+        zone_left = (self.frame_width - self.center_zone_width) // 2
+        zone_top = (self.frame_height - self.center_zone_height) // 2
+        self.fusion = CameraLidarFusion(
+            camera_model or CameraModel.from_fov(self.frame_width, self.frame_height, 60),
+            zone=(zone_left, zone_top, zone_left + self.center_zone_width, zone_top + self.center_zone_height))
 
         signal.signal(signal.SIGINT, self.signal_handler)
 
     def signal_handler(self, sig, frame):
-        self.stop_robot()
+        self.stop_robot(wait=True)
         sys.exit(0)
 
     def send_command(self, command, param1=0, param2=0, param3=0):
-        current_time = time.time()
-        if current_time - self.last_command_time < 0.02:
-            time.sleep(0.02 - (current_time - self.last_command_time))
-
-        if self.ser and self.ser.is_open:
-            try:
-                packet = struct.pack('<BBfff', command, 0, param1, param2, param3)
-                self.ser.write(packet)
-                self.ser.flush()
-                self.last_command_time = time.time()
-                return True
-            except Exception as e:
-                print(f"Serial write error: {e}")
-                return False
-        return False
-
-    def stop_robot(self):
+        if not (self.ser and self.ser.is_open):
+            return False
+        # Early out only: the writer enforces the lockout at the moment of writing
+        if self.safety.blocks_forward() and self.drives_forward(command, param1, param2):
+            return False
+        self.writer.submit(command, param1, param2, param3)
+        self.last_command_time = time.time()
+        # Any direct command preempts a running trajectory on the Arduino
+        self.trajectory_time = None
+        self.update_pose_command(command, param1, param2)
+        return True
+
+    def update_pose_command(self, command, param1, param2):
+        """Let the pose estimator dead-reckon on what the wheels were just told to do"""
+        pose_estimator = self.waypoint_navigator.pose_estimator
+        if pose_estimator is None:
+            return
+        if command == Commands["drive_straight"]:
+            pose_estimator.set_command(param1)
+        elif command == Commands["turn_while_moving"]:
+            pose_estimator.set_command(param2, param1)
+        elif command == Commands["reverse"]:
+            pose_estimator.set_command(-abs(param1))
+        else:
+            pose_estimator.set_command(0)
+
+    def drives_forward(self, command, param1, param2):
+        if command in (Commands["drive_straight"], Commands["drive_m_meters"]):
+            return param1 > 0
+        return command == Commands["turn_while_moving"] and param2 > 0
+
+    def send_trajectory(self, segments):
+        """Upload (duration, radius, speed) segments for the Arduino to execute back to back"""
+        if not (self.ser and self.ser.is_open) or self.safety.blocks_forward():
+            return False
+        self.writer.submit_trajectory(segments)
+        self.last_command_time = time.time()
+        self.trajectory_time = time.monotonic()
+        _, radius, speed = segments[0]
+        self.update_pose_command(Commands["turn_while_moving"], radius, speed)
+        return True
+
+    def send_arc(self, speed, radius):
+        """turn_while_moving, or drive_straight for an infinite radius, once the arc has been checked"""
+        speed, radius = self.vet_arc(speed, radius)
+        if speed <= 0:
+            self.stop_robot()
+        elif math.isinf(radius):
+            self.send_command(Commands["drive_straight"], speed)
+        else:
+            self.send_command(Commands["turn_while_moving"], radius, speed)
+
+    def vet_arc(self, speed, radius):
+        snapshot = self.last_snapshot
+        if speed <= 0 or snapshot is None:
+            return speed, radius
+        self.collision.set_scan(snapshot.scan.value, snapshot.scan.seq)
+        clear_radius, distance = self.collision.closest_clear_arc(
+            radius, speed, self.candidate_radii, self.min_time_to_collision)
+        if clear_radius == radius:
+            return speed, radius
+        if clear_radius is not None:
+            print(f"Arc check - radius {radius:.2f} blocked within {distance:.2f}m, using {clear_radius:.2f}")
+            return speed, clear_radius
+
+        # Nothing is clear at this speed: slow down until the commanded arc is
+        slowed = distance / (self.min_time_to_collision * self.collision.speed_scale)
+        if slowed < self.min_arc_speed:
+            print("Arc check - every arc blocked, stopping")
+            return 0, radius
+        print(f"Arc check - radius {radius:.2f} blocked within {distance:.2f}m, slowing to {slowed:.1f}")
+        return slowed, radius
+
+    def stop_robot(self, wait=False):
         print("Stopping robot...")
-        self.send_command(Commands["drive_straight"], 0)
-        time.sleep(0.1)
-
-    def get_lidar_distance_at_angle(self, target_angle_deg):
-        scan = self.ftg_navigator.lidar.get_scan()
-        if not scan:
-            return None
-
-        min_angle_diff = float('inf')
-        closest_distance = None
-
-        for angle, dist in scan:
-            angle_diff = abs(angle - target_angle_deg)
-            if angle_diff > 180:
-                angle_diff = 360 - angle_diff
-
-            if angle_diff < min_angle_diff:
-                min_angle_diff = angle_diff
-                closest_distance = dist / 1000.0
-
-        return closest_distance if min_angle_diff < 5 else None
-
-    def get_object_distance_from_lidar(self, obj_center_x):
-        camera_center_x = self.frame_width / 2
-        pixel_offset = obj_center_x - camera_center_x
-
-        camera_fov = 60
-        angle_per_pixel = camera_fov / self.frame_width
-        object_angle = pixel_offset * angle_per_pixel
-        lidar_angle = -object_angle % 360
-
-        return self.get_lidar_distance_at_angle(lidar_angle)
-
-    def is_object_in_path(self, obj):
-        x, y, w, h = obj['bbox']
-        center_x, center_y = obj['center']
-
-        zone_left = (self.frame_width - self.center_zone_width) // 2
-        zone_right = zone_left + self.center_zone_width
-        zone_top = (self.frame_height - self.center_zone_height) // 2
-        zone_bottom = zone_top + self.center_zone_height
-
-        if (zone_left <= center_x <= zone_right and
-                zone_top <= center_y <= zone_bottom):
-            return True
-
-        overlap_left = max(x, zone_left)
-        overlap_right = min(x + w, zone_right)
-        overlap_top = max(y, zone_top)
-        overlap_bottom = min(y + h, zone_bottom)
-
-        if overlap_left < overlap_right and overlap_top < overlap_bottom:
-            overlap_area = (overlap_right - overlap_left) * (overlap_bottom - overlap_top)
-            obj_area = w * h
-            overlap_ratio = overlap_area / obj_area
-
-            if overlap_ratio > 0.3:
-                return True
-
-        return False
+        if self.trajectory_time is not None:
+            self.send_command(Commands["preempt_trajectory"])
+        else:
+            self.send_command(Commands["drive_straight"], 0)
+        if wait:
+            # Make sure the stop is on the wire, e.g. before the process exits
+            self.writer.drain()
 
-    def detect_forward_obstacles(self):
-        objects = self.camera.get_objects()
+    def detect_forward_obstacles(self, snapshot):
+        objects = snapshot.detections.value
 
         if not objects:
             return False, None, None
 
-        forward_obstacles = []
-
-        for obj in objects:
-            if self.is_object_in_path(obj):
-                center_x, center_y = obj['center']
-                lidar_distance = self.get_object_distance_from_lidar(center_x)
-
-                if lidar_distance is not None:
-                    forward_obstacles.append({
-                        'object': obj,
-                        'distance': lidar_distance,
-                        'camera_center': (center_x, center_y),
-                        'lidar_confirmed': True
-                    })
-                else:
-                    x, y, w, h = obj['bbox']
-                    bbox_area = w * h
-                    estimated_distance = max(0.5, 4.0 * (self.frame_width * self.frame_height) / (bbox_area * 1000))
-                    forward_obstacles.append({
-                        'object': obj,
-                        'distance': estimated_distance,
-                        'camera_center': (center_x, center_y),
-                        'lidar_confirmed': False
-                    })
+        forward_obstacles = [obstacle for obstacle in self.fusion.fuse(objects, snapshot.scan.value, snapshot.scan.seq)
+                             if obstacle['in_path']]
 
         if not forward_obstacles:
             return False, None, None
@@ -162,8 +247,36 @@ class EnhancedHybridNavigator:
 
         return False, closest_distance, closest_obstacle
 
-    def get_lidar_forward_distance(self):
-        scan = self.ftg_navigator.lidar.get_scan()
+    def update_obstacle_tracks(self, snapshot):
+        """
+        Feed this scan's clusters (labelled by the camera) to the tracker,
+        hand the predicted paths of moving tracks to the arc checker and
+        return the moving track that would reach the robot first within
+        min_time_to_collision, or None.
+        """
+        if snapshot.scan.seq == self.tracks_seq:
+            return self.threat
+        self.tracks_seq = snapshot.scan.seq
+        motion = self.odometry.get_pose()
+        pose = (motion['east'], motion['north'], motion['heading'])
+
+        centroids = cluster_scan(snapshot.scan.value)
+        fused = self.fusion.fuse(snapshot.detections.value, snapshot.scan.value, snapshot.scan.seq)
+        labels = label_clusters(centroids, fused, self.fusion.camera.offset)
+        self.obstacle_tracker.update(robot_to_world(centroids, *pose), snapshot.scan.timestamp, labels)
+
+        times = [self.prediction_horizon * k / 8 for k in range(9)]
+        predicted = self.obstacle_tracker.predicted_positions(times, min_speed=self.moving_speed)
+        self.collision.set_predicted(world_to_robot(predicted.reshape(-1, 2), *pose))
+
+        velocity = (motion['velocity'] * math.sin(motion['heading']), motion['velocity'] * math.cos(motion['heading']))
+        moving = [track for track in self.obstacle_tracker.tracks((motion['east'], motion['north']), velocity)
+                  if track['speed'] >= self.moving_speed and track['ttc'] < self.min_time_to_collision]
+        self.threat = min(moving, key=lambda track: track['ttc']) if moving else None
+        return self.threat
+
+    def get_lidar_forward_distance(self, snapshot):
+        scan = snapshot.scan.value
         if not scan:
             return None
 
@@ -174,6 +287,12 @@ class EnhancedHybridNavigator:
 
         return min(forward_distances) if forward_distances else None
 
+    def get_rear_distance(self, max_age=0.2):
+        """Closest fresh rear sonar reading in meters, None without rear sonars or a recent echo"""
+        if self.rear_sonars is None:
+            return None
+        return self.rear_sonars.get_min_distance(max_age=max_age)
+
     def calculate_navigation_speed_radius(self, angle, dist):
         if dist > 3:
             speed = self.base_speed
@@ -220,19 +339,163 @@ class EnhancedHybridNavigator:
         if speed <= 0:
             self.stop_robot()
         elif radius > 10.0:
-            self.send_command(Commands["drive_straight"], speed)
+            self.send_arc(speed, float('inf'))
         else:
             turn_radius = radius if nav_error >= 0 else -radius
-            self.send_command(Commands["turn_while_moving"], turn_radius, speed)
+            self.send_arc(speed, turn_radius)
 
-    def execute_obstacle_avoidance(self, gap_angle, min_dist):
-        if min_dist and min_dist <= self.stop_distance:
-            print(f"Emergency stop - Obstacle at {min_dist:.2f}m")
+    def execute_path_tracking(self):
+        position = self.waypoint_navigator.last_position
+        heading = self.waypoint_navigator.last_heading
+        if position is None or heading is None:
+            print("GPS navigation data not available")
+            self.stop_robot()
+            return
+
+        east, north = self.waypoint_navigator.projection.to_enu(*position)
+        if self.tracking_mode == "trajectory":
+            self.execute_trajectory_tracking(east, north, heading)
+            return
+
+        speed, radius = self.tracker.compute_command(east, north, heading)
+        self.waypoint_navigator.waypoint_index = min(self.tracker.segment + 1, len(self.waypoint_navigator.waypoints) - 1)
+
+        print(f"Pure pursuit - Station: {self.tracker.station:.1f}m, Off path: {self.tracker.path_distance:.2f}m, "
+              f"Speed: {speed:.2f}, Radius: {radius:.2f}")
+
+        if speed <= 0:
+            self.stop_robot()
+        elif math.isinf(radius):
+            self.send_arc(speed, float('inf'))
+        else:
+            self.send_arc(speed, radius)
+
+    def geofence_violation(self, heading_offset=0.0):
+        """Reason to stop for the geofence, or None when the way ahead is allowed"""
+        if not self.waypoint_navigator.inside_geofence:
+            return "outside the geofence"
+        if not self.waypoint_navigator.geofence_allows(self.geofence_lookahead, heading_offset):
+            return f"keep-out zone or boundary within {self.geofence_lookahead:.1f}m"
+        return None
+
+    def execute_trajectory_tracking(self, east, north, heading):
+        if self.trajectory_time is not None and time.monotonic() - self.trajectory_time < self.trajectory_replan:
+            return  # The Arduino is still running the last upload
+
+        plan = self.tracker.plan_trajectory(east, north, heading)
+        self.waypoint_navigator.waypoint_index = min(self.tracker.segment + 1, len(self.waypoint_navigator.waypoints) - 1)
+        if not plan:
+            self.stop_robot()
+            return
+
+        print(f"Trajectory - Station: {self.tracker.station:.1f}m, Off path: {self.tracker.path_distance:.2f}m, "
+              f"{len(plan)} segments over {sum(duration for duration, _, _ in plan):.1f}s")
+        self.send_trajectory(plan)
+
+    def emergency_maneuver(self):
+        """
+        Stop, then back off reverse_distance. Reversing ends early once the
+        front clears safe_distance, keeps going (up to 2.5 s) while the
+        obstacle is still within stop_distance. With rear sonars it aborts
+        with a stop if anything comes within rear_stop_distance behind;
+        without them the reverse is unguarded.
+        """
+        def front_clear(snapshot, step):
+            distance = self.get_lidar_forward_distance(snapshot)
+            return distance is not None and distance > self.safe_distance
+
+        def front_blocked(snapshot, step):
+            distance = self.get_lidar_forward_distance(snapshot)
+            return distance is not None and distance <= self.stop_distance
+
+        def rear_blocked(snapshot, step):
+            distance = self.get_rear_distance()
+            return distance is not None and distance <= self.rear_stop_distance
+
+        stop = (Commands["drive_straight"], 0)
+        return Maneuver("emergency_reverse", [
+            ManeuverStep("stop", stop, duration=0.1),
+            ManeuverStep("reverse", (Commands["reverse"], 20), distance=self.reverse_distance,
+                         until=front_clear, extend_while=front_blocked,
+                         abort_if=rear_blocked if self.rear_sonars is not None else None,
+                         max_duration=2.5),
+            ManeuverStep("stop", stop, duration=0.0),
+        ], self.send_command, on_abort=stop)
+
+    def start_maneuver(self, maneuver):
+        self.maneuver = maneuver
+        maneuver.start(odometry_distance=self.odometry.total_distance)
+
+    def update_maneuver(self, snapshot):
+        """Run the active maneuver for this tick; returns True while it owns the motors"""
+        if self.maneuver is None:
+            return False
+        if self.maneuver.update(snapshot, self.odometry.total_distance):
+            return True
+        print(f"Maneuver {self.maneuver.name} {self.maneuver.outcome}")
+        self.maneuver = None
+        return False
+
+    def execute_dwa_avoidance(self, snapshot, nav_error, nav_distance, min_dist):
+        emergency = self.safety.blocks_forward() or (min_dist and min_dist <= self.stop_distance)
+        if emergency or nav_error is None:
+            # Backing off, or driving without a goal, stays with the FTG path
+            self.execute_obstacle_avoidance(snapshot.gap.value, min_dist)
+            return
+
+        # Odometry yaw rate and the waypoint error are clockwise; the planner works positive left
+        motion = self.odometry.get_pose()
+        speed, radius = self.dwa.plan(snapshot.scan.value, -nav_error, nav_distance,
+                                      motion['velocity'], -motion['yaw_rate'], snapshot.scan.seq)
+        print(f"DWA - Goal: {math.degrees(-nav_error):.1f}°, Speed: {speed:.2f}, Radius: {radius:.2f}")
+        # Offset of the chord geofence_lookahead along the arc; positive radius turns left (anticlockwise)
+        offset = 0.0 if math.isinf(radius) else -self.geofence_lookahead / (2 * radius)
+        violation = self.geofence_violation(offset)
+        if violation is not None:
+            print(f"DWA blocked - {violation}, stopping")
             self.stop_robot()
-            time.sleep(0.1)
-            print("Reversing...")
-            self.send_command(Commands["reverse"], 20)
-            time.sleep(1.5)
+            return
+
+        self.send_arc(speed, radius)
+
+    def note_mode_switch(self):
+        now = time.monotonic()
+        self.mode_switches.append(now)
+        while now - self.mode_switches[0] > self.trap_window:
+            self.mode_switches.popleft()
+        if (self.grid_planner is None or self.waypoint_navigator.on_detour
+                or len(self.mode_switches) < self.trap_switches):
+            return
+        navigator = self.waypoint_navigator
+        print(f"Trapped - {len(self.mode_switches)} mode switches in {self.trap_window:.0f}s, "
+              f"planning a detour to waypoint {navigator.waypoint_index}")
+        if not self.grid_planner.set_goal(*navigator.waypoints[navigator.waypoint_index]):
+            print("Waypoint is outside the planner grid")
+        self.mode_switches.clear()
+
+    def update_detour(self, nav_distance):
+        """Follow the latest planned detour; rejoin the route once its end is reached"""
+        planner = self.grid_planner
+        if planner is None or planner.goal is None:
+            return
+        navigator = self.waypoint_navigator
+        if (navigator.on_detour and navigator.waypoint_index == len(navigator.waypoints) - 1
+                and nav_distance is not None and nav_distance < navigator.waypoint_rad):
+            print("Detour complete - rejoining the route")
+            planner.clear_goal()
+            navigator.end_detour()
+            self.detour_time = None
+            return
+        path, planned = planner.get_path()
+        if path is not None and planned != self.detour_time:
+            self.detour_time = planned
+            navigator.follow_detour(path)
+
+    def execute_obstacle_avoidance(self, gap_angle, min_dist):
+        if self.safety.blocks_forward() or (min_dist and min_dist <= self.stop_distance):
+            reason = f"Obstacle at {min_dist:.2f}m" if min_dist else "safety monitor tripped"
+            print(f"Emergency stop - {reason}, reversing")
+            self.start_maneuver(self.emergency_maneuver())
             return
 
         if gap_angle is None or min_dist is None:
@@ -240,6 +503,13 @@ class EnhancedHybridNavigator:
             self.stop_robot()
             return
 
+        # Never dodge an obstacle into a keep-out zone
+        violation = self.geofence_violation(gap_angle)
+        if violation is not None:
+            print(f"Avoidance blocked - {violation}, stopping")
+            self.stop_robot()
+            return
+
         speed, radius = self.calculate_avoidance_speed_radius(gap_angle, min_dist)
 
         print(f"Avoidance - Gap angle: {gap_angle:.3f} rad ({math.degrees(gap_angle):.1f}°), "
@@ -248,19 +518,31 @@ class EnhancedHybridNavigator:
         if speed <= 0:
             self.stop_robot()
         elif radius > 10.0:
-            self.send_command(Commands["drive_straight"], speed)
+            self.send_arc(speed, float('inf'))
         else:
             turn_radius = radius if gap_angle >= 0 else -radius
-            self.send_command(Commands["turn_while_moving"], turn_radius, speed)
+            self.send_arc(speed, turn_radius)
 
     def run(self):
         print("Starting enhanced hybrid navigation...")
         while True:
             try:
-                camera_obstacle, camera_distance, obstacle_info = self.detect_forward_obstacles()
-                lidar_min_dist = self.get_lidar_forward_distance()
-                gap_angle = self.ftg_navigator.get_current_gap_angle()
-                nav_error, nav_distance, _ = self.waypoint_navigator.get_navigation_command()
+                self.scheduler.tick()
+                snapshot = SensorSnapshot.capture(self.scheduler.ticks, self.ftg_navigator.lidar,
+                                                  self.ftg_navigator, self.camera, self.waypoint_navigator)
+                self.last_snapshot = snapshot
+                if not self.scheduler.shed():
+                    self.last_camera_result = self.detect_forward_obstacles(snapshot)
+                camera_obstacle, camera_distance, obstacle_info = self.last_camera_result
+                lidar_min_dist = self.get_lidar_forward_distance(snapshot)
+                threat = self.update_obstacle_tracks(snapshot)
+                gap_angle = snapshot.gap.value
+                nav_error, nav_distance, _ = self.waypoint_navigator.get_navigation_command(snapshot.pose)
+                if self.grid_planner is not None:
+                    self.grid_planner.submit(snapshot.fix.value, snapshot.heading.value,
+                                             snapshot.scan.value, snapshot.scan.seq)
+                if self.update_maneuver(snapshot):
+                    continue
 
                 previous_mode = self.current_mode
 
@@ -272,23 +554,61 @@ class EnhancedHybridNavigator:
                     if self.current_mode != self.MODE_OBSTACLE_AVOIDANCE:
                         print(f"Switching to avoidance: Lidar detected obstacle at {lidar_min_dist:.2f}m")
                     self.current_mode = self.MODE_OBSTACLE_AVOIDANCE
+                elif threat is not None:
+                    if self.current_mode != self.MODE_OBSTACLE_AVOIDANCE:
+                        print(f"Switching to avoidance: {threat['label'] or 'obstacle'} track {threat['id']} "
+                              f"moving at {threat['speed']:.1f}m/s, collision in {threat['ttc']:.1f}s")
+                    self.current_mode = self.MODE_OBSTACLE_AVOIDANCE
                 else:
                     if self.current_mode == self.MODE_OBSTACLE_AVOIDANCE:
                         print("Path clear - switching back to GPS navigation")
+                        self.waypoint_navigator.resume_route()
                     self.current_mode = self.MODE_GPS_NAVIGATION
 
+                if self.current_mode != previous_mode:
+                    self.note_mode_switch()
+                self.update_detour(nav_distance)
+
                 if self.current_mode == self.MODE_GPS_NAVIGATION:
-                    self.execute_gps_navigation(nav_error, nav_distance)
+                    violation = self.geofence_violation()
+                    if violation is not None:
+                        print(f"Geofence - {violation}, stopping")
+                        self.stop_robot()
+                    elif self.tracker is not None and not self.waypoint_navigator.on_detour:
+                        self.execute_path_tracking()
+                    else:
+                        self.execute_gps_navigation(nav_error, nav_distance)
                 elif self.current_mode == self.MODE_OBSTACLE_AVOIDANCE:
                     effective_min_dist = lidar_min_dist if obstacle_info is None or not obstacle_info.get('lidar_confirmed', False) else camera_distance
-                    self.execute_obstacle_avoidance(gap_angle, effective_min_dist)
-
-                time.sleep(0.1)
+                    if self.dwa is not None:
+                        self.execute_dwa_avoidance(snapshot, nav_error, nav_distance, effective_min_dist)
+                    else:
+                        self.execute_obstacle_avoidance(gap_angle, effective_min_dist)
 
             except Exception as e:
                 print(f"Error in navigation loop: {e}")
+                self.maneuver = None
                 self.stop_robot()
                 time.sleep(0.5)
 
+    def get_status(self):
+        return {
+            'mode': 'GPS_NAVIGATION' if self.current_mode == self.MODE_GPS_NAVIGATION else 'OBSTACLE_AVOIDANCE',
+            'base_speed': self.base_speed,
+            'tracking_mode': self.tracking_mode,
+            'avoidance': self.avoidance,
+            'detour': self.waypoint_navigator.on_detour,
+            'grid_planner': self.grid_planner.get_stats() if self.grid_planner is not None else None,
+            'inside_geofence': self.waypoint_navigator.inside_geofence,
+            'tracker': self.tracker.get_status() if self.tracker is not None else None,
+            'loop': self.scheduler.get_stats(),
+            'serial': self.writer.get_stats(),
+            'link': self.link.get_stats(),
+            'odometry': self.odometry.get_stats(),
+            'safety': self.safety.get_stats(),
+            'maneuver': self.maneuver.get_status() if self.maneuver is not None else None,
+            'obstacle_tracks': self.obstacle_tracker.get_stats()
+        }
+
     def __del__(self):
-        self.stop_robot()
+        self.stop_robot(wait=True)
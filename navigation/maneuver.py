@@ -0,0 +1,127 @@
+import time
+
+
+class ManeuverStep:
+    """
+    One timed state of a maneuver.
+
+    command is a (command, param1, ...) tuple sent once on entering the step,
+    or None to leave the motors as they are (a wait). The step ends when
+    duration has elapsed, distance meters have been driven (from wheel
+    odometry) or until(snapshot, step) returns True, whichever comes first.
+    extend_while(snapshot, step) keeps it going past that point, up to
+    max_duration, and abort_if(snapshot, step) ends the whole maneuver.
+    """
+
+    def __init__(self, name, command=None, duration=None, distance=None, until=None,
+                 extend_while=None, abort_if=None, max_duration=None):
+        if duration is None and distance is None and until is None:
+            raise ValueError(f"Maneuver step {name} never ends")
+        self.name = name
+        self.command = command
+        self.duration = duration
+        self.distance = distance
+        self.until = until
+        self.extend_while = extend_while
+        self.abort_if = abort_if
+        self.max_duration = max_duration
+        self.started = None
+        self.start_odometry = None
+        self.elapsed = 0.0
+        self.travelled = 0.0
+
+    def enter(self, now, odometry_distance):
+        self.started = now
+        self.start_odometry = odometry_distance
+        self.elapsed = 0.0
+        self.travelled = 0.0
+
+    def finished(self, snapshot, now, odometry_distance):
+        self.elapsed = now - self.started
+        if odometry_distance is not None and self.start_odometry is not None:
+            self.travelled = odometry_distance - self.start_odometry
+
+        if self.max_duration is not None and self.elapsed >= self.max_duration:
+            return True
+        done = ((self.duration is not None and self.elapsed >= self.duration)
+                or (self.distance is not None and self.travelled >= self.distance)
+                or (self.until is not None and self.until(snapshot, self)))
+        if done and self.extend_while is not None and self.max_duration is not None:
+            return not self.extend_while(snapshot, self)
+        return done
+
+
+class Maneuver:
+    """
+    A sequence of ManeuverSteps run from the control loop, one update() per
+    tick, instead of sleeping through them. The loop keeps reading sensors
+    while a maneuver runs, so each step can end early, be extended or abort
+    on the latest snapshot.
+    """
+
+    def __init__(self, name, steps, send, on_abort=None):
+        self.name = name
+        self.steps = steps
+        self.send = send          # send(command, param1, ...) e.g. navigator.send_command
+        self.on_abort = on_abort  # command tuple sent if a step aborts, e.g. a stop
+        self.index = None
+        self.outcome = None
+        self.started = None
+
+    @property
+    def step(self):
+        return self.steps[self.index] if self.index is not None and self.index < len(self.steps) else None
+
+    @property
+    def active(self):
+        return self.outcome is None
+
+    def start(self, now=None, odometry_distance=None):
+        self.started = now if now is not None else time.monotonic()
+        self.index = -1
+        self._advance(self.started, odometry_distance)
+
+    def update(self, snapshot, odometry_distance=None, now=None):
+        """Advance on this tick's snapshot; returns True while the maneuver owns the motors"""
+        if not self.active:
+            return False
+        now = now if now is not None else time.monotonic()
+        if self.index is None:
+            self.start(now, odometry_distance)
+
+        while self.active:
+            step = self.step
+            if step.abort_if is not None and step.abort_if(snapshot, step):
+                self.abort(f"aborted during {step.name}")
+                return False
+            if not step.finished(snapshot, now, odometry_distance):
+                return True
+            self._advance(now, odometry_distance)
+        return False
+
+    def abort(self, reason="aborted"):
+        if not self.active:
+            return
+        self.outcome = reason
+        if self.on_abort is not None:
+            self.send(*self.on_abort)
+
+    def _advance(self, now, odometry_distance):
+        self.index += 1
+        step = self.step
+        if step is None:
+            self.outcome = "completed"
+            return
+        step.enter(now, odometry_distance)
+        if step.command is not None:
+            self.send(*step.command)
+
+    def get_status(self):
+        step = self.step
+        return {
+            'name': self.name,
+            'step': step.name if step is not None else None,
+            'step_elapsed': step.elapsed if step is not None else None,
+            'step_travelled': step.travelled if step is not None else None,
+            'outcome': self.outcome,
+        }
@@ -1,6 +1,5 @@
 import time
 import serial
-import struct
 import math
 import signal
 import sys
@@ -10,6 +9,8 @@ from datetime import datetime
 import threading
 import queue
 
+from devices.arduino_link import CommandFramer
+
 Commands = {
     "turn_wheel":        0,
     "turn_while_moving": 1,
@@ -144,6 +145,7 @@ class HybridNavigator:
         self.camera_detection_distance = 2.0
         self.ser = ser
         self.last_command_time = time.time()
+        self.framer = CommandFramer()
         
         # Navigation modes
         self.MODE_GPS_NAVIGATION = 0
@@ -185,7 +187,7 @@ class HybridNavigator:
             
         if self.ser and self.ser.is_open:
             try:
-                packet = struct.pack('<BBfff', command, 0, param1, param2, param3)
+                packet = self.framer.frame(command, param1, param2, param3)
                 self.ser.write(packet)
                 self.ser.flush()
                 self.last_command_time = time.time()
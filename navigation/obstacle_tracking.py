@@ -0,0 +1,257 @@
+import math
+import numpy as np
+
+from navigation.collision import scan_to_points
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+CHI2_GATE_2D = 9.21  # 99% of 2-dof chi-square: squared Mahalanobis distance a match must be under
+
+
+def cluster_scan(scan, gap=0.3, min_points=3, max_width=1.0):
+    """
+    Robot-frame (x forward, y left) centroids of object-sized clusters in a
+    scan. Returns are ordered by bearing and split wherever consecutive
+    points are more than gap meters apart; clusters wider than max_width
+    (walls, hedges) have no single position to track and are dropped.
+    """
+    points = scan_to_points(scan)
+    if len(points) < min_points:
+        return np.empty((0, 2))
+    points = points[np.argsort(np.arctan2(points[:, 1], points[:, 0]))]
+
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    labels = np.concatenate(([0], np.cumsum(steps > gap)))
+    counts = np.bincount(labels)
+    centroids = np.column_stack((np.bincount(labels, points[:, 0]),
+                                 np.bincount(labels, points[:, 1]))) / counts[:, None]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ends = starts + counts - 1
+    width = np.hypot(*(points[ends] - points[starts]).T)
+    return centroids[(counts >= min_points) & (width <= max_width)]
+
+
+def label_clusters(centroids, fused, camera_offset=(0.0, 0.0), radius=0.5):
+    """
+    Camera label for each cluster: the nearest lidar-confirmed detection
+    from CameraLidarFusion.fuse() within radius meters, else None.
+    """
+    labels = [None] * len(centroids)
+    confirmed = [obstacle for obstacle in fused if obstacle['lidar_confirmed']]
+    if not len(centroids) or not confirmed:
+        return labels
+    forward, left = camera_offset
+    ranges = np.array([obstacle['range_min'] for obstacle in confirmed])
+    bearings = np.array([obstacle['bearing'] for obstacle in confirmed])
+    detections = np.column_stack((forward + ranges * np.cos(bearings), left + ranges * np.sin(bearings)))
+    distance = np.hypot(*(centroids[:, None, :] - detections[None, :, :]).transpose(2, 0, 1))
+    nearest = np.argmin(distance, axis=1)
+    for k, j in enumerate(nearest):
+        if distance[k, j] <= radius:
+            labels[k] = confirmed[j]['object'].get('label')
+    return labels
+
+
+def robot_to_world(points, east, north, heading):
+    """Robot-frame (x forward, y left) points to (east, north) given a heading clockwise from north"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    sin_h, cos_h = math.sin(heading), math.cos(heading)
+    x, y = points[:, 0], points[:, 1]
+    return np.column_stack((east + x * sin_h - y * cos_h, north + x * cos_h + y * sin_h))
+
+
+def world_to_robot(points, east, north, heading):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    sin_h, cos_h = math.sin(heading), math.cos(heading)
+    d_east, d_north = points[:, 0] - east, points[:, 1] - north
+    return np.column_stack((d_east * sin_h + d_north * cos_h, -d_east * cos_h + d_north * sin_h))
+
+
+class ObstacleTracker:
+    """
+    Multi-object tracker for obstacles around the robot.
+
+    Tracks live in the odometry frame (east, north meters), so a static
+    obstacle keeps still while the robot moves past it. Each track runs a
+    constant-velocity Kalman filter (state east, north, v_east, v_north);
+    all tracks are held as stacked arrays and predicted together. A
+    detection is associated with a track through the squared Mahalanobis
+    distance under the track's predicted covariance, computed for every
+    (track, detection) pair at once and gated at chi2_gate. Pairs are
+    matched with the Hungarian algorithm when scipy is available and
+    greedily, cheapest pair first, otherwise.
+
+    Unmatched detections start tentative tracks, confirmed after min_hits
+    updates; a tentative track is dropped on its first miss and a confirmed
+    one after max_misses. Only confirmed tracks are reported.
+    """
+
+    def __init__(self, process_noise=1.0, measurement_noise=0.15, initial_speed=2.0, chi2_gate=CHI2_GATE_2D,
+                 min_hits=3, max_misses=5, robot_radius=0.45, max_tracks=50):
+        self.process_noise = process_noise  # m/s^2, white acceleration
+        self.measurement_variance = measurement_noise ** 2
+        self.initial_speed = initial_speed  # m/s, velocity spread of a new track
+        self.chi2_gate = chi2_gate
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.robot_radius = robot_radius  # combined robot + obstacle radius for time to collision
+        self.max_tracks = max_tracks
+        self.ids = np.empty(0, dtype=int)
+        self.state = np.empty((0, 4))
+        self.covariance = np.empty((0, 4, 4))
+        self.hits = np.empty(0, dtype=int)
+        self.misses = np.empty(0, dtype=int)
+        self.labels = []
+        self.next_id = 1
+        self.timestamp = None
+        self.stats = {'updates': 0, 'matched': 0, 'created': 0, 'dropped': 0}
+
+    def predict(self, dt):
+        if dt <= 0 or not len(self.ids):
+            return
+        transition = np.eye(4)
+        transition[0, 2] = transition[1, 3] = dt
+        q = self.process_noise ** 2
+        noise = np.zeros((4, 4))
+        noise[[0, 1], [0, 1]] = q * dt ** 4 / 4
+        noise[[0, 1, 2, 3], [2, 3, 0, 1]] = q * dt ** 3 / 2
+        noise[[2, 3], [2, 3]] = q * dt ** 2
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + noise
+
+    def association_cost(self, measurements):
+        """(tracks x measurements) squared Mahalanobis distances"""
+        innovation_cov = self.covariance[:, :2, :2] + self.measurement_variance * np.eye(2)
+        residual = measurements[None, :, :] - self.state[:, None, :2]
+        return np.einsum('tmi,tij,tmj->tm', residual, np.linalg.inv(innovation_cov), residual)
+
+    def assign(self, cost):
+        """(track rows, measurement columns) of gated matches"""
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(np.where(cost <= self.chi2_gate, cost, 1e9))
+            keep = cost[rows, cols] <= self.chi2_gate
+            return rows[keep], cols[keep]
+
+        order = np.argsort(cost, axis=None)
+        order = order[cost.ravel()[order] <= self.chi2_gate]
+        used_rows, used_cols, rows, cols = set(), set(), [], []
+        for row, col in zip(*np.unravel_index(order, cost.shape)):
+            if row in used_rows or col in used_cols:
+                continue
+            used_rows.add(row)
+            used_cols.add(col)
+            rows.append(row)
+            cols.append(col)
+        return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+    def update(self, measurements, timestamp, labels=None):
+        """Advance to timestamp (monotonic seconds) and fold in (east, north) detections"""
+        measurements = np.asarray(measurements, dtype=float).reshape(-1, 2)
+        labels = labels if labels is not None else [None] * len(measurements)
+        if self.timestamp is not None and timestamp is not None:
+            self.predict(timestamp - self.timestamp)
+        if timestamp is not None:
+            self.timestamp = timestamp
+        self.stats['updates'] += 1
+
+        rows = cols = np.empty(0, dtype=int)
+        if len(self.ids) and len(measurements):
+            rows, cols = self.assign(self.association_cost(measurements))
+
+        if len(rows):
+            covariance = self.covariance[rows]
+            gain = covariance[:, :, :2] @ np.linalg.inv(
+                covariance[:, :2, :2] + self.measurement_variance * np.eye(2))
+            residual = measurements[cols] - self.state[rows, :2]
+            self.state[rows] += np.einsum('tij,tj->ti', gain, residual)
+            self.covariance[rows] = covariance - gain @ covariance[:, :2, :]
+            for row, col in zip(rows, cols):
+                if labels[col] is not None:
+                    self.labels[row] = labels[col]
+            self.stats['matched'] += len(rows)
+
+        matched = np.zeros(len(self.ids), dtype=bool)
+        matched[rows] = True
+        self.hits[matched] += 1
+        self.misses[matched] = 0
+        self.misses[~matched] += 1
+
+        keep = (self.misses == 0) | ((self.hits >= self.min_hits) & (self.misses <= self.max_misses))
+        self.stats['dropped'] += int(np.count_nonzero(~keep))
+        self._select(keep)
+
+        new = np.setdiff1d(np.arange(len(measurements)), cols)[:max(self.max_tracks - len(self.ids), 0)]
+        if len(new):
+            covariance = np.zeros((len(new), 4, 4))
+            covariance[:, [0, 1], [0, 1]] = self.measurement_variance
+            covariance[:, [2, 3], [2, 3]] = self.initial_speed ** 2
+            self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + len(new))))
+            self.state = np.concatenate((self.state, np.column_stack((measurements[new], np.zeros((len(new), 2))))))
+            self.covariance = np.concatenate((self.covariance, covariance))
+            self.hits = np.concatenate((self.hits, np.ones(len(new), dtype=int)))
+            self.misses = np.concatenate((self.misses, np.zeros(len(new), dtype=int)))
+            self.labels.extend(labels[k] for k in new)
+            self.next_id += len(new)
+            self.stats['created'] += len(new)
+
+    def _select(self, keep):
+        self.ids = self.ids[keep]
+        self.state = self.state[keep]
+        self.covariance = self.covariance[keep]
+        self.hits = self.hits[keep]
+        self.misses = self.misses[keep]
+        self.labels = [label for label, kept in zip(self.labels, keep) if kept]
+
+    @property
+    def confirmed(self):
+        return self.hits >= self.min_hits
+
+    def predicted_positions(self, times, min_speed=0.0):
+        """(tracks x times x 2) positions of confirmed tracks at least min_speed m/s, times in s from now"""
+        selected = self.confirmed & (np.hypot(self.state[:, 2], self.state[:, 3]) >= min_speed)
+        times = np.asarray(times, dtype=float)
+        state = self.state[selected]
+        return state[:, None, :2] + times[None, :, None] * state[:, None, 2:]
+
+    def time_to_collision(self, position, velocity):
+        """
+        Seconds until each confirmed track comes within robot_radius of a
+        robot at position moving with velocity (east, north), both held
+        constant; inf if they never do, 0 if already inside.
+        """
+        state = self.state[self.confirmed]
+        relative = state[:, :2] - np.asarray(position, dtype=float)
+        closing = state[:, 2:] - np.asarray(velocity, dtype=float)
+        a = np.einsum('ij,ij->i', closing, closing)
+        b = 2 * np.einsum('ij,ij->i', relative, closing)
+        c = np.einsum('ij,ij->i', relative, relative) - self.robot_radius ** 2
+        discriminant = b * b - 4 * a * c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first = (-b - np.sqrt(np.maximum(discriminant, 0))) / (2 * a)
+        ttc = np.where((discriminant >= 0) & (a > 0) & (first >= 0), first, np.inf)
+        return np.where(c <= 0, 0.0, ttc)
+
+    def tracks(self, position=None, velocity=(0.0, 0.0)):
+        """Confirmed tracks as dicts, with time to collision if the robot position is given"""
+        confirmed = np.flatnonzero(self.confirmed)
+        ttc = self.time_to_collision(position, velocity) if position is not None else None
+        return [{
+            'id': int(self.ids[k]),
+            'label': self.labels[k],
+            'position': (float(self.state[k, 0]), float(self.state[k, 1])),
+            'velocity': (float(self.state[k, 2]), float(self.state[k, 3])),
+            'speed': float(math.hypot(self.state[k, 2], self.state[k, 3])),
+            'hits': int(self.hits[k]),
+            'ttc': float(ttc[n]) if ttc is not None else None,
+        } for n, k in enumerate(confirmed)]
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'tracks': len(self.ids),
+            'confirmed': int(np.count_nonzero(self.confirmed)),
+            'matcher': 'hungarian' if linear_sum_assignment is not None else 'greedy',
+        }
@@ -0,0 +1,111 @@
+import math
+import threading
+import time
+
+STEPS_PER_ROTATION = 3000  # ENCODER_STEPS_PER_ROTATION in Robot.ino
+
+
+def _wrap_int32(value):
+    return (value + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+class WheelOdometry:
+    """
+    Skid-steer dead reckoning from the Arduino's encoder telemetry.
+
+    Robot.ino streams cumulative tick counts, so a dropped frame only
+    lengthens the next step instead of losing distance. Each frame is
+    differenced, averaged per side and integrated on the ArduinoLink reader
+    thread, then handed to the pose estimator as an odometry increment.
+    Heading follows the compass convention: radians clockwise from north.
+
+    Skid-steer wheels scrub in turns, so the effective track is wider than
+    the wheel spacing; track_scale calibrates that (spin in place a known
+    angle and compare). wheel_signs flips encoders that count backwards.
+    """
+
+    def __init__(self, link=None, track_width=0.46, wheel_radius=0.05,
+                 steps_per_rotation=STEPS_PER_ROTATION, track_scale=1.0,
+                 wheel_signs=(1, 1, 1, 1), pose_estimator=None, max_step=0.5):
+        self.meters_per_tick = 2 * math.pi * wheel_radius / steps_per_rotation
+        self.effective_track = track_width * track_scale
+        self.wheel_signs = wheel_signs
+        self.pose_estimator = pose_estimator
+        self.max_step = max_step  # meters per frame beyond which a jump is treated as a glitch
+
+        self.lock = threading.Lock()
+        self.last_ticks = None
+        self.last_millis = None
+        self.east = 0.0
+        self.north = 0.0
+        self.heading = 0.0
+        self.total_distance = 0.0
+        self.velocity = 0.0
+        self.yaw_rate = 0.0
+        self.timestamp = None
+        self.updates = 0
+        self.rejected = 0
+
+        if link is not None:
+            link.add_listener(self.handle_telemetry)
+
+    def reset(self, east=0.0, north=0.0, heading=0.0):
+        with self.lock:
+            self.east, self.north, self.heading = east, north, heading
+
+    def handle_telemetry(self, telemetry):
+        ticks = telemetry['ticks']
+        millis = telemetry['millis']
+        with self.lock:
+            if self.last_ticks is None:
+                self.last_ticks, self.last_millis = ticks, millis
+                return
+            deltas = [sign * _wrap_int32(t - last)
+                      for sign, t, last in zip(self.wheel_signs, ticks, self.last_ticks)]
+            dt = ((millis - self.last_millis) & 0xFFFFFFFF) / 1000.0
+            self.last_ticks, self.last_millis = ticks, millis
+
+            # Telemetry wheel order: back right, front right, front left, back left
+            back_right, front_right, front_left, back_left = (d * self.meters_per_tick for d in deltas)
+            right = (back_right + front_right) / 2
+            left = (front_left + back_left) / 2
+            if max(abs(left), abs(right)) > self.max_step:
+                # Arduino reset or a corrupted count: start again from this frame
+                self.rejected += 1
+                return
+
+            distance = (left + right) / 2
+            dheading = (left - right) / self.effective_track
+            mid = self.heading + dheading / 2
+            self.east += distance * math.sin(mid)
+            self.north += distance * math.cos(mid)
+            self.heading = (self.heading + dheading) % (2 * math.pi)
+            self.total_distance += abs(distance)
+            if dt > 0:
+                self.velocity = distance / dt
+                self.yaw_rate = dheading / dt
+            self.timestamp = telemetry['timestamp']
+            self.updates += 1
+
+        if self.pose_estimator is not None:
+            self.pose_estimator.update_odometry(distance, dheading)
+
+    def get_pose(self):
+        with self.lock:
+            return {
+                'east': self.east,
+                'north': self.north,
+                'heading': self.heading,
+                'velocity': self.velocity,
+                'yaw_rate': self.yaw_rate,
+                'total_distance': self.total_distance,
+                'timestamp': self.timestamp,
+            }
+
+    def get_stats(self):
+        return {
+            'updates': self.updates,
+            'rejected': self.rejected,
+            'total_distance': self.total_distance,
+            'age': time.monotonic() - self.timestamp if self.timestamp is not None else None,
+        }
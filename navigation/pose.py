@@ -0,0 +1,217 @@
+import math
+import threading
+import time
+import numpy as np
+
+from navigation.geo import LocalProjection, wrap_angle
+
+
+class PoseEstimator:
+    """
+    Extended Kalman filter over [east, north, heading] in a local tangent plane.
+
+    Prediction runs at rate_hz from commanded speed/radius (or wheel odometry
+    when it is being fed), GPS fixes and compass headings are fused whenever
+    they arrive. Heading follows the compass convention used by
+    WaypointNavigator: radians clockwise from north.
+    """
+
+    def __init__(self, gps=None, compass=None, rate_hz=50, wheel_radius=0.05,
+                 gps_sigma=2.5, compass_sigma=math.radians(8)):
+        self.gps = gps
+        self.compass = compass
+        self.rate_hz = rate_hz
+        # Bot speeds are wheel RPM; convert to m/s at the wheel rim
+        self.speed_scale = 2 * math.pi * wheel_radius / 60.0
+        self.gps_sigma = gps_sigma          # meters at HDOP 1
+        self.compass_sigma = compass_sigma  # radians
+
+        # Process noise densities
+        self.q_position = 0.05   # m^2/s
+        self.q_heading = 0.02    # rad^2/s
+        self.q_slip = 0.1        # fraction of distance travelled
+
+        self.projection = None
+        self.state = np.zeros(3)
+        self.P = np.diag([1e4, 1e4, math.pi ** 2])
+        self.heading_initialized = False
+
+        self.velocity = 0.0      # m/s from the last command
+        self.yaw_rate = 0.0      # rad/s from the last command
+        self.last_odometry_time = None
+        self.last_predict_time = None
+        self.last_update_time = None
+        self.update_count = 0    # measurement updates applied so far
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self._predict_loop, daemon=True)]
+        if self.gps is not None:
+            self.threads.append(threading.Thread(target=self._gps_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _predict_loop(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.monotonic()
+        last_compass_time = None
+        while self.running:
+            if self.compass is not None:
+                # Only fuse fresh samples from the compass sampler thread;
+                # fall back to a direct read when it isn't running
+                sample = self.compass.latest
+                if sample is None:
+                    try:
+                        self.update_heading(self.compass.get_heading())
+                    except OSError as e:
+                        print(f"Compass read error: {e}")
+                elif sample[2] != last_compass_time:
+                    last_compass_time = sample[2]
+                    self.update_heading(sample[0])
+            self.predict()
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+    def _gps_loop(self):
+        while self.running:
+            fix = self.gps.read_fix()
+            if fix is not None:
+                self.update_gps(fix.latitude, fix.longitude, fix.hdop)
+
+    def set_command(self, speed, radius=float('inf')):
+        """Commanded wheel speed (RPM) and turning radius as sent to turn_while_moving"""
+        velocity = speed * self.speed_scale
+        with self.lock:
+            self._advance(time.monotonic())
+            self.velocity = velocity
+            # Positive radius turns left (counter-clockwise), which lowers a compass heading
+            if radius == 0 or math.isinf(radius):
+                self.yaw_rate = 0.0
+            else:
+                self.yaw_rate = -velocity / radius
+
+    def predict(self, now=None):
+        with self.lock:
+            self._advance(time.monotonic() if now is None else now)
+
+    def _advance(self, now):
+        if self.last_predict_time is None:
+            self.last_predict_time = now
+            return
+        dt = now - self.last_predict_time
+        self.last_predict_time = now
+        if dt <= 0:
+            return
+
+        # Odometry increments already moved the state; only inflate covariance
+        odometry_active = (self.last_odometry_time is not None and
+                           now - self.last_odometry_time < 0.5)
+        v = 0.0 if odometry_active else self.velocity
+        w = 0.0 if odometry_active else self.yaw_rate
+        self._propagate(v * dt, w * dt, dt)
+
+    def _propagate(self, distance, dheading, dt):
+        e, n, theta = self.state
+        mid = theta + dheading / 2
+        s, c = math.sin(mid), math.cos(mid)
+        self.state = np.array([e + distance * s, n + distance * c, wrap_angle(theta + dheading)])
+
+        F = np.array([[1.0, 0.0, distance * c],
+                      [0.0, 1.0, -distance * s],
+                      [0.0, 0.0, 1.0]])
+        slip = (self.q_slip * distance) ** 2
+        Q = np.diag([self.q_position * dt + slip,
+                     self.q_position * dt + slip,
+                     self.q_heading * dt + (self.q_slip * dheading) ** 2])
+        self.P = F @ self.P @ F.T + Q
+
+    def update_odometry(self, distance, dheading):
+        """Incremental travelled distance (m) and heading change (rad) from encoders or scan matching"""
+        with self.lock:
+            now = time.monotonic()
+            self._advance(now)
+            self.last_odometry_time = now
+            self._propagate(distance, dheading, 0.0)
+
+    def update_gps(self, lat, lon, hdop=None):
+        with self.lock:
+            self._advance(time.monotonic())
+            if self.projection is None:
+                self.projection = LocalProjection(lat, lon)
+                self.state[0] = self.state[1] = 0.0
+                self.P[:2, :] = 0.0
+                self.P[:, :2] = 0.0
+                self.P[0, 0] = self.P[1, 1] = self.gps_sigma ** 2
+                self.last_update_time = time.monotonic()
+                self.update_count += 1
+                return
+
+            z = np.array(self.projection.to_enu(lat, lon))
+            sigma = self.gps_sigma * (hdop if hdop else 1.0)
+            H = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+            R = np.eye(2) * sigma ** 2
+            innovation = z - self.state[:2]
+            S = H @ self.P @ H.T + R
+            K = self.P @ H.T @ np.linalg.inv(S)
+            self._apply(K, innovation, H, R)
+
+    def update_heading(self, heading):
+        with self.lock:
+            self._advance(time.monotonic())
+            if not self.heading_initialized:
+                self.state[2] = wrap_angle(heading)
+                self.P[2, 2] = self.compass_sigma ** 2
+                self.heading_initialized = True
+                self.update_count += 1
+                return
+
+            H = np.array([[0.0, 0.0, 1.0]])
+            R = np.array([[self.compass_sigma ** 2]])
+            innovation = np.array([wrap_angle(heading - self.state[2])])
+            S = H @ self.P @ H.T + R
+            K = self.P @ H.T / S
+            self._apply(K, innovation, H, R)
+
+    def _apply(self, K, innovation, H, R):
+        self.state = self.state + K @ innovation
+        self.state[2] = wrap_angle(self.state[2])
+        # Joseph form keeps P symmetric positive definite
+        I_KH = np.eye(3) - K @ H
+        self.P = I_KH @ self.P @ I_KH.T + K @ R @ K.T
+        self.last_update_time = time.monotonic()
+        self.update_count += 1
+
+    def get_pose(self):
+        """
+        Latest pose extrapolated to now, or None before the first GPS fix.
+        Heading is in [0, 2pi) like Compass.get_heading().
+        """
+        with self.lock:
+            if self.projection is None:
+                return None
+            self._advance(time.monotonic())
+            east, north, heading = (float(v) for v in self.state)
+            lat, lon = self.projection.to_latlon(east, north)
+            return {
+                'latitude': lat,
+                'longitude': lon,
+                'east': east,
+                'north': north,
+                'heading': heading % (2 * math.pi),
+                'speed': self.velocity,
+                'covariance': self.P.copy(),
+                'timestamp': self.last_predict_time,
+                'last_update': self.last_update_time,
+                'sequence': self.update_count,
+            }
@@ -0,0 +1,310 @@
+import csv
+import json
+import math
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+
+from navigation.geo import LocalProjection
+
+
+def _strip_namespace(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def load_gpx(path):
+    """Track points, falling back to route points and then plain waypoints"""
+    root = ET.parse(path).getroot()
+    points = {'trkpt': [], 'rtept': [], 'wpt': []}
+    for element in root.iter():
+        tag = _strip_namespace(element.tag)
+        if tag in points:
+            points[tag].append((float(element.get('lat')), float(element.get('lon'))))
+    return points['trkpt'] or points['rtept'] or points['wpt']
+
+
+def load_geojson(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    points = []
+    for feature in features:
+        geometry = feature.get('geometry', feature)
+        coords = geometry['coordinates']
+        if geometry['type'] == 'Point':
+            coords = [coords]
+        elif geometry['type'] == 'MultiLineString':
+            coords = [c for line in coords for c in line]
+        elif geometry['type'] != 'LineString':
+            continue
+        # GeoJSON stores [lon, lat]
+        points.extend((c[1], c[0]) for c in coords)
+    return points
+
+
+def load_csv(path):
+    """CSV with lat/lon (or latitude/longitude) columns, or two bare columns lat,lon"""
+    with open(path, "r", newline="") as f:
+        rows = [row for row in csv.reader(f) if row and not row[0].startswith('#')]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    lat_col, lon_col = 0, 1
+    for lat_name, lon_name in (('lat', 'lon'), ('latitude', 'longitude'), ('lat', 'lng')):
+        if lat_name in header and lon_name in header:
+            lat_col, lon_col = header.index(lat_name), header.index(lon_name)
+            rows = rows[1:]
+            break
+    return [(float(row[lat_col]), float(row[lon_col])) for row in rows]
+
+
+LOADERS = {
+    '.gpx': load_gpx,
+    '.geojson': load_geojson,
+    '.json': load_geojson,
+    '.csv': load_csv,
+}
+
+
+def load_route(path, cell_size=5.0):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported route file type: {extension}")
+    points = LOADERS[extension](path)
+    if not points:
+        raise ValueError(f"No points found in {path}")
+    print(f"Loaded {len(points)} route points from {path}")
+    return Route(points, cell_size=cell_size)
+
+
+class SegmentGrid:
+    """
+    Uniform grid over ENU coordinates mapping each cell to the route segments
+    that pass through it. Nearest-segment queries only look at the rings of
+    cells around the query point, so the cost doesn't grow with route length.
+    """
+
+    def __init__(self, starts, ends, cell_size=5.0):
+        self.starts = starts
+        self.ends = ends
+        self.cell_size = cell_size
+        self.cells = {}
+
+        for i in range(len(starts)):
+            length = math.hypot(*(ends[i] - starts[i]))
+            steps = max(1, int(math.ceil(length / (cell_size / 4))))
+            samples = starts[i] + np.outer(np.linspace(0, 1, steps + 1), ends[i] - starts[i])
+            for cell in set(map(tuple, np.floor(samples / cell_size).astype(int))):
+                self.cells.setdefault(cell, []).append(i)
+
+        if self.cells:
+            keys = np.array(list(self.cells.keys()))
+            self.min_cell = keys.min(axis=0)
+            self.max_cell = keys.max(axis=0)
+
+    def candidates(self, east, north, ring):
+        cx = int(math.floor(east / self.cell_size))
+        cy = int(math.floor(north / self.cell_size))
+        if ring == 0:
+            return self.cells.get((cx, cy), [])
+        found = []
+        for dx in range(-ring, ring + 1):
+            for dy in (-ring, ring):
+                found.extend(self.cells.get((cx + dx, cy + dy), ()))
+        for dy in range(-ring + 1, ring):
+            for dx in (-ring, ring):
+                found.extend(self.cells.get((cx + dx, cy + dy), ()))
+        return found
+
+    def max_ring(self, east, north):
+        cx = math.floor(east / self.cell_size)
+        cy = math.floor(north / self.cell_size)
+        return int(max(abs(cx - self.min_cell[0]), abs(cx - self.max_cell[0]),
+                       abs(cy - self.min_cell[1]), abs(cy - self.max_cell[1])))
+
+
+class Route:
+    """
+    Array-backed route: lat/lon, ENU coordinates, per-segment geometry and
+    cumulative arc length, plus a SegmentGrid for spatial queries.
+    Indexing and len() behave like the old list of (lat, lon) tuples.
+    """
+
+    def __init__(self, points, origin=None, cell_size=5.0):
+        self.latlon = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(self.latlon) == 0:
+            raise ValueError("Route needs at least one point")
+        if origin is None:
+            origin = self.latlon.mean(axis=0)
+        self.projection = LocalProjection(origin[0], origin[1])
+        east, north = self.projection.to_enu(self.latlon[:, 0], self.latlon[:, 1])
+        self.enu = np.column_stack((east, north))
+
+        self.segment_starts = self.enu[:-1]
+        self.segment_ends = self.enu[1:]
+        self.segment_vectors = self.segment_ends - self.segment_starts
+        self.segment_lengths = np.hypot(self.segment_vectors[:, 0], self.segment_vectors[:, 1])
+        self.arc_length = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self.index = SegmentGrid(self.segment_starts, self.segment_ends, cell_size)
+        self.max_search_rings = 10
+
+        # Filled in by compute_speed_profile()
+        self.profile_spacing = None
+        self.profile_curvature = None
+        self.speed_profile = None
+
+    def __len__(self):
+        return len(self.latlon)
+
+    def __getitem__(self, i):
+        lat, lon = self.latlon[i]
+        return (float(lat), float(lon))
+
+    def __iter__(self):
+        return ((float(lat), float(lon)) for lat, lon in self.latlon)
+
+    @property
+    def length(self):
+        return self.arc_length[-1]
+
+    def _project_onto(self, segments, east, north):
+        """Closest point on each given segment: (distances, t in [0, 1])"""
+        starts = self.segment_starts[segments]
+        vectors = self.segment_vectors[segments]
+        lengths_sq = np.maximum(self.segment_lengths[segments] ** 2, 1e-12)
+        rel = np.array((east, north)) - starts
+        t = np.clip((rel[:, 0] * vectors[:, 0] + rel[:, 1] * vectors[:, 1]) / lengths_sq, 0.0, 1.0)
+        closest = starts + vectors * t[:, None]
+        return np.hypot(closest[:, 0] - east, closest[:, 1] - north), t
+
+    def nearest_segment(self, east, north, min_index=0):
+        """
+        Nearest segment at or after min_index to an ENU point.
+        Returns (segment_index, t along the segment, distance) or None for a
+        single-point route.
+        """
+        if len(self.segment_lengths) <= min_index:
+            return None
+
+        best = None
+        cell_size = self.index.cell_size
+        rings = min(self.index.max_ring(east, north), self.max_search_rings)
+        for ring in range(rings + 1):
+            segments = [s for s in set(self.index.candidates(east, north, ring)) if s >= min_index]
+            if segments:
+                segments = np.array(segments)
+                distances, t = self._project_onto(segments, east, north)
+                i = int(np.argmin(distances))
+                if best is None or distances[i] < best[2]:
+                    best = (int(segments[i]), float(t[i]), float(distances[i]))
+            # Cells beyond this ring are at least (ring - 1) cells away, allowing
+            # for segments that only clip a neighbouring cell's corner
+            if best is not None and best[2] <= (ring - 1) * cell_size:
+                return best
+
+        if best is not None and rings == self.index.max_ring(east, north):
+            return best
+        # Far from the route (or no proof yet): brute force is still one NumPy pass
+        segments = np.arange(min_index, len(self.segment_lengths))
+        distances, t = self._project_onto(segments, east, north)
+        i = int(np.argmin(distances))
+        return (int(segments[i]), float(t[i]), float(distances[i]))
+
+    def nearest_segment_latlon(self, lat, lon, min_index=0):
+        east, north = self.projection.to_enu(lat, lon)
+        return self.nearest_segment(east, north, min_index)
+
+    def cross_track_error(self, east, north, min_index=0):
+        """Signed distance to the route in meters, positive when right of the direction of travel"""
+        nearest = self.nearest_segment(east, north, min_index)
+        if nearest is None:
+            return None
+        segment, _, distance = nearest
+        ve, vn = self.segment_vectors[segment]
+        se, sn = self.segment_starts[segment]
+        cross = ve * (north - sn) - vn * (east - se)
+        return -distance if cross > 0 else distance
+
+    def station(self, east, north, min_index=0):
+        """Arc length along the route of the closest point to (east, north)"""
+        nearest = self.nearest_segment(east, north, min_index)
+        if nearest is None:
+            return 0.0
+        segment, t, _ = nearest
+        return self.arc_length[segment] + t * self.segment_lengths[segment]
+
+    def next_waypoint_ahead(self, east, north, min_index=0):
+        """Index of the first waypoint past the closest point on the route"""
+        nearest = self.nearest_segment(east, north, min_index)
+        if nearest is None:
+            return 0
+        return nearest[0] + 1
+
+    def segment_at(self, s):
+        """Segment containing arc length s (clamped to the route)"""
+        if len(self.segment_lengths) == 0:
+            return 0
+        segment = int(np.searchsorted(self.arc_length, s, side='right')) - 1
+        return min(max(segment, 0), len(self.segment_lengths) - 1)
+
+    def point_at(self, s, segment=None):
+        """ENU point at arc length s. Pass the containing segment if already known."""
+        if len(self.segment_lengths) == 0:
+            return tuple(self.enu[0])
+        s = min(max(s, 0.0), self.length)
+        if segment is None:
+            segment = self.segment_at(s)
+        t = (s - self.arc_length[segment]) / max(self.segment_lengths[segment], 1e-12)
+        east, north = self.segment_starts[segment] + self.segment_vectors[segment] * t
+        return float(east), float(north)
+
+    def compute_speed_profile(self, max_speed, max_lateral_accel=0.3, max_accel=0.2,
+                              max_decel=0.3, spacing=0.25, smoothing=1.0, end_speed=0.0):
+        """
+        Precompute target speed (m/s) every `spacing` meters of arc length.
+
+        Curvature comes from the change in path heading over a `smoothing`
+        window (a polyline corner is spread over that distance), which caps
+        speed at sqrt(max_lateral_accel / curvature). A forward pass then
+        limits acceleration and a backward pass limits deceleration so the
+        robot starts braking before a corner rather than in it.
+        """
+        stations = np.arange(0.0, self.length + spacing, spacing)
+        if len(self.segment_lengths) == 0 or self.length == 0:
+            self.profile_spacing = spacing
+            self.profile_curvature = np.zeros(1)
+            self.speed_profile = np.array([end_speed])
+            return self.speed_profile
+
+        segment_headings = np.arctan2(self.segment_vectors[:, 0], self.segment_vectors[:, 1])
+        segments = np.clip(np.searchsorted(self.arc_length, stations, side='right') - 1,
+                           0, len(self.segment_lengths) - 1)
+        headings = np.unwrap(segment_headings[segments])
+
+        half = max(1, int(round(smoothing / spacing / 2)))
+        ahead = headings[np.minimum(np.arange(len(headings)) + half, len(headings) - 1)]
+        behind = headings[np.maximum(np.arange(len(headings)) - half, 0)]
+        curvature = np.abs(ahead - behind) / (2 * half * spacing)
+
+        with np.errstate(divide='ignore'):
+            speed = np.minimum(max_speed, np.sqrt(max_lateral_accel / curvature))
+
+        for i in range(1, len(speed)):
+            speed[i] = min(speed[i], math.sqrt(speed[i - 1] ** 2 + 2 * max_accel * spacing))
+        speed[-1] = min(speed[-1], end_speed)
+        for i in range(len(speed) - 2, -1, -1):
+            speed[i] = min(speed[i], math.sqrt(speed[i + 1] ** 2 + 2 * max_decel * spacing))
+
+        self.profile_spacing = spacing
+        self.profile_curvature = curvature
+        self.speed_profile = speed
+        return speed
+
+    def speed_at(self, s):
+        """Target speed (m/s) at arc length s from the precomputed profile"""
+        if self.speed_profile is None:
+            return None
+        i = int(s / self.profile_spacing)
+        return float(self.speed_profile[min(max(i, 0), len(self.speed_profile) - 1)])
@@ -0,0 +1,140 @@
+import time
+import numpy as np
+
+from navigation.geo import LocalProjection
+
+
+def distance_matrix(points):
+    """Pairwise planar distances (m) between (lat, lon) points in one NumPy pass"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    origin = points.mean(axis=0)
+    projection = LocalProjection(origin[0], origin[1])
+    east, north = projection.to_enu(points[:, 0], points[:, 1])
+    return np.hypot(east[:, None] - east[None, :], north[:, None] - north[None, :])
+
+
+def tour_length(tour, D):
+    return float(D[tour, np.roll(tour, -1)].sum())
+
+
+def nearest_neighbour_tour(D, start=0):
+    n = len(D)
+    visited = np.zeros(n, dtype=bool)
+    tour = np.empty(n, dtype=int)
+    tour[0] = start
+    visited[start] = True
+    for k in range(1, n):
+        distances = np.where(visited, np.inf, D[tour[k - 1]])
+        tour[k] = int(np.argmin(distances))
+        visited[tour[k]] = True
+    return tour
+
+
+def two_opt(tour, D, deadline):
+    """First-improvement 2-opt on a closed tour; each i scans all j at once"""
+    n = len(tour)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            c = tour[i + 2:]
+            d = np.roll(tour, -1)[i + 2:]
+            delta = D[a, c] + D[b, d] - D[a, b] - D[c, d]
+            if i == 0:
+                delta[-1] = 0  # edge (tour[-1], tour[0]) shares node a
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                j += i + 2
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return tour
+
+
+def or_opt(tour, D, deadline, max_segment=3):
+    """Move chains of 1..max_segment stops (optionally reversed) to their cheapest edge"""
+    n = len(tour)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            if n <= length + 2:
+                continue
+            i = 0
+            while i < n and time.perf_counter() < deadline:
+                segment = np.take(tour, range(i, i + length), mode='wrap')
+                prev_node = tour[(i - 1) % n]
+                next_node = tour[(i + length) % n]
+                first, last = segment[0], segment[-1]
+                removal_gain = D[prev_node, first] + D[last, next_node] - D[prev_node, next_node]
+
+                rest = np.take(tour, range(i + length, i + n), mode='wrap')
+                u, v = rest, np.roll(rest, -1)
+                forward = D[u, first] + D[last, v] - D[u, v]
+                backward = D[u, last] + D[first, v] - D[u, v]
+                forward[-1] = backward[-1] = np.inf  # that's where it came from
+
+                k_f, k_b = int(np.argmin(forward)), int(np.argmin(backward))
+                best, reverse, k = (forward[k_f], False, k_f) if forward[k_f] <= backward[k_b] else (backward[k_b], True, k_b)
+                if best < removal_gain - 1e-9:
+                    insert = segment[::-1] if reverse else segment
+                    tour = np.concatenate((rest[:k + 1], insert, rest[k + 1:]))
+                    improved = True
+                i += 1
+    return tour
+
+
+def optimize_order(D, start=0, time_budget=0.5):
+    """
+    Near-optimal closed tour over distance matrix D starting at `start`.
+    Nearest-neighbour construction, then alternating 2-opt and Or-opt until
+    neither improves or the time budget (seconds) runs out.
+    """
+    deadline = time.perf_counter() + time_budget
+    tour = nearest_neighbour_tour(D, start)
+    best_length = tour_length(tour, D)
+    while time.perf_counter() < deadline:
+        tour = two_opt(tour, D, deadline)
+        tour = or_opt(tour, D, deadline)
+        length = tour_length(tour, D)
+        if length >= best_length - 1e-9:
+            break
+        best_length = length
+
+    # Rotate so the tour starts at the depot again
+    shift = int(np.where(tour == start)[0][0])
+    return np.roll(tour, -shift)
+
+
+def plan_stop_order(depot, stops, return_to_depot=True, time_budget=0.5):
+    """
+    Order delivery stops (list of (lat, lon)) for a robot leaving from depot.
+    Returns (ordered_stops, order) where order indexes into `stops`. The
+    depot itself isn't included in ordered_stops.
+    """
+    if len(stops) < 2:
+        return list(stops), list(range(len(stops)))
+
+    D = distance_matrix([depot] + list(stops))
+    if not return_to_depot:
+        # Dummy node: free to link to the depot, a constant cost to link to
+        # anything else. Every good tour then runs depot -> ... -> last -> dummy,
+        # which is an open path with a free end.
+        n = len(D)
+        padded = np.zeros((n + 1, n + 1))
+        padded[:n, :n] = D
+        padded[n, 1:n] = padded[1:n, n] = D.max() * 2 + 1
+        D = padded
+
+    tour = optimize_order(D, 0, time_budget)
+    if not return_to_depot:
+        dummy = len(D) - 1
+        if tour[1] == dummy:
+            tour = np.concatenate(([0], tour[2:][::-1]))
+        else:
+            tour = tour[tour != dummy]
+
+    order = [int(i) - 1 for i in tour[1:]]
+    return [stops[i] for i in order], order
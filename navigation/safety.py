@@ -0,0 +1,165 @@
+import threading
+import time
+
+from navigation.scheduler import Histogram
+
+# Reaction time bins (ms): sensor timestamp to stop frame on the wire
+REACTION_EDGES_MS = (2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class SafetyMonitor:
+    """
+    Watchdog that stops the robot independently of the navigation loop.
+
+    It subscribes to the lidar and wakes on every new revolution (and polls
+    an optional UltrasonicArray, assumed forward facing, every
+    sonar_interval). If anything in the forward sector is within
+    stop_distance it trips: the stop command goes out through the serial
+    writer's priority path, preempting whatever is queued, and locks out
+    forward motion in the writer itself until release; blocks_forward()
+    stays True as well so the nav loop can skip forward commands early
+    (reversing and turning in place are still allowed).
+
+    The lidar and each sonar hold their own blocked flag, set at
+    stop_distance and only cleared by a new reading from that same source
+    beyond stop_distance + release_margin; a sonar timeout (no echo) never
+    releases. The robot is released once no source is blocked, so one
+    sensor's clear reading never releases a stop another sensor still sees,
+    and a sonar that goes stale or silent stays blocked.
+
+    Reaction time is measured from the reading's timestamp to the stop
+    being written.
+    """
+
+    def __init__(self, lidar, writer, stop_command, stop_distance=0.5, sector_deg=30,
+                 sonars=None, sonar_interval=0.02, release_margin=0.1):
+        self.writer = writer
+        self.stop_command = stop_command
+        self.stop_distance = stop_distance
+        self.sector_deg = sector_deg
+        self.sonars = sonars
+        self.sonar_interval = sonar_interval
+        self.release_margin = release_margin
+
+        self.condition = threading.Condition()
+        self.pending_scan = None  # (scan, timestamp, seq) not yet checked
+        self.last_sonar_times = {}  # sonar name -> timestamp of the last reading checked
+        self.blocked = {}  # source -> blocked flag
+        self.running = False
+
+        self.scans_checked = 0
+        self.trips = 0
+        self.releases = 0
+        self.last_trip = None
+        self.reaction_histogram = Histogram(REACTION_EDGES_MS)
+        self.reaction_max = 0.0
+
+        if lidar is not None:
+            lidar.add_listener(self.handle_scan)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="safety-monitor")
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def handle_scan(self, scan, timestamp, seq):
+        """Lidar listener; only hands the scan over so the lidar thread is never held up"""
+        with self.condition:
+            self.pending_scan = (scan, timestamp, seq)
+            self.condition.notify()
+
+    def forward_distance(self, scan):
+        nearest = None
+        for angle, dist in scan:
+            if angle < self.sector_deg or angle > 360 - self.sector_deg:
+                if nearest is None or dist < nearest:
+                    nearest = dist
+        return nearest / 1000.0 if nearest is not None else None
+
+    def _run(self):
+        timeout = self.sonar_interval if self.sonars is not None else None
+        while True:
+            with self.condition:
+                if self.pending_scan is None and self.running:
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                pending, self.pending_scan = self.pending_scan, None
+
+            if pending is not None:
+                scan, timestamp, _ = pending
+                self.scans_checked += 1
+                # An empty scan says nothing about the sector, so it leaves the flag alone
+                if scan:
+                    # A revolution with nothing in the sector is a real clear reading
+                    distance = self.forward_distance(scan)
+                    self.check(distance if distance is not None else float('inf'), timestamp, "lidar")
+            if self.sonars is not None:
+                self.check_sonars()
+
+    def check_sonars(self):
+        """Check every sonar's newest reading against that sonar's own flag"""
+        for name, (distance, timestamp) in self.sonars.get_readings().items():
+            last = self.last_sonar_times.get(name)
+            if last is not None and timestamp <= last:
+                continue  # no new ping; the flag keeps whatever the last one said
+            self.last_sonar_times[name] = timestamp
+            # No echo is not proof of a clear path: an HC-SR04 also misses
+            # echoes from something touching it, so it can only hold a trip
+            self.check(distance / 100.0 if distance is not None else None, timestamp, f"sonar {name}")
+
+    def check(self, distance, timestamp, source):
+        """
+        Update source's flag with a new reading. None carries no information:
+        it neither trips nor releases, so a source that stops reporting or
+        only times out keeps its trip.
+        """
+        if distance is None:
+            return
+        if distance <= self.stop_distance:
+            if not self.blocked.get(source):
+                was_tripped = self.tripped
+                self.blocked[source] = True
+                if not was_tripped:
+                    self.trip(distance, timestamp, source)
+        elif self.blocked.get(source) and distance > self.stop_distance + self.release_margin:
+            self.blocked[source] = False
+            if not self.tripped:
+                self.writer.set_forward_lock(False)
+                self.releases += 1
+
+    @property
+    def tripped(self):
+        return any(self.blocked.values())
+
+    def trip(self, distance, timestamp, source):
+        self.trips += 1
+        # The writer holds forward commands back from here on, even ones already queued
+        sent = self.writer.send_now(*self.stop_command, lock_forward=True)
+        reaction = time.monotonic() - timestamp if timestamp is not None else None
+        if reaction is not None:
+            self.reaction_histogram.add(reaction * 1000)
+            self.reaction_max = max(self.reaction_max, reaction)
+        self.last_trip = {'source': source, 'distance': distance, 'reaction': reaction, 'sent': sent}
+        print(f"Safety stop - {source} obstacle at {distance:.2f}m"
+              + (f", reaction {reaction * 1000:.1f}ms" if reaction is not None else ""))
+
+    def blocks_forward(self):
+        return self.tripped
+
+    def get_stats(self):
+        return {
+            'tripped': self.tripped,
+            'blocked_by': [source for source, blocked in self.blocked.items() if blocked],
+            'trips': self.trips,
+            'releases': self.releases,
+            'scans_checked': self.scans_checked,
+            'last_trip': self.last_trip,
+            'reaction_max_ms': self.reaction_max * 1000,
+            'reaction_histogram': self.reaction_histogram.as_dict(),
+        }
@@ -0,0 +1,117 @@
+import bisect
+import time
+from collections import deque
+
+# Upper edges (ms) of the jitter and tick duration histogram bins; the last
+# bin collects everything above
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, edges=HISTOGRAM_EDGES_MS):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+
+    def add(self, value_ms):
+        self.counts[bisect.bisect_left(self.edges, value_ms)] += 1
+
+    def as_dict(self):
+        labels = [f"<={edge}ms" for edge in self.edges] + [f">{self.edges[-1]}ms"]
+        return dict(zip(labels, self.counts))
+
+
+class LoopScheduler:
+    """
+    Runs a control loop at a fixed rate against monotonic deadlines.
+
+    Call tick() at the top of every iteration: it sleeps until the next
+    deadline and books the previous tick's duration. Deadlines advance by
+    exactly one period, so a slow tick doesn't shift every later one; if a
+    tick overruns by whole periods those deadlines are skipped rather than
+    run back to back. After an overrun, shed() tells the loop to drop
+    non-critical work for one tick (at most max_consecutive_shed in a row so
+    it's never starved).
+    """
+
+    def __init__(self, rate_hz=10, history=200, max_consecutive_shed=2):
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.max_consecutive_shed = max_consecutive_shed
+
+        self.next_deadline = None
+        self.tick_start = None
+        self.overran = False
+        self.consecutive_shed = 0
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.shed_ticks = 0
+        self.durations = deque(maxlen=history)
+        self.starts = deque(maxlen=history)
+        self.jitter_histogram = Histogram()
+        self.duration_histogram = Histogram()
+
+    def tick(self):
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        elif self.tick_start is not None:
+            duration = now - self.tick_start
+            self.durations.append(duration)
+            self.duration_histogram.add(duration * 1000)
+            self.overran = duration > self.period
+            if self.overran:
+                self.overruns += 1
+
+        # Drop deadlines we're already a whole period past instead of
+        # running several ticks back to back to catch up
+        missed = int((now - self.next_deadline) / self.period)
+        if missed > 0:
+            self.skipped += missed
+            self.next_deadline += missed * self.period
+
+        delay = self.next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+
+        self.tick_start = time.monotonic()
+        self.jitter_histogram.add(max(0.0, self.tick_start - self.next_deadline) * 1000)
+        self.starts.append(self.tick_start)
+        self.ticks += 1
+        self.next_deadline += self.period
+
+    def remaining(self):
+        """Seconds left in the current tick's budget"""
+        if self.tick_start is None:
+            return self.period
+        return self.period - (time.monotonic() - self.tick_start)
+
+    def shed(self):
+        """Whether to skip non-critical work this tick because the last one overran"""
+        if self.overran and self.consecutive_shed < self.max_consecutive_shed:
+            self.consecutive_shed += 1
+            self.shed_ticks += 1
+            self.overran = False
+            return True
+        self.consecutive_shed = 0
+        return False
+
+    def get_stats(self):
+        stats = {
+            'target_rate_hz': self.rate_hz,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'skipped_deadlines': self.skipped,
+            'shed_ticks': self.shed_ticks,
+            'jitter_histogram': self.jitter_histogram.as_dict(),
+            'duration_histogram': self.duration_histogram.as_dict(),
+        }
+        if self.durations:
+            ordered = sorted(self.durations)
+            stats['duration_mean_ms'] = 1000 * sum(ordered) / len(ordered)
+            stats['duration_p95_ms'] = 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            stats['duration_max_ms'] = 1000 * ordered[-1]
+        if len(self.starts) > 1:
+            stats['achieved_rate_hz'] = (len(self.starts) - 1) / (self.starts[-1] - self.starts[0])
+        return stats
@@ -0,0 +1,74 @@
+import time
+
+
+class Reading:
+    """One sensor value with the monotonic time it was produced and its source sequence number"""
+
+    __slots__ = ('value', 'timestamp', 'seq')
+
+    def __init__(self, value, timestamp=None, seq=None):
+        self.value = value
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def age(self, now=None):
+        if self.timestamp is None:
+            return None
+        return (now if now is not None else time.monotonic()) - self.timestamp
+
+    def __repr__(self):
+        return f"Reading(value={self.value!r}, timestamp={self.timestamp}, seq={self.seq})"
+
+
+class SensorSnapshot:
+    """
+    Everything one control tick decides on, read once at the start of the
+    tick. Each source is read under its own lock exactly once, and the gap
+    angle is guaranteed to come from the same lidar revolution as the scan,
+    so every decision in the tick sees one consistent world. as_dict()
+    gives a plain record that can be logged and replayed.
+    """
+
+    def __init__(self, tick, scan, gap, detections, fix, heading, created=None):
+        self.tick = tick
+        self.created = created if created is not None else time.monotonic()
+        self.scan = scan              # Reading: [(angle_deg, dist_mm), ...]
+        self.gap = gap                # Reading: gap angle in radians or None
+        self.detections = detections  # Reading: camera objects
+        self.fix = fix                # Reading: (lat, lon) or None
+        self.heading = heading        # Reading: radians clockwise from north
+
+    @classmethod
+    def capture(cls, tick, lidar, ftg, camera, waypoint_navigator):
+        created = time.monotonic()
+        scan, scan_time, scan_seq = lidar.get_scan_stamped()
+        gap = ftg.gap_for_scan(scan, scan_seq)
+        objects, detection_time, detection_seq = camera.get_objects_stamped()
+        position, heading, pose_time, pose_seq = waypoint_navigator.get_pose_stamped()
+        return cls(tick,
+                   Reading(scan, scan_time, scan_seq),
+                   Reading(gap, scan_time, scan_seq),
+                   Reading(objects, detection_time, detection_seq),
+                   Reading(position, pose_time, pose_seq),
+                   Reading(heading, pose_time, pose_seq),
+                   created)
+
+    @property
+    def pose(self):
+        """(position, heading) in the form WaypointNavigator.get_navigation_command() takes"""
+        return self.fix.value, self.heading.value
+
+    def as_dict(self):
+        readings = {name: {'value': reading.value, 'timestamp': reading.timestamp, 'seq': reading.seq}
+                    for name, reading in (('scan', self.scan), ('gap', self.gap),
+                                          ('detections', self.detections), ('fix', self.fix),
+                                          ('heading', self.heading))}
+        return {'tick': self.tick, 'created': self.created, **readings}
+
+    @classmethod
+    def from_dict(cls, data):
+        def reading(name):
+            entry = data[name]
+            return Reading(entry['value'], entry['timestamp'], entry['seq'])
+        return cls(data['tick'], reading('scan'), reading('gap'), reading('detections'),
+                   reading('fix'), reading('heading'), data['created'])
@@ -0,0 +1,148 @@
+import math
+import numpy as np
+
+
+class PurePursuitTracker:
+    """
+    Pure-pursuit path tracker over a Route's arc-length parameterised polyline.
+
+    The closest point is searched only in a short window of segments after
+    the previous one, and the lookahead point is found by walking forward in
+    arc length from there, so each tick is O(window) regardless of route size.
+    Radius sign follows Bot::turn_while_moving: positive turns left.
+
+    Speed comes from the route's precomputed curvature/acceleration limited
+    profile (computed here once if the route doesn't have one yet), looked
+    up by arc length and converted to wheel RPM with speed_scale.
+    """
+
+    def __init__(self, route, base_speed, lookahead=2.0, min_radius=0.5,
+                 straight_radius=10.0, goal_radius=1.0, search_window=20,
+                 relocalize_distance=5.0, wheel_radius=0.05, min_speed_fraction=0.25):
+        self.route = route
+        self.base_speed = base_speed
+        self.speed_scale = 2 * math.pi * wheel_radius / 60.0  # m/s per RPM
+        self.min_speed = base_speed * min_speed_fraction
+        if route.speed_profile is None:
+            # Pure pursuit rounds corners over about one lookahead distance
+            route.compute_speed_profile(max_speed=base_speed * self.speed_scale, smoothing=lookahead)
+        self.lookahead = lookahead
+        self.min_radius = min_radius
+        self.straight_radius = straight_radius
+        self.goal_radius = goal_radius
+        self.search_window = search_window
+        self.relocalize_distance = relocalize_distance
+        self.reset()
+
+    def reset(self, segment=0):
+        self.segment = segment
+        self.station = self.route.arc_length[min(segment, len(self.route) - 1)]
+        self.path_distance = 0.0
+        self.lookahead_point = None
+        self.finished = False
+
+    def _update_station(self, east, north):
+        n_segments = len(self.route.segment_lengths)
+        if n_segments == 0:
+            return 0.0
+        window = np.arange(self.segment, min(self.segment + self.search_window, n_segments))
+        distances, t = self.route._project_onto(window, east, north)
+        i = int(np.argmin(distances))
+        distance = float(distances[i])
+
+        if distance > self.relocalize_distance:
+            # Knocked off the path (e.g. after avoidance): use the spatial index
+            nearest = self.route.nearest_segment(east, north, self.segment)
+            self.segment, t_best, distance = nearest
+        else:
+            self.segment, t_best = int(window[i]), float(t[i])
+
+        self.station = self.route.arc_length[self.segment] + t_best * self.route.segment_lengths[self.segment]
+        return distance
+
+    def compute_command(self, east, north, heading, speed=None):
+        """
+        heading in radians clockwise from north (compass convention).
+        Returns (speed, radius); radius is inf for straight driving.
+        """
+        self.path_distance = self._update_station(east, north)
+
+        goal_east, goal_north = self.route.enu[-1]
+        goal_distance = math.hypot(goal_east - east, goal_north - north)
+        if self.route.length - self.station < self.goal_radius and goal_distance < self.goal_radius:
+            self.finished = True
+            return 0, float('inf')
+
+        if speed is None:
+            # The profile already brakes for corners and the goal; keep a floor
+            # so the motors don't stall short of it
+            profile_speed = self.route.speed_at(self.station) / self.speed_scale
+            speed = min(self.base_speed, max(self.min_speed, profile_speed))
+
+        target_s = self.station + self.lookahead
+        segment = self.segment
+        while segment < len(self.route.segment_lengths) - 1 and self.route.arc_length[segment + 1] < target_s:
+            segment += 1
+        target_east, target_north = self.route.point_at(target_s, segment)
+        self.lookahead_point = (target_east, target_north)
+
+        # Target in the robot frame: x forward, y to the left
+        de = target_east - east
+        dn = target_north - north
+        sin_h, cos_h = math.sin(heading), math.cos(heading)
+        x = de * sin_h + dn * cos_h
+        y = -de * cos_h + dn * sin_h
+        distance_sq = x * x + y * y
+        if distance_sq < 1e-6:
+            return speed, float('inf')
+
+        curvature = 2 * y / distance_sq
+        if abs(curvature) < 1 / self.straight_radius:
+            radius = float('inf')
+        else:
+            radius = 1 / curvature
+            radius = math.copysign(max(self.min_radius, abs(radius)), radius)
+
+        return speed, radius
+
+    def plan_trajectory(self, east, north, heading, segments=5, segment_time=0.2):
+        """
+        Roll the tracker forward from the current pose to build a short
+        trajectory of (duration, radius, speed) segments for the Arduino to
+        execute on its own. Consecutive identical segments are merged. The
+        tracker's state afterwards is the same as after one compute_command().
+        """
+        e, n, h = east, north, heading
+        plan = []
+        state = None
+        for _ in range(segments):
+            speed, radius = self.compute_command(e, n, h)
+            if state is None:
+                state = (self.segment, self.station, self.path_distance, self.lookahead_point, self.finished)
+            if speed <= 0:
+                break
+            if plan and plan[-1][1:] == (radius, speed):
+                plan[-1] = (plan[-1][0] + segment_time, radius, speed)
+            else:
+                plan.append((segment_time, radius, speed))
+
+            # Unicycle step; positive radius turns left, lowering the compass heading
+            distance = speed * self.speed_scale * segment_time
+            dheading = 0.0 if math.isinf(radius) else -distance / radius
+            mid = h + dheading / 2
+            e += distance * math.sin(mid)
+            n += distance * math.cos(mid)
+            h = (h + dheading) % (2 * math.pi)
+
+        self.segment, self.station, self.path_distance, self.lookahead_point, self.finished = state
+        return plan
+
+    def get_status(self):
+        return {
+            'segment': self.segment,
+            'station': float(self.station),
+            'path_distance': self.path_distance,
+            'target_speed': self.route.speed_at(self.station),
+            'lookahead_point': self.lookahead_point,
+            'finished': self.finished,
+        }
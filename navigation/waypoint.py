@@ -1,12 +1,81 @@
 import math
+import time
+import numpy as np
+
+from navigation.route import Route
 
 class WaypointNavigator:
-    def __init__(self, gps, compass, waypoints):
+    def __init__(self, gps, compass, waypoints, pose_estimator=None, geofence=None):
         self.gps = gps
         self.compass = compass
-        self.waypoints = waypoints
+        # When set, position and heading come from the filtered pose instead
+        # of a blocking GPS read and a raw compass read per call
+        self.pose_estimator = pose_estimator
+        # Optional navigation.geofence.Geofence checked every tick
+        self.geofence = geofence
+        self.inside_geofence = True
         self.waypoint_rad = 1
+        self.last_position = None
+        self.last_heading = None
+        self.pose_reads = 0
+        # (route, waypoint_index) to go back to while following a detour
+        self.detour_from = None
+        self.set_waypoints(waypoints)
+
+    def set_waypoints(self, waypoints):
+        """
+        Load a route (a Route or a list of (lat, lon)) projected once onto a
+        tangent plane at its centroid. Per-tick distance and bearing are then
+        planar math on these arrays.
+        """
+        self.route = waypoints if isinstance(waypoints, Route) else Route(waypoints)
+        self.waypoints = self.route
         self.waypoint_index = 0
+        self.projection = self.route.projection
+        self.waypoints_enu = self.route.enu
+
+    def resume_route(self, lat=None, lon=None):
+        """
+        Re-enter the route after a detour: continue from the first waypoint
+        past the closest point on any segment not yet completed. Defaults to
+        the position seen by the last get_navigation_command().
+        """
+        if lat is None or lon is None:
+            if self.last_position is None:
+                return self.waypoint_index
+            lat, lon = self.last_position
+        east, north = self.projection.to_enu(lat, lon)
+        min_segment = max(0, self.waypoint_index - 1)
+        self.waypoint_index = min(self.route.next_waypoint_ahead(east, north, min_segment),
+                                  len(self.waypoints) - 1)
+        return self.waypoint_index
+
+    @property
+    def on_detour(self):
+        return self.detour_from is not None
+
+    def follow_detour(self, points):
+        """
+        Temporarily follow points (lat, lon), e.g. a grid planner path out of
+        a dead end, starting at the robot. Called again with a replanned path
+        it just replaces the detour; end_detour() rejoins the route where it
+        was left.
+        """
+        if self.detour_from is None:
+            self.detour_from = (self.route, self.waypoint_index)
+        origin = (self.projection.origin_lat, self.projection.origin_lon)
+        self.set_waypoints(Route(points, origin=origin))
+        # The first point is the cell the robot is in
+        self.waypoint_index = min(1, len(self.waypoints) - 1)
+
+    def end_detour(self):
+        if self.detour_from is None:
+            return
+        route, index = self.detour_from
+        self.detour_from = None
+        self.set_waypoints(route)
+        self.waypoint_index = index
+        self.resume_route()
 
     def haversine(self, lat1, lon1, lat2, lon2):
         R = 6371000 # radius of the earth
@@ -40,20 +109,71 @@ class WaypointNavigator:
         theta = math.atan2(y, x)
         return (theta + 2 * math.pi) % (2 * math.pi)
 
-    def get_navigation_command(self):
+    def local_distance_bearing(self, lat, lon, index):
+        """Planar distance (m) and bearing (rad, clockwise from north) to waypoint index"""
+        east, north = self.projection.to_enu(lat, lon)
+        target_east, target_north = self.waypoints_enu[index]
+        de = target_east - east
+        dn = target_north - north
+        return math.hypot(de, dn), math.atan2(de, dn) % (2 * math.pi)
+
+    def remaining_distances_bearings(self, lat, lon):
+        """Distances and bearings from (lat, lon) to every waypoint not yet reached, in one pass"""
+        east, north = self.projection.to_enu(lat, lon)
+        delta = self.waypoints_enu[self.waypoint_index:] - (east, north)
+        distances = np.hypot(delta[:, 0], delta[:, 1])
+        bearings = np.arctan2(delta[:, 0], delta[:, 1]) % (2 * math.pi)
+        return distances, bearings
+
+    def get_current_pose(self):
+        if self.pose_estimator is not None:
+            pose = self.pose_estimator.get_pose()
+            if pose is None:
+                return None, None
+            return (pose['latitude'], pose['longitude']), pose['heading']
+
         current_pos = self.gps.read_location()
+        if current_pos is None:
+            return None, None
+        return current_pos, self.compass.get_heading()
+
+    def geofence_allows(self, distance, heading_offset=0.0):
+        """
+        Whether the point `distance` meters ahead of the last position (along
+        the last heading plus heading_offset, clockwise) is inside the fence.
+        Always True without a geofence or before the first fix.
+        """
+        if self.geofence is None or self.last_position is None or self.last_heading is None:
+            return True
+        lat, lon = self.last_position
+        return self.geofence.is_allowed_ahead(lat, lon, self.last_heading + heading_offset, distance)
+
+    def get_pose_stamped(self):
+        """(position, heading, monotonic timestamp, sequence number) for a SensorSnapshot"""
+        if self.pose_estimator is not None:
+            pose = self.pose_estimator.get_pose()
+            if pose is None:
+                return None, None, None, None
+            return ((pose['latitude'], pose['longitude']), pose['heading'],
+                    pose['timestamp'], pose['sequence'])
+
+        position, heading = self.get_current_pose()
+        self.pose_reads += 1
+        return position, heading, time.monotonic(), self.pose_reads
+
+    def get_navigation_command(self, pose=None):
+        """pose is an optional (position, heading) already read this tick"""
+        current_pos, heading = pose if pose is not None else self.get_current_pose()
         if current_pos is None:
             print("GPS no fix")
             return None, None, None
 
         current_lat, current_lon = current_pos
-        curr_waypoint = self.waypoints[self.waypoint_index]
-        dist = self.haversine(current_lat, current_lon,
-                              curr_waypoint[0], curr_waypoint[1])
-
-       
-        desired_bearing = self.bearing(current_lat, current_lon, curr_waypoint[0], curr_waypoint[1])
-        heading = self.compass.get_heading()
+        self.last_position = current_pos
+        self.last_heading = heading
+        if self.geofence is not None:
+            self.inside_geofence = self.geofence.is_allowed(current_lat, current_lon)
+        dist, desired_bearing = self.local_distance_bearing(current_lat, current_lon, self.waypoint_index)
 
         heading_error = (desired_bearing - heading + math.pi) % (2 * math.pi) - math.pi
 
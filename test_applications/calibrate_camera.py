@@ -0,0 +1,122 @@
+"""
+Intrinsic calibration for the webcam with a printed chessboard.
+
+Usage:
+    python test_applications/calibrate_camera.py [output.npz] [camera_id | image_dir]
+
+Headless: hold the board in front of the camera and move it around. A view
+is kept whenever the board is found and has moved since the last kept view,
+until VIEWS are collected; cover the corners and edges of the image, where
+the distortion is. Alternatively calibrate from a directory of saved
+images. The result (camera_matrix, dist_coeffs, image_size, rms) is written
+to output.npz (default camera_calibration.npz), which Camera(calibration=...)
+loads.
+"""
+import glob
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+PATTERN = (9, 6)       # inner corners per row, per column
+SQUARE_SIZE = 0.025    # m; only scales the extrinsics, not the intrinsics
+VIEWS = 25
+MIN_MOVE = 40          # px mean corner shift between kept views
+WIDTH, HEIGHT = 640, 480
+
+CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+
+def board_points():
+    points = np.zeros((PATTERN[0] * PATTERN[1], 3), np.float32)
+    points[:, :2] = np.mgrid[0:PATTERN[0], 0:PATTERN[1]].T.reshape(-1, 2) * SQUARE_SIZE
+    return points
+
+
+def find_corners(gray):
+    found, corners = cv2.findChessboardCorners(
+        gray, PATTERN, cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK)
+    if not found:
+        return None
+    return cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), CRITERIA)
+
+
+def views_from_images(directory):
+    views, size = [], None
+    paths = sorted(glob.glob(os.path.join(directory, "*.png")) + glob.glob(os.path.join(directory, "*.jpg")))
+    for path in paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        size = (gray.shape[1], gray.shape[0])
+        corners = find_corners(gray)
+        print(f"{os.path.basename(path)}: {'board found' if corners is not None else 'no board'}")
+        if corners is not None:
+            views.append(corners)
+    return views, size
+
+
+def views_from_camera(camera_id):
+    cap = cv2.VideoCapture(camera_id)
+    if not cap.isOpened():
+        raise Exception(f"Could not open camera {camera_id}")
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, HEIGHT)
+
+    views, size, last = [], None, None
+    print(f"Move the {PATTERN[0]}x{PATTERN[1]} board around the view, Ctrl+C to stop early")
+    try:
+        while len(views) < VIEWS:
+            ret, frame = cap.read()
+            if not ret:
+                time.sleep(0.1)
+                continue
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            size = (gray.shape[1], gray.shape[0])
+            corners = find_corners(gray)
+            if corners is None:
+                continue
+            if last is not None and np.linalg.norm(corners - last, axis=2).mean() < MIN_MOVE:
+                continue
+            views.append(corners)
+            last = corners
+            print(f"view {len(views)}/{VIEWS} kept")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        cap.release()
+    return views, size
+
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else "camera_calibration.npz"
+    source = sys.argv[2] if len(sys.argv) > 2 else "0"
+    if os.path.isdir(source):
+        views, size = views_from_images(source)
+    else:
+        views, size = views_from_camera(int(source))
+
+    if len(views) < 5:
+        print(f"Only {len(views)} views with the board, need at least 5")
+        return
+
+    objects = [board_points()] * len(views)
+    rms, camera_matrix, dist_coeffs, rvecs, tvecs = cv2.calibrateCamera(objects, views, size, None, None)
+
+    errors = []
+    for points, corners, rvec, tvec in zip(objects, views, rvecs, tvecs):
+        projected, _ = cv2.projectPoints(points, rvec, tvec, camera_matrix, dist_coeffs)
+        errors.append(np.linalg.norm(projected - corners, axis=2).mean())
+    print(f"{len(views)} views, RMS reprojection error {rms:.3f} px (worst view {max(errors):.3f} px)")
+    print(f"fx {camera_matrix[0, 0]:.1f} fy {camera_matrix[1, 1]:.1f} "
+          f"cx {camera_matrix[0, 2]:.1f} cy {camera_matrix[1, 2]:.1f}")
+    print(f"distortion {np.round(dist_coeffs.ravel(), 4)}")
+
+    np.savez(output, camera_matrix=camera_matrix, dist_coeffs=dist_coeffs,
+             image_size=np.array(size), rms=rms)
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
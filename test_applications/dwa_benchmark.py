@@ -0,0 +1,71 @@
+"""
+Benchmark for the DWA local planner.
+
+Usage:
+    python test_applications/dwa_benchmark.py [repeats]
+
+A synthetic front-facing scan (the Lidar class keeps 260..100 degrees) with
+a wall and a couple of posts is planned against while the goal sits behind
+the nearest post. Reports planning latency against the number of sampled
+arcs, next to the FTG gap search on the same scan.
+"""
+import math
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.dwa import DWAPlanner
+from navigation.ftg import FollowTheGapWorker
+
+
+def synthetic_scan(points_per_degree=2):
+    """[(angle_deg clockwise, dist_mm), ...] with a wall 3 m ahead and two posts"""
+    obstacles = [(1.2, 0.2, 0.15), (2.0, -0.8, 0.2)]  # x, y (left), radius in m
+    scan = []
+    for angle in np.arange(0, 360, 1 / points_per_degree):
+        if 100 <= angle <= 260:
+            continue
+        bearing = -math.radians(angle)
+        dx, dy = math.cos(bearing), math.sin(bearing)
+        distance = 3.0 / dx if dx > 0.1 else 8.0
+        for ox, oy, radius in obstacles:
+            along = ox * dx + oy * dy
+            miss = (ox - along * dx) ** 2 + (oy - along * dy) ** 2
+            if along > 0 and miss <= radius ** 2:
+                distance = min(distance, along - math.sqrt(radius ** 2 - miss))
+        scan.append((float(angle), min(distance, 8.0) * 1000))
+    return scan
+
+
+def time_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) * 1000 / repeats, result
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    scan = synthetic_scan()
+    print(f"scan points: {len(scan)}, repeats: {repeats}")
+
+    ftg = FollowTheGapWorker.__new__(FollowTheGapWorker)  # no worker thread, just the gap search
+    ftg.min_gap_dist = 1000
+    ftg_ms, gap = time_call(lambda: ftg._follow_the_gap(scan), repeats)
+    print(f"FTG gap search: {ftg_ms:.3f} ms, gap at {math.degrees(gap):.0f} deg")
+
+    print(f"{'speeds':>6} {'yaw rates':>9} {'arcs':>6} {'plan ms':>8} {'speed RPM':>10} {'radius m':>9}")
+    for speed_samples, yaw_samples in ((3, 7), (5, 11), (7, 21), (11, 31), (15, 51), (21, 101)):
+        planner = DWAPlanner(speed_samples=speed_samples, yaw_samples=yaw_samples)
+        # Already cruising at 40 RPM so the window spans several speeds
+        velocity = 40 * planner.speed_scale
+        plan = lambda: planner.plan(scan, goal_bearing=-0.1, goal_distance=4.0, velocity=velocity)
+        plan_ms, (speed, radius) = time_call(plan, repeats)
+        arcs = len(planner.last_scores) if planner.last_scores is not None else 0
+        print(f"{speed_samples:>6} {yaw_samples:>9} {arcs:>6} {plan_ms:>8.3f} {speed:>10.1f} {radius:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
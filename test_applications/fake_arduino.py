@@ -0,0 +1,253 @@
+"""
+Stand-in for the Mega on a pseudo-terminal. It speaks the framed protocol
+from devices/arduino_link.py: it decodes command frames, integrates wheel
+encoder ticks the way bot.h/motor.h would drive them, and streams telemetry
+frames back. Point anything that opens the Arduino port at fake.port.
+
+Run it directly for a loopback check of SerialCommandWriter, ArduinoLink
+and WheelOdometry.
+"""
+import math
+import os
+import pty
+import random
+import select
+import struct
+import sys
+import threading
+import time
+import tty
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from devices.arduino_link import (BAUDRATE, COMMAND_FORMAT, MAX_TRAJECTORY_SEGMENTS, SEGMENT_FORMAT,
+                                  TELEMETRY_FORMAT, TYPE_COMMAND, TYPE_TELEMETRY, TYPE_TRAJECTORY,
+                                  FrameParser, encode_frame)
+
+ENCODER_STEPS_PER_ROTATION = 3000
+MAX_RPM = 100.0
+
+# Robot.ino COMMANDS enum
+(MOVE_WHEEL, TURN_WHILE_MOVING, TURN_BOT_INPLACE, DRIVE_STRAIGHT, MOVE_FORWARD_M_METERS, REVERSE,
+ PREEMPT_TRAJECTORY) = range(7)
+
+# Telemetry wheel order: back right, front right, front left, back left
+BACK_RIGHT, FRONT_RIGHT, FRONT_LEFT, BACK_LEFT = range(4)
+LEFT_WHEELS = (FRONT_LEFT, BACK_LEFT)
+RIGHT_WHEELS = (BACK_RIGHT, FRONT_RIGHT)
+
+
+class FakeWheel:
+    def __init__(self):
+        self.ticks = 0.0
+        self.rate = 0.0      # ticks/s, signed
+        self.target = None   # absolute tick count for turn_by_angle moves
+
+    def set_speed(self, rpm, direction=1):
+        self.rate = direction * min(abs(rpm), MAX_RPM) / 60.0 * ENCODER_STEPS_PER_ROTATION
+        self.target = None
+
+    def turn_by_angle(self, angle, rpm):
+        steps = round(angle * ENCODER_STEPS_PER_ROTATION / (2 * math.pi))
+        self.set_speed(rpm, 1 if angle > 0 else -1)
+        self.target = self.ticks + steps
+
+    def advance(self, dt):
+        self.ticks += self.rate * dt
+        if self.target is not None and (self.rate > 0) == (self.ticks >= self.target) and self.rate != 0:
+            self.ticks = self.target
+            self.rate = 0.0
+            self.target = None
+
+
+class FakeArduino:
+    def __init__(self, telemetry_rate=50, track_width=0.46, wheel_radius=0.05, corrupt_rate=0.0):
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.slave = slave
+        self.port = os.ttyname(slave)
+
+        self.period = 1.0 / telemetry_rate
+        self.track_width = track_width
+        self.wheel_radius = wheel_radius
+        self.corrupt_rate = corrupt_rate  # chance of flipping a byte in each telemetry frame
+
+        self.parser = FrameParser()
+        self.wheels = [FakeWheel() for _ in range(4)]
+        self.command = (DRIVE_STRAIGHT, 0, 0.0, 0.0, 0.0)
+        self.ack_seq = 0
+        self.telemetry_seq = 0
+        self.commands_received = 0
+        self.trajectory = []
+        self.trajectory_index = None
+        self.segment_end = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _run(self):
+        start = last = time.monotonic()
+        next_telemetry = last + self.period
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], max(0.0, next_telemetry - time.monotonic()))
+            if ready:
+                self.parser.feed(os.read(self.master, 1024))
+                while True:
+                    frame = self.parser.pop()
+                    if frame is None:
+                        break
+                    frame_type, seq, payload = frame
+                    if frame_type == TYPE_COMMAND and len(payload) == struct.calcsize(COMMAND_FORMAT):
+                        self.ack_seq = seq
+                        self.commands_received += 1
+                        self.trajectory_index = None
+                        self.execute(struct.unpack(COMMAND_FORMAT, payload))
+                    elif frame_type == TYPE_TRAJECTORY and payload:
+                        if self.start_trajectory(payload):
+                            self.ack_seq = seq
+                            self.commands_received += 1
+
+            now = time.monotonic()
+            self.update_trajectory(now)
+            for wheel in self.wheels:
+                wheel.advance(now - last)
+            last = now
+            if now >= next_telemetry:
+                next_telemetry += self.period
+                self.send_telemetry(int((now - start) * 1000))
+
+    def execute(self, packet):
+        command, specifier, f1, f2, _ = packet
+        self.command = packet
+        wheels = self.wheels
+        if command == MOVE_WHEEL and 0 <= specifier < 4:
+            wheels[specifier].turn_by_angle(f1, f2)
+        elif command == TURN_WHILE_MOVING:
+            radius, speed = f1, f2
+            if abs(radius) < self.track_width / 2:
+                return
+            inner = speed * (1 - self.track_width / (2 * abs(radius)))
+            outer = speed * (1 + self.track_width / (2 * abs(radius)))
+            # Positive radius turns left: left wheels are the inner ones
+            v_left, v_right = (inner, outer) if radius > 0 else (outer, inner)
+            for i in LEFT_WHEELS:
+                wheels[i].set_speed(max(v_left, 0.0))
+            for i in RIGHT_WHEELS:
+                wheels[i].set_speed(max(v_right, 0.0))
+        elif command == TURN_BOT_INPLACE:
+            angle = (self.track_width / 2) * abs(f1) / self.wheel_radius
+            sign = 1 if f1 > 0 else -1
+            for i in RIGHT_WHEELS:
+                wheels[i].turn_by_angle(sign * angle, f2)
+            for i in LEFT_WHEELS:
+                wheels[i].turn_by_angle(-sign * angle, f2)
+        elif command == DRIVE_STRAIGHT:
+            for wheel in wheels:
+                wheel.set_speed(f1, -1 if f1 < 0 else 1)
+        elif command == MOVE_FORWARD_M_METERS:
+            for wheel in wheels:
+                wheel.turn_by_angle(f1 / self.wheel_radius, f2)
+        elif command == REVERSE:
+            for wheel in wheels:
+                wheel.set_speed(f1, -1)
+        elif command == PREEMPT_TRAJECTORY:
+            for wheel in wheels:
+                wheel.set_speed(0)
+
+    def start_trajectory(self, payload):
+        size = struct.calcsize(SEGMENT_FORMAT)
+        if not 0 < payload[0] <= MAX_TRAJECTORY_SEGMENTS or len(payload) != 1 + payload[0] * size:
+            return False
+        segments = [struct.unpack_from(SEGMENT_FORMAT, payload, 1 + i * size) for i in range(payload[0])]
+        # Like Robot.ino: zero-length segments are rejected
+        if not all(segment[0] > 0 for segment in segments):
+            return False
+        self.trajectory = segments
+        self.trajectory_index = 0
+        self.segment_end = time.monotonic() + self.trajectory[0][0]
+        self.apply_segment(self.trajectory[0])
+        return True
+
+    def update_trajectory(self, now):
+        while self.trajectory_index is not None and now >= self.segment_end:
+            self.trajectory_index += 1
+            if self.trajectory_index >= len(self.trajectory):
+                self.trajectory_index = None
+                self.execute((DRIVE_STRAIGHT, 0, 0.0, 0.0, 0.0))
+                return
+            self.segment_end += self.trajectory[self.trajectory_index][0]
+            self.apply_segment(self.trajectory[self.trajectory_index])
+
+    def apply_segment(self, segment):
+        _, radius, speed = segment
+        if radius == 0 or math.isinf(radius):
+            self.execute((DRIVE_STRAIGHT, 0, speed, speed, 0.0))
+        else:
+            self.execute((TURN_WHILE_MOVING, 0, radius, speed, 0.0))
+
+    def send_telemetry(self, millis):
+        command, _, f1, f2, _ = self.command
+        payload = struct.pack(TELEMETRY_FORMAT, millis & 0xFFFFFFFF,
+                              *(int(round(w.ticks)) for w in self.wheels),
+                              command, self.ack_seq, f1, f2, self.parser.crc_errors & 0xFFFF,
+                              0xFF if self.trajectory_index is None else self.trajectory_index)
+        frame = bytearray(encode_frame(TYPE_TELEMETRY, self.telemetry_seq, payload))
+        self.telemetry_seq = (self.telemetry_seq + 1) & 0xFF
+        if self.corrupt_rate and random.random() < self.corrupt_rate:
+            frame[random.randrange(len(frame))] ^= 0xFF
+        os.write(self.master, bytes(frame))
+
+
+if __name__ == '__main__':
+    import serial
+    from devices.arduino_link import ArduinoLink
+    from devices.serial_writer import SerialCommandWriter
+    from navigation.odometry import WheelOdometry
+
+    fake = FakeArduino(corrupt_rate=0.1)
+    fake.start()
+    print(f"Fake Arduino on {fake.port}")
+
+    with serial.Serial(fake.port, BAUDRATE, timeout=0.1) as ser:
+        link = ArduinoLink(ser)
+        odometry = WheelOdometry(link)
+        link.start()
+        writer = SerialCommandWriter(ser)
+        writer.start()
+
+        for command, param1, param2 in ((DRIVE_STRAIGHT, 60, 0), (TURN_WHILE_MOVING, 1.0, 60),
+                                        (REVERSE, 20, 0), (DRIVE_STRAIGHT, 0, 0)):
+            writer.submit(command, param1, param2)
+            time.sleep(1.0)
+            telemetry = link.latest
+            print(f"sent seq {writer.framer.seq} cmd {command} -> acked {telemetry['ack_seq']}, "
+                  f"applied {telemetry['command']}, ticks {telemetry['ticks']}")
+            assert telemetry['ack_seq'] == writer.framer.seq
+            pose = odometry.get_pose()
+            print(f"  odometry: east {pose['east']:.3f}m north {pose['north']:.3f}m "
+                  f"heading {math.degrees(pose['heading']):.1f}deg")
+
+        # A 1 s arc then straight, executed by the fake without further writes
+        writer.submit_trajectory([(0.5, 1.0, 60), (0.5, float('inf'), 60)])
+        time.sleep(0.3)
+        print(f"trajectory running segment {link.latest['trajectory_segment']}")
+        time.sleep(1.0)
+        telemetry = link.latest
+        print(f"trajectory done: segment {telemetry['trajectory_segment']}, applied {telemetry['command']} "
+              f"speed {telemetry['param1']}")
+        assert telemetry['trajectory_segment'] is None and telemetry['param1'] == 0
+
+        print("writer:", writer.get_stats())
+        print("link:", link.get_stats())
+        print("odometry:", odometry.get_stats())
+        writer.stop()
+        link.stop()
+    fake.stop()
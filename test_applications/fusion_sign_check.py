@@ -0,0 +1,57 @@
+"""
+Sign check for the camera/lidar fusion table.
+
+Usage:
+    python test_applications/fusion_sign_check.py
+
+The RPLidar reports angles increasing clockwise seen from above, so a
+return at 10 degrees is to the right of forward and must land right of the
+image centre, and one at 350 degrees left of it. Checks the bearing table,
+the per-column binning of a scan and the ranging of a box on each side,
+and exits non-zero if any check fails.
+"""
+import math
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.fusion import CameraLidarFusion, CameraModel
+
+
+def box(column, width=20):
+    x = column - width // 2
+    return {'label': 'test', 'bbox': (x, 200, width, 80), 'center': (column, 240)}
+
+
+def main():
+    camera = CameraModel.from_fov(640, 480, 60)
+    fusion = CameraLidarFusion(camera)
+    centre = camera.width // 2
+    right_range, left_range = 2.0, 3.0
+    scan = [(10.0, right_range * 1000), (350.0, left_range * 1000)]
+    columns = fusion.bin_scan(scan, seq=1)
+    filled = [column for column in range(camera.width) if not math.isnan(columns[column])]
+    right_column = [column for column in filled if abs(columns[column] - right_range) < 1e-6]
+    left_column = [column for column in filled if abs(columns[column] - left_range) < 1e-6]
+
+    # 10 degrees on the 60 degree / 640 px camera is about 98 px off centre
+    expected = camera.fx * math.tan(math.radians(10))
+    right_obstacle, left_obstacle = fusion.fuse([box(int(centre + expected)), box(int(centre - expected))], scan, seq=1)
+
+    checks = [
+        ("right column bearing is negative (positive left)", fusion.column_centres[centre + 100] < 0),
+        ("10 deg return lands right of centre", len(right_column) == 1 and right_column[0] > centre),
+        ("350 deg return lands left of centre", len(left_column) == 1 and left_column[0] < centre),
+        ("10 deg return column matches the intrinsics", right_column and abs(right_column[0] - centre - expected) <= 1),
+        ("box right of centre ranged by the 10 deg return", right_obstacle['range_min'] == right_range),
+        ("box left of centre ranged by the 350 deg return", left_obstacle['range_min'] == left_range),
+    ]
+    failed = False
+    for name, ok in checks:
+        failed |= not ok
+        print(f"{name:<50} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
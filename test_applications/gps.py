@@ -1,9 +1,13 @@
 import serial
-import pynmea2
 import threading
 import time
+import os
+import sys
 from utils import Vector
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from devices.nmea import NMEAFramer, parse_sentence
+
 # Shared variable for latest GPS coordinates
 latest_coords = {'lat': None, 'lon': None, 'acc': None, 'msg': None, 'line':None}
 lock = threading.Lock()
@@ -12,19 +16,23 @@ def gps_poll(port='/dev/ttyACM0', baud=9600, update_interval=0.01):
     """Background thread function to read GPS data."""
     global latest_coords
     ser = serial.Serial(port, baud, timeout=1)
+    framer = NMEAFramer()
 
     while True:
         try:
-            line = ser.readline().decode('ascii', errors='replace').strip()
-            latest_coords['line'] = line
-            if line.startswith('$GPGGA') or line.startswith('$GPRMC'):
-                msg = pynmea2.parse(line)
-                latest_coords['msg'] = msg
-                if hasattr(msg, 'latitude') and hasattr(msg, 'longitude'):
-                    with lock:
-                        latest_coords['lat'] = msg.latitude
-                        latest_coords['lon'] = msg.longitude
-                        #latest_coords['acc'] = msg.horizontal_dil
+            framer.feed(ser.read(ser.in_waiting or 1))
+            sentence = framer.pop()
+            while sentence is not None:
+                latest_coords['line'] = sentence.decode('ascii', errors='replace')
+                msg = parse_sentence(sentence)
+                if msg is not None and msg['type'] in ('GGA', 'RMC'):
+                    latest_coords['msg'] = msg
+                    if msg['latitude'] is not None and msg['longitude'] is not None:
+                        with lock:
+                            latest_coords['lat'] = msg['latitude']
+                            latest_coords['lon'] = msg['longitude']
+                            latest_coords['acc'] = msg.get('hdop')
+                sentence = framer.pop()
             time.sleep(update_interval)  # limit frequency of update
         except Exception as e:
             print(f"GPS read error: {e}")
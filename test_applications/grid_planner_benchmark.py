@@ -0,0 +1,84 @@
+"""
+Benchmark for the D* Lite grid planner.
+
+Usage:
+    python test_applications/grid_planner_benchmark.py [cells_per_side]
+
+Builds a square occupancy grid (default 600 x 600 = 360k cells of 0.25 m)
+with a few random walls, plans corner to corner, then repeatedly drops a
+small obstacle onto the current path and moves the robot a few cells along
+it. Each repair is timed against planning the same situation from scratch,
+and the path costs are compared to check the repair is exact.
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.grid_planner import DStarLite, OccupancyGrid
+
+
+def random_walls(grid, rng, count=40, length=60):
+    mask = np.zeros(grid.shape, dtype=bool)
+    rows, cols = grid.shape
+    for _ in range(count):
+        i, j = rng.integers(0, rows), rng.integers(0, cols)
+        if rng.random() < 0.5:
+            mask[i, j:j + length] = True
+        else:
+            mask[i:i + length, j] = True
+    return mask
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    rng = np.random.default_rng(1)
+    grid = OccupancyGrid((0.0, 0.0), (side, side), cell_size=0.25)
+    grid.set_static(random_walls(grid, rng, count=side // 15, length=side // 10))
+    start, goal = 0, grid.size - 1
+    print(f"grid: {side}x{side} = {grid.size} cells")
+
+    dstar = DStarLite(grid, start, goal)
+    plan_ms, _ = timed(dstar.compute)
+    path = dstar.path()
+    print(f"initial plan: {plan_ms:.0f} ms, {dstar.expanded} expansions, "
+          f"cost {dstar.cost * grid.cell_size:.1f} m, {len(path)} cells")
+
+    print(f"{'step':>4} {'changed':>7} {'repair ms':>9} {'expanded':>8} {'scratch ms':>10} {'costs match':>11}")
+    for step in range(8):
+        # Move a few cells along the path, then block a 3x3 patch further ahead on it
+        start = path[min(5, len(path) - 1)]
+        ahead = path[min(25, len(path) - 1)]
+        i, j = divmod(ahead, grid.shape[1])
+        mask = grid.static.copy()
+        mask[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2] = True
+        changed = grid.set_static(mask)
+
+        before = dstar.expanded
+
+        def repair():
+            dstar.move_start(start)
+            dstar.cells_changed(changed)
+            dstar.compute()
+            return dstar.path()
+
+        repair_ms, path = timed(repair)
+        fresh = DStarLite(grid, start, goal)
+        scratch_ms, _ = timed(fresh.compute)
+        match = abs(fresh.cost - dstar.cost) < 1e-6
+        print(f"{step:>4} {len(changed):>7} {repair_ms:>9.1f} {dstar.expanded - before:>8} "
+              f"{scratch_ms:>10.0f} {str(match):>11}")
+        if path is None:
+            print("goal unreachable")
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Throughput benchmark: in-tree NMEA parser vs pynmea2.
+
+Usage:
+    python test_applications/nmea_benchmark.py [recorded_log.nmea]
+
+The log should be a raw dump of the receiver, e.g.
+    cat /dev/ttyUSB1 > gps_log.nmea
+Without a log a synthetic one with the usual sentence mix is generated.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from devices.nmea import NMEAFramer, parse_sentence, nmea_checksum
+
+try:
+    import pynmea2
+except ImportError:
+    pynmea2 = None
+
+
+def _sentence(body):
+    return f"${body}*{nmea_checksum(body.encode()):02X}\r\n".encode()
+
+
+def synthetic_log(seconds=2000):
+    """A receiver at 1 Hz emitting GGA, GSA, 3x GSV, RMC and VTG every second"""
+    lines = []
+    for i in range(seconds):
+        hh, mm, ss = (i // 3600) % 24, (i // 60) % 60, i % 60
+        t = f"{hh:02d}{mm:02d}{ss:02d}.00"
+        lat = f"4002.{2152 + i % 100:04d}"
+        lines.append(_sentence(f"GPGGA,{t},{lat},N,08654.4396,W,1,08,0.9,245.3,M,-33.9,M,,"))
+        lines.append(_sentence("GPGSA,A,3,04,05,09,12,24,25,29,31,,,,,1.8,0.9,1.5"))
+        for n in range(1, 4):
+            lines.append(_sentence(f"GPGSV,3,{n},11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00"))
+        lines.append(_sentence(f"GPRMC,{t},A,{lat},N,08654.4396,W,0.52,84.4,191026,,,A"))
+        lines.append(_sentence("GPVTG,84.4,T,,M,0.52,N,0.96,K,A"))
+    return b"".join(lines)
+
+
+def bench_pynmea2(lines):
+    parsed = 0
+    start = time.perf_counter()
+    for line in lines:
+        try:
+            msg = pynmea2.parse(line.decode(errors='ignore'))
+        except pynmea2.ParseError:
+            continue
+        if hasattr(msg, 'latitude') or hasattr(msg, 'spd_over_grnd_kmph'):
+            parsed += 1
+    return time.perf_counter() - start, parsed
+
+
+def bench_in_tree(raw, chunk=256):
+    # Includes framing from raw bytes, which pynmea2 doesn't get charged for.
+    parsed = 0
+    framer = NMEAFramer()
+    start = time.perf_counter()
+    for i in range(0, len(raw), chunk):
+        framer.feed(raw[i:i + chunk])
+        sentence = framer.pop()
+        while sentence is not None:
+            if parse_sentence(sentence) is not None:
+                parsed += 1
+            sentence = framer.pop()
+    return time.perf_counter() - start, parsed
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            raw = f.read()
+        source = sys.argv[1]
+    else:
+        raw = synthetic_log()
+        source = "synthetic log"
+
+    lines = [line.strip() for line in raw.split(b"\n") if line.strip()]
+    print(f"{source}: {len(lines)} sentences, {len(raw)} bytes")
+
+    elapsed, parsed = bench_in_tree(raw)
+    print(f"in-tree parser: {len(lines) / elapsed:12.0f} sentences/s  ({parsed} GGA/RMC/VTG parsed)")
+
+    if pynmea2 is None:
+        print("pynmea2 not installed - skipping comparison")
+        return
+    baseline, parsed = bench_pynmea2(lines)
+    print(f"pynmea2:        {len(lines) / baseline:12.0f} sentences/s  ({parsed} GGA/RMC/VTG parsed)")
+    print(f"speedup: {baseline / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
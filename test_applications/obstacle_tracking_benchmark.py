@@ -0,0 +1,60 @@
+"""
+Benchmark for the obstacle tracker.
+
+Usage:
+    python test_applications/obstacle_tracking_benchmark.py [frames]
+
+Simulates a number of pedestrians walking straight lines at 0.5..1.5 m/s,
+observed at 10 Hz with 5 cm position noise, a 5% chance of missing each
+detection and a couple of clutter points per frame. Reports the update time
+against the number of targets, how many track ids were ever confirmed
+(ideally one per target), and the velocity error of the confirmed tracks.
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.obstacle_tracking import ObstacleTracker
+
+
+def simulate(targets, frames, rng, period=0.1):
+    position = rng.uniform(-10, 10, (targets, 2))
+    heading = rng.uniform(0, 2 * np.pi, targets)
+    velocity = rng.uniform(0.5, 1.5, targets)[:, None] * np.column_stack((np.cos(heading), np.sin(heading)))
+    tracker = ObstacleTracker()
+    elapsed = 0.0
+    confirmed_ids = set()
+    for frame in range(frames):
+        truth = position + velocity * frame * period
+        seen = truth[rng.random(targets) > 0.05]
+        seen = seen + rng.normal(0, 0.05, seen.shape)
+        clutter = rng.uniform(-15, 15, (2, 2))
+        measurements = rng.permutation(np.concatenate((seen, clutter)))
+        start = time.perf_counter()
+        tracker.update(measurements, frame * period)
+        elapsed += time.perf_counter() - start
+        confirmed_ids.update(track['id'] for track in tracker.tracks())
+
+    # Velocity error of each confirmed track against the nearest target
+    truth = position + velocity * (frames - 1) * period
+    errors = []
+    for track in tracker.tracks():
+        nearest = np.argmin(np.hypot(*(truth - track['position']).T))
+        errors.append(np.hypot(*(np.array(track['velocity']) - velocity[nearest])))
+    return elapsed * 1000 / frames, tracker, len(confirmed_ids), np.median(errors) if errors else float('nan')
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = np.random.default_rng(3)
+    print(f"frames: {frames}, matcher: {ObstacleTracker().get_stats()['matcher']}")
+    print(f"{'targets':>7} {'update ms':>9} {'confirmed':>9} {'ids confirmed':>13} {'median |dv| m/s':>15}")
+    for targets in (1, 5, 10, 20, 40):
+        update_ms, tracker, ids, error = simulate(targets, frames, rng)
+        print(f"{targets:>7} {update_ms:>9.3f} {tracker.get_stats()['confirmed']:>9} {ids:>13} {error:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
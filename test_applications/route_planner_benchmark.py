@@ -0,0 +1,50 @@
+"""
+Benchmark for the multi-stop ordering optimizer.
+
+Usage:
+    python test_applications/route_planner_benchmark.py [time_budget_s]
+
+Random stops are scattered over a ~1 km campus-sized square around the
+depot. Reports planning time and tour length against plain nearest neighbour.
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.route_planner import (distance_matrix, nearest_neighbour_tour,
+                                      plan_stop_order, tour_length)
+
+DEPOT = (40.036920, -86.907327)
+
+
+def random_stops(n, rng, span_deg=0.009):
+    return [(DEPOT[0] + rng.uniform(-span_deg, span_deg) / 2,
+             DEPOT[1] + rng.uniform(-span_deg, span_deg) / 2) for _ in range(n)]
+
+
+def main():
+    time_budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    rng = np.random.default_rng(0)
+    print(f"time budget: {time_budget:.2f}s")
+    print(f"{'stops':>6} {'matrix ms':>10} {'plan ms':>9} {'NN length m':>12} {'opt length m':>13} {'gain':>6}")
+    for n in (10, 50, 100, 200, 300, 500):
+        stops = random_stops(n, rng)
+
+        start = time.perf_counter()
+        D = distance_matrix([DEPOT] + stops)
+        matrix_ms = (time.perf_counter() - start) * 1000
+        nn_length = tour_length(nearest_neighbour_tour(D), D)
+
+        start = time.perf_counter()
+        _, order = plan_stop_order(DEPOT, stops, time_budget=time_budget)
+        plan_ms = (time.perf_counter() - start) * 1000
+
+        opt_length = tour_length(np.array([0] + [i + 1 for i in order]), D)
+        print(f"{n:>6} {matrix_ms:>10.2f} {plan_ms:>9.1f} {nn_length:>12.0f} {opt_length:>13.0f} "
+              f"{100 * (1 - opt_length / nn_length):>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,11 @@ import serial.tools.list_ports
 import websockets
 import asyncio
 import functools
-import struct
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from devices.arduino_link import BAUDRATE, CommandFramer
 
 
 Commands = {
@@ -16,22 +20,23 @@ Commands = {
     "drive_m_meters":    4
 } #Matches up with an enum in the arduino code
 
+framer = CommandFramer()
 
 
 def turn_wheel_by_angle(ser, wheel_no, angle, speed):
-    packet = struct.pack('<BBfff', Commands["turn_wheel"], wheel_no, angle, speed, 0)
+    packet = framer.frame(Commands["turn_wheel"], angle, speed, 0, specifier=wheel_no)
     ser.write(packet)
     ser.flush()
 def turn_inplace(ser, angle, speed):
-    packet = struct.pack('<BBfff', Commands["turn_inplace"], 0, angle, speed, 0)
+    packet = framer.frame(Commands["turn_inplace"], angle, speed)
     ser.write(packet)
     ser.flush()
 def turn_while_moving(ser, radius, speed):
-    packet = struct.pack('<BBfff', Commands["turn_while_moving"], 0, radius, speed, 0)
+    packet = framer.frame(Commands["turn_while_moving"], radius, speed)
     ser.write(packet)
     ser.flush()
 def drive_straight(ser, speed):
-    packet = struct.pack('<BBfff', Commands["drive_straight"], 0, speed, 0, 0)
+    packet = framer.frame(Commands["drive_straight"], speed)
     ser.write(packet)
     ser.flush()
 
@@ -49,7 +54,7 @@ async def handle(websocket, ser):
         elif message == "right":
             turn_while_moving(ser, -0.5, 30)
 async def main():
-    with serial.Serial("/dev/ttyACM0", 9600, timeout=100) as ser:
+    with serial.Serial("/dev/ttyACM0", BAUDRATE, timeout=100) as ser:
         async with websockets.serve(functools.partial(handle, ser=ser), "0.0.0.0", 8765):
             print("Websocket server started on port 8765")
             await asyncio.Future()
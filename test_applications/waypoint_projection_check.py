@@ -0,0 +1,81 @@
+"""
+Accuracy check for WaypointNavigator's planar distance and bearing.
+
+Usage:
+    python test_applications/waypoint_projection_check.py [pairs]
+
+Builds a random route in a ~900 m box around the test site and compares
+local_distance_bearing() (tangent-plane projection at the route centroid)
+against the great-circle haversine() / bearing() for random positions and
+waypoints, and remaining_distances_bearings() against
+local_distance_bearing(). Prints the worst errors and exits non-zero if any
+exceeds its bound.
+"""
+import math
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from navigation.waypoint import WaypointNavigator
+
+CENTER = (40.036920, -86.907327)
+HALF_SIZE = 450.0           # m, half the side of the box
+MAX_DISTANCE_ERROR = 0.05   # m
+MAX_BEARING_ERROR = 0.01    # deg, for pairs at least MIN_BEARING_DISTANCE apart
+MIN_BEARING_DISTANCE = 1.0  # m
+METERS_PER_DEG_LAT = 111320.0
+
+
+def random_points(rng, count):
+    north = rng.uniform(-HALF_SIZE, HALF_SIZE, count)
+    east = rng.uniform(-HALF_SIZE, HALF_SIZE, count)
+    lat = CENTER[0] + north / METERS_PER_DEG_LAT
+    lon = CENTER[1] + east / (METERS_PER_DEG_LAT * math.cos(math.radians(CENTER[0])))
+    return list(zip(lat, lon))
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(7)
+    waypoints = random_points(rng, 50)
+    navigator = WaypointNavigator(None, None, waypoints)
+    positions = random_points(rng, pairs)
+    indices = rng.integers(0, len(waypoints), pairs)
+
+    distance_error = bearing_error = 0.0
+    for (lat, lon), index in zip(positions, indices):
+        target_lat, target_lon = waypoints[index]
+        distance, bearing = navigator.local_distance_bearing(lat, lon, index)
+        reference = navigator.haversine(lat, lon, target_lat, target_lon)
+        distance_error = max(distance_error, abs(distance - reference))
+        if reference >= MIN_BEARING_DISTANCE:
+            difference = bearing - navigator.bearing(lat, lon, target_lat, target_lon)
+            difference = (difference + math.pi) % (2 * math.pi) - math.pi
+            bearing_error = max(bearing_error, abs(math.degrees(difference)))
+
+    # The vectorised form has to agree with the scalar one
+    vector_error = 0.0
+    for lat, lon in positions[:100]:
+        navigator.waypoint_index = int(rng.integers(0, len(waypoints)))
+        distances, bearings = navigator.remaining_distances_bearings(lat, lon)
+        for offset, (distance, bearing) in enumerate(zip(distances, bearings)):
+            expected = navigator.local_distance_bearing(lat, lon, navigator.waypoint_index + offset)
+            vector_error = max(vector_error, abs(distance - expected[0]), abs(bearing - expected[1]))
+
+    checks = [
+        ("distance vs haversine", distance_error, MAX_DISTANCE_ERROR, "m"),
+        ("bearing vs great circle", bearing_error, MAX_BEARING_ERROR, "deg"),
+        ("remaining vs scalar", vector_error, 1e-9, ""),
+    ]
+    print(f"pairs: {pairs}, box: {2 * HALF_SIZE:.0f} m")
+    failed = False
+    for name, error, bound, unit in checks:
+        ok = error <= bound
+        failed |= not ok
+        print(f"{name:<24} max error {error:.6f} {unit:<3} bound {bound:g} {unit:<3} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()